@@ -0,0 +1,211 @@
+"""HTTP API скоринга без Streamlit — для POS и колл-центра.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+Запросы к /score и /history — с ключом клиента: Authorization: Bearer <ключ>
+(python api_clients.py add ...). Филиал, менеджер и порог решения берутся у
+клиента, а не из тела запроса.
+
+POST /score        {"age": 24, "amount": 3000, ...}
+POST /score/batch  {"applicants": [...]}
+GET  /history/{document_number}
+GET  /history?phone=928009292&days=30
+GET  /health
+GET  /metrics      гистограммы стадий и PSI дрейфа в формате Prometheus
+"""
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+import api_clients
+import drift
+import model_registry
+import tracing
+from model_store import live as live_model
+from history import get_history
+from microbatch import get_batcher
+from prediction_cache import cache as prediction_cache, feature_key
+from scoring import (FEATURES, GENDERS, LIMITS, cutoff_for, make_record, mapping_dis, mapping_mar,
+                     predict_applicants, score_applicants)
+
+MAX_BATCH = 10000
+DISTRICTS = set(mapping_dis) | set(mapping_dis.values())
+MARITAL_STATUSES = set(mapping_mar) | set(mapping_mar.values())
+
+
+def _predict_many(applicants):
+    # Каждый результат несёт версию модели, которая его посчитала
+    entry = live_model.current()
+    return [(p, entry.version) for p in predict_applicants(entry.model, applicants)]
+
+
+# Одиночные запросы от разных клиентов склеиваются в один predict_proba
+batcher = get_batcher('scoring', _predict_many)
+
+
+def _validate(applicant):
+    if not isinstance(applicant, dict):
+        return 'applicant must be an object'
+    missing = [f for f in FEATURES if applicant.get(f) in (None, '')]
+    if missing:
+        return f'missing fields: {", ".join(missing)}'
+    errors = []
+    for field, (low, high) in LIMITS.items():
+        value = applicant[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+            errors.append(f'{field} must be a number')
+        elif not low <= value <= high:
+            errors.append(f'{field} must be between {low} and {high}')
+    if str(applicant['gender']).strip() not in GENDERS:
+        errors.append(f'gender must be one of: {", ".join(GENDERS)}')
+    for field, allowed in [('district', DISTRICTS), ('marital_status', MARITAL_STATUSES)]:
+        if not isinstance(applicant[field], str) or applicant[field].strip() not in allowed:
+            errors.append(f'unknown {field}')
+    return '; '.join(errors) or None
+
+
+def _error(message, status=422):
+    return JSONResponse({'error': message}, status_code=status)
+
+
+def _bearer(request):
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else None
+
+
+def authenticated(handler):
+    # Клиент по ключу из api_clients.json -> request.state.client, иначе 401
+    @functools.wraps(handler)
+    async def wrapper(request):
+        client = api_clients.authenticate(_bearer(request))
+        if client is None:
+            return JSONResponse({'error': 'unauthorized'}, status_code=401, headers={'WWW-Authenticate': 'Bearer'})
+        request.state.client = client
+        return await handler(request)
+    return wrapper
+
+
+def _for_client(client, applicant):
+    # Менеджер и филиал — от клиента; username и Manager из тела не учитываются
+    if not isinstance(applicant, dict):
+        return applicant
+    applicant = {k: v for k, v in applicant.items() if k != 'username'}
+    applicant['Manager'] = client['manager']
+    if client['district']:
+        applicant['district'] = client['district']
+    return applicant
+
+
+async def _read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+@authenticated
+async def score(request):
+    client = request.state.client
+    payload = _for_client(client, await _read_json(request))
+    error = _validate(payload) if payload is not None else 'invalid JSON'
+    if error:
+        return _error(error)
+    key = feature_key(payload)
+    version = live_model.version
+    probability = prediction_cache.get(version, key)
+    if probability is None:
+        with tracing.stage('predict_proba'):
+            probability, version = await asyncio.wrap_future(batcher.submit(payload))
+        prediction_cache.put(version, key, float(probability))
+    drift.observe(payload, probability)
+    cutoff = cutoff_for(client['username'], payload['district'])
+    record = make_record(payload, probability, cutoff, model_version=version)
+    await run_in_threadpool(get_history().record, [record])
+    return JSONResponse(record)
+
+
+@authenticated
+async def score_batch(request):
+    client = request.state.client
+    payload = await _read_json(request)
+    applicants = payload.get('applicants') if isinstance(payload, dict) else None
+    if not isinstance(applicants, list):
+        return _error('expected {"applicants": [...]}')
+    if len(applicants) > MAX_BATCH:
+        return _error(f'at most {MAX_BATCH} applicants per request', 413)
+    applicants = [_for_client(client, a) for a in applicants]
+    for i, applicant in enumerate(applicants):
+        error = _validate(applicant)
+        if error:
+            return _error(f'applicants[{i}]: {error}')
+    model = live_model.current()
+    cutoffs = [cutoff_for(client['username'], a['district']) for a in applicants]
+    records = await run_in_threadpool(score_applicants, model.model, applicants, cutoffs, model.version)
+    drift.observe_records(applicants, records)
+    await run_in_threadpool(get_history().record, records)
+    return JSONResponse({'results': records})
+
+
+def _own(client, record):
+    # Как в history_section: менеджер видит только свои записи, администратор — все
+    return client['admin'] or record['Manager'] == client['manager']
+
+
+@authenticated
+async def history_document(request):
+    client = request.state.client
+    record = await run_in_threadpool(get_history().by_document, request.path_params['document_number'])
+    if record is None or not _own(client, record):
+        return _error('not found', 404)
+    return JSONResponse(record)
+
+
+@authenticated
+async def history_phone(request):
+    phone = request.query_params.get('phone')
+    if not phone:
+        return _error('expected ?phone=...')
+    try:
+        days = int(request.query_params['days']) if 'days' in request.query_params else None
+    except ValueError:
+        return _error('days must be an integer')
+    records = await run_in_threadpool(get_history().by_phone, phone, days)
+    return JSONResponse({'results': [r for r in records if _own(request.state.client, r)]})
+
+
+async def health(request):
+    monitor = drift.get_monitor()
+    return JSONResponse({'status': 'ok', 'model': live_model.status(), 'models': model_registry.loaded_models(),
+                         'microbatch': batcher.stats(), 'prediction_cache': prediction_cache.stats(),
+                         'drift': monitor and monitor.status()})
+
+
+async def metrics(request):
+    monitor = drift.get_monitor()
+    text = tracing.render_prometheus() + (monitor.render_prometheus() if monitor else '')
+    return PlainTextResponse(text, media_type='text/plain; version=0.0.4')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Модель загружается до первого запроса; новые версии подменяются в фоне
+    await run_in_threadpool(live_model.start().wait)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route('/score', score, methods=['POST']),
+        Route('/score/batch', score_batch, methods=['POST']),
+        Route('/history', history_phone),
+        Route('/history/{document_number}', history_document),
+        Route('/health', health),
+        Route('/metrics', metrics),
+    ],
+    lifespan=lifespan,
+)
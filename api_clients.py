@@ -0,0 +1,115 @@
+"""Клиенты HTTP API (POS, колл-центр) и их ключи.
+
+api_clients.json: {"pos-khujand": {"token_sha256": "...", "district": "Худжанд",
+"manager": "Зокиров Улугбек", "username": null, "admin": false}}. В файле только
+sha256 ключей; сам ключ выдаёт add и показывает один раз. Порог и филиал
+решения берутся отсюда, а не из тела запроса; история — только записи своего
+менеджера, если клиент не admin. Файл перечитывается при изменении.
+
+    python api_clients.py add pos-khujand --district Худжанд --manager "Зокиров Улугбек"
+    python api_clients.py revoke pos-khujand
+"""
+import argparse
+import hashlib
+import json
+import os
+import secrets
+import sys
+import threading
+
+CLIENTS_PATH = os.environ.get('API_CLIENTS', 'api_clients.json')
+
+_lock = threading.Lock()
+_configs = {}  # path -> (mtime_ns, {sha256 ключа: клиент})
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_clients(path=CLIENTS_PATH):
+    """{sha256 ключа: {'name', 'district', 'manager', 'username', 'admin'}}; нет файла — нет клиентов."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _configs.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    clients = {}
+    for name, client in _read(path).items():
+        clients[client['token_sha256']] = {'name': name, 'district': client.get('district'),
+                                           'manager': client.get('manager') or name,
+                                           'username': client.get('username'), 'admin': bool(client.get('admin'))}
+    _configs[path] = (mtime, clients)
+    return clients
+
+
+def authenticate(token, path=CLIENTS_PATH):
+    # -> клиент или None
+    if not token:
+        return None
+    return load_clients(path).get(token_hash(token))
+
+
+def _write(path, config):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=1)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+
+
+def add_client(name, district=None, manager=None, username=None, admin=False, path=CLIENTS_PATH):
+    """Выдать клиенту новый ключ (старый перестаёт работать). Возвращает ключ."""
+    token = secrets.token_urlsafe(32)
+    with _lock:
+        config = _read(path)
+        config[name] = {'token_sha256': token_hash(token), 'district': district,
+                        'manager': manager, 'username': username, 'admin': admin}
+        _write(path, config)
+    return token
+
+
+def revoke_client(name, path=CLIENTS_PATH):
+    with _lock:
+        config = _read(path)
+        if config.pop(name, None) is None:
+            return False
+        _write(path, config)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ключи клиентов HTTP API скоринга')
+    sub = parser.add_subparsers(dest='command', required=True)
+    add = sub.add_parser('add', help='выдать (или перевыпустить) ключ')
+    add.add_argument('name')
+    add.add_argument('--district', help='филиал клиента: им определяются признак district и порог')
+    add.add_argument('--manager', help='менеджер в записях истории (по умолчанию имя клиента)')
+    add.add_argument('--username', help='учётная запись для порога из cutoffs.json users')
+    add.add_argument('--admin', action='store_true', help='видит историю всех менеджеров')
+    revoke = sub.add_parser('revoke', help='отозвать ключ')
+    revoke.add_argument('name')
+    parser.add_argument('--path', default=CLIENTS_PATH)
+    args = parser.parse_args(argv)
+    if args.command == 'add':
+        token = add_client(args.name, args.district, args.manager, args.username, args.admin, args.path)
+        print(f'{args.name}: {token}')
+        print('Ключ показывается один раз; в запросах — заголовок Authorization: Bearer <ключ>')
+    elif not revoke_client(args.name, args.path):
+        print(f'{args.name}: нет такого клиента')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
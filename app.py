@@ -1,17 +1,15 @@
 import pickle
+import tempfile
+from functools import partial
 from pathlib import Path
 
 import streamlit_authenticator as stauth  # pip install streamlit-authenticator
 
 import streamlit as st
-import pandas as pd
-import joblib
-import gspread
-# Загрузка модели
-model = joblib.load('model.pkl')
-# Функция для генерации PDF
+import tracing
+from model_store import live as live_model
+from tracing import stage
 from datetime import datetime
-from fpdf import FPDF
 from PIL import Image
 
 
@@ -34,7 +32,8 @@ authenticator = stauth.Authenticate(
     cookie_expiry_days=30
 )
 
-authenticator.login()
+with stage('login'):
+    authenticator.login()
 
 authentication_status = st.session_state.get("authentication_status")
 username = st.session_state.get("username")
@@ -46,6 +45,336 @@ if authentication_status == False:
 if authentication_status == None:
     st.warning("Please enter your username and password")
 
+# Модель грузится в фоне (один раз на процесс) уже после отрисовки формы входа,
+# чтобы не отнимать у неё процессор; новые версии подменяются так же, в фоне
+model_ready = live_model.start()
+tracing.start_file_writer()
+
+if authentication_status:
+    # Тяжёлые модули нужны только после входа; на rerun берутся из sys.modules
+    import numpy as np
+    import pandas as pd
+    from prediction_cache import cache as prediction_cache, feature_key
+    from scoring import CHUNK_SIZE, cutoff_for, cutoffs_for, document_number_for, make_record, predict_applicants, score_file
+    from microbatch import get_batcher
+    from history import get_history
+    from outbox import duplicate_to_gsheet
+    from read_json import provider as credentials_provider
+    from repeat_applicants import get_index
+    from post_decision import get_pipeline
+    from explain import factor_lines, format_factors, get_explainer, top_factors
+    import drift
+    # Ключ Google подтягивается в фоне, выгрузка в таблицу его не ждёт
+    credentials_provider.prefetch()
+    # Индекс прежних заявителей строится в фоне из локальной истории
+    applicant_index = get_index()
+    applicant_index.start()
+
+    def predict_live(applicants):
+        # Каждый результат несёт версию модели, которая его посчитала
+        entry = live_model.current()
+        return [(p, entry.version) for p in predict_applicants(entry.model, applicants)]
+
+    # Одновременные нажатия «Получить результат» разных менеджеров идут одним predict_proba
+    scoring_batcher = get_batcher('scoring', predict_live)
+    post_pipeline = get_pipeline()
+
+
+# Функция для генерации PDF
+def generate_pdf(data, document_number, date, key=None, pdf=None):
+    # Документ собирается в памяти: у каждого менеджера свой, без общего result.pdf.
+    # pdf — future из post_decision, если документ уже рендерится в пуле
+    if pdf is None:
+        from pdf_report import render_pdf
+        PDFbyte = render_pdf(data)
+    else:
+        try:
+            PDFbyte = pdf.result()
+        except Exception as e:
+            st.error(f'Документ не сформирован: {e}')
+            return
+
+    st.download_button(label="Скачать документ",
+                       data=PDFbyte,
+                       file_name=f"{document_number}.pdf",
+                       mime='application/octet-stream',
+                       key=key)
+
+
+def score_applicant(applicant):
+    # -> (вероятность возврата, версия модели)
+    key = feature_key(applicant)
+    version = live_model.version
+    probability = prediction_cache.get(version, key)
+    if probability is None:
+        probability, version = scoring_batcher.predict(applicant)
+        prediction_cache.put(version, key, float(probability))
+    drift.observe(applicant, probability)
+    return probability, version
+
+
+def explain_applicant(applicant):
+    # Признаки, сильнее всего повлиявшие на вероятность (SHAP CatBoost по таблице листьев)
+    return top_factors(get_explainer(live_model.current()).contributions([applicant])[0])
+
+
+def factors_section(factors):
+    st.markdown('Основные факторы (↑ за возврат, ↓ против):\n' + '\n'.join(f'- {line}' for line in factor_lines(factors)))
+
+
+def start_post_decision(input_data):
+    # Сразу после predict_proba: PDF, локальная история (поиск, повторная печать)
+    # и очередь в Google Sheets — параллельно в общем пуле, вердикт их не ждёт
+    from pdf_report import render_pdf
+    return post_pipeline.start({'pdf': partial(render_pdf, input_data),
+                                'history': partial(get_history().record, input_data),
+                                'export': partial(duplicate_to_gsheet, input_data)},
+                               input_data['DocumentNumber'].iloc[0])
+
+
+def post_decision_status(post=None):
+    # Ошибки задач после решения (кроме PDF — о нём говорит generate_pdf);
+    # незавершённые (всех решений сессии) проверяются на следующем rerun
+    labels = {'history': 'История', 'export': 'Выгрузка в Google Sheets'}
+    pending = []
+    for current in st.session_state.pop('post_decisions', []) + ([post] if post else []):
+        if current.wait(0):
+            pending.append(current)
+            continue
+        for name, error in current.failures().items():
+            if name in labels:
+                st.warning(f'{labels[name]} ({current.label}): {error}')
+    if pending:
+        st.session_state['post_decisions'] = pending
+
+
+def find_prior(phone, name):
+    # Прежние обращения по телефону и ФИО — из индекса в памяти, на каждом rerun;
+    # одобренные заявки — только по точному телефону и без скорингов этой сессии
+    if not phone and not name:
+        return [], 0
+    approved = applicant_index.approved_count(phone, st.session_state.get('scored_documents', ())) if phone else 0
+    return applicant_index.lookup(phone, name), approved
+
+
+def history_count_input(phone, prior_approved):
+    # Признак модели предзаполняется один раз на телефон (когда индекс готов),
+    # дальше значение менеджера не перезаписывается; число из истории — в подсказке
+    if phone and applicant_index.ready.is_set() and st.session_state.get('prefilled_phone') != phone:
+        st.session_state['prefilled_phone'] = phone
+        st.session_state['credit_history_count'] = prior_approved
+    return st.number_input(r'$\textsf{\normalsize Количество рассрочки (история клиента)}$', step=1,
+                           key='credit_history_count',
+                           help=f'Одобренных прежних заявок с этим телефоном: {prior_approved}' if phone else None)
+
+
+def prior_section(prior):
+    if not prior:
+        return
+    st.markdown(r'$\textsf{\normalsize Ранее обращался}$')
+    for record in prior[:5]:
+        text = (f"{record['Date'][:10]} · {record['district']} · {record['Result']} "
+                f"({record['Probability']}) · совпадение: {record['match']}")
+        if record['Result'] == 'Одобрено':
+            st.info(text)
+        else:
+            st.warning(text)
+
+
+def history_section(manager=None):
+    # Повторная печать по номеру документа и обращения по телефону;
+    # менеджер видит только свои записи, администратор — все
+    with st.expander('История'):
+        col1, col2 = st.columns(2)
+        document_number = col1.text_input('Номер документа', key='history_document').strip()
+        phone = col2.text_input('Телефон номер', key='history_phone').strip()
+        if document_number:
+            record = get_history().by_document(document_number)
+            if record is None or (manager is not None and record['Manager'] != manager):
+                st.warning('Документ не найден')
+            else:
+                data = pd.DataFrame([record])
+                st.dataframe(data, hide_index=True)
+                generate_pdf(data, record['DocumentNumber'], record['Date'], key='history_pdf')
+        if phone:
+            records = [r for r in get_history().by_phone(phone)
+                       if manager is None or r['Manager'] == manager]
+            st.write(f'Обращений: {len(records)}')
+            if records:
+                st.dataframe(pd.DataFrame(records), hide_index=True)
+
+
+def model_status():
+    # Пока модель грузится, кнопка скоринга неактивна; фрагмент раз в секунду
+    # проверяет готовность и перезапускает страницу
+    if model_ready.is_set():
+        if live_model.version is None:
+            st.error(f'Модель не загружена: {live_model.last_error}')
+            return False
+        return True
+
+    @st.fragment(run_every=1)
+    def waiting():
+        if model_ready.is_set():
+            st.rerun()
+        st.info('Модель загружается...')
+
+    waiting()
+    return False
+
+
+def admin_section():
+    # Скрытая страница: ?admin=1 под учётной записью администратора
+    if st.query_params.get('admin') != '1':
+        return
+    with st.expander('Метрики', expanded=True):
+        if not tracing.ENABLED:
+            st.info('Замеры выключены (SCORING_TRACING=0)')
+            return
+        rows = [{'Стадия': name, 'N': p['count'],
+                 'p50, мс': p['p50'] and p['p50'] * 1000,
+                 'p95, мс': p['p95'] and p['p95'] * 1000,
+                 'p99, мс': p['p99'] and p['p99'] * 1000}
+                for name, p in tracing.percentiles().items()]
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+        monitor = drift.get_monitor()
+        if monitor is None:
+            st.info('Мониторинг дрейфа выключен: нет эталона (python drift.py reference ...)')
+        else:
+            report = monitor.status()
+            if any(state == 'alert' for state in report['state'].values()):
+                st.error('Дрейф: распределение входов или вероятностей заметно отличается от эталона')
+            st.dataframe(pd.DataFrame([{'Признак': name, 'PSI': value, 'Состояние': report['state'].get(name)}
+                                       for name, value in report['psi'].items()]), hide_index=True)
+        st.json({'model': live_model.status(), 'applicant_index': applicant_index.stats(),
+                 'microbatch': scoring_batcher.stats(), 'post_decision': post_pipeline.stats(),
+                 'prediction_cache': prediction_cache.stats()}, expanded=False)
+        st.download_button('metrics.prom', tracing.render_prometheus(), file_name='metrics.prom', mime='text/plain')
+
+
+def dashboard_section():
+    # Доля одобренных, средняя сумма и вероятность по разрезам — из агрегатов истории
+    from datetime import date, timedelta
+    from history import DIMENSIONS
+    labels = {'Manager': 'Менеджер', 'district': 'Филиал', 'duration': 'Срок', 'day': 'День'}
+    with st.expander('Дашборд'):
+        col1, col2, col3 = st.columns(3)
+        by = col1.selectbox('Разрез', list(DIMENSIONS), format_func=labels.get)
+        since = col2.date_input('С', value=date.today() - timedelta(days=30))
+        until = col3.date_input('По', value=date.today())
+        with stage('dashboard'):
+            rows = get_history().summary([by], since, until)
+            daily = get_history().summary(['day'], since, until)
+        if not rows:
+            st.info('За период нет заявок')
+        else:
+            frame = pd.DataFrame(rows).rename(columns={
+                by: labels[by], 'n': 'Заявок', 'approved': 'Одобрено', 'approval_rate': 'Доля одобренных',
+                'avg_amount': 'Средняя сумма', 'mean_probability': 'Средняя вероятность'})
+            st.dataframe(frame, hide_index=True)
+            st.line_chart(pd.DataFrame(daily).set_index('day')['approval_rate'])
+        if st.button('Пересчитать из истории'):
+            with st.spinner('Пересчёт...'):
+                get_history().rebuild_stats()
+            st.success('Агрегаты пересчитаны')
+        if st.button('Сверить с историей'):
+            mismatched = get_history().verify_stats()
+            if mismatched:
+                st.error(f'Расхождений: {mismatched}')
+            else:
+                st.success('Агрегаты совпадают с историей')
+
+
+def simulator_section():
+    # Что будет при другом пороге — по вероятностям из истории, без повторного скоринга
+    from datetime import date, timedelta
+    from simulator import get_simulator
+    labels = {None: 'Все', 'district': 'Филиал', 'Manager': 'Менеджер'}
+    with st.expander('Симулятор порога'):
+        col1, col2, col3 = st.columns(3)
+        by = col1.selectbox('Разрез', list(labels), format_func=labels.get, key='simulator_by')
+        since = col2.date_input('С', value=date.today() - timedelta(days=90), key='simulator_since')
+        until = col3.date_input('По', value=date.today(), key='simulator_until')
+        simulator = get_simulator(get_history(), by, since, until)
+        # «Сейчас» — решения из истории, каждое с порогом, который к нему применили
+        cutoff = st.slider('Порог вероятности возврата', 0.5, 0.99, float(cutoff_for()), step=0.005, format='%.3f')
+        now, then = simulator.at_recorded(), simulator.at(cutoff)
+        if not now['n']:
+            st.info('За период нет заявок')
+            return
+        col1, col2, col3 = st.columns(3)
+        col1.metric('Одобрено', then['approved'], then['approved'] - now['approved'])
+        col2.metric('Доля одобренных', f"{then['approval_rate']:.1%}",
+                    f"{(then['approval_rate'] - now['approval_rate']) * 100:+.1f} п.п.")
+        col3.metric('Объём', f"{then['volume']:,.0f}", f"{then['volume'] - now['volume']:+,.0f}")
+        curve = simulator.curve(np.linspace(0.5, 0.99, 99))
+        st.line_chart(pd.DataFrame({'Доля одобренных': curve['approval_rate'],
+                                    'Доля объёма': curve['volume'] / max(curve['volume'][0], 1)},
+                                   index=curve['cutoff']))
+        if by is not None:
+            rows = []
+            for row in simulator.table(cutoff):
+                recorded = simulator.at_recorded(row['group'])
+                low, high = recorded['cutoff'] or (None, None)
+                rows.append({labels[by]: row['group'], 'Заявок': row['n'], 'Одобрено': row['approved'],
+                             'Доля одобренных': row['approval_rate'], 'Объём': row['volume'],
+                             'Текущий порог': '' if low is None else f'{low:.3f}' if low == high else f'{low:.3f}–{high:.3f}',
+                             'Одобрено при текущем': recorded['approved']})
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+        st.caption('Изменения — против решений из истории, принятых с порогом каждой заявки. '
+                   'Пороги меняются в cutoffs.json и применяются без перезапуска')
+
+
+def batch_scoring_section(username, manager):
+    # Пакетный скоринг: файл с теми же колонками, что и форма; порог по филиалу каждой строки.
+    # Оценённые строки, как и решения формы, сохраняются в историю
+    with st.expander('Пакетный скоринг (CSV/XLSX)'):
+        uploaded = st.file_uploader('Файл с заявителями', type=['csv', 'xlsx'],
+                                    help='Колонки: age, amount, credit_history_count, district, duration, gender, marital_status')
+        documents = st.radio('Документы', ['Не формировать', 'ZIP (PDF на каждого)', 'Один PDF'], horizontal=True)
+        if uploaded is not None and st.button('Оценить файл'):
+            out = tempfile.TemporaryFile()
+            model = live_model.current()
+            try:
+                total, approved, rejected = score_file(model.model, uploaded, out, partial(cutoffs_for, username),
+                                                       filename=uploaded.name, model_version=model.version,
+                                                       manager=manager, record=get_history().record)
+            except ValueError as e:
+                st.error(str(e))
+                return
+            out.seek(0)
+            st.write(f'Оценено: {total - rejected}, одобрено: {approved}')
+            if rejected:
+                st.warning(f'Не оценено строк с ошибками: {rejected} (причина — в колонке Error)')
+            st.download_button(label="Скачать результаты",
+                               data=out,
+                               file_name="scoring_results.csv",
+                               mime='text/csv')
+            if documents != 'Не формировать':
+                from bulk_pdf import iter_records, write_merged, write_zip
+                out.seek(0)
+                # Строками, как в файле: колонка с пропуском не превращается в 24.0
+                records = iter_records(pd.read_csv(out, chunksize=CHUNK_SIZE, encoding='utf-8-sig',
+                                                   dtype=str, keep_default_na=False))
+                docs = tempfile.TemporaryFile()
+                with st.spinner('Формирование документов...'):
+                    try:
+                        if documents == 'Один PDF':
+                            write_merged(records, docs)
+                            file_name, mime = "scoring_documents.pdf", 'application/pdf'
+                        else:
+                            write_zip(records, docs)
+                            file_name, mime = "scoring_documents.zip", 'application/zip'
+                    except Exception as e:
+                        # Лимит одного PDF (ValueError) или ошибка отрисовки документа в воркере
+                        st.error(f'Документы не сформированы: {e}')
+                        return
+                docs.seek(0)
+                st.download_button(label="Скачать документы",
+                                   data=docs,
+                                   file_name=file_name,
+                                   mime=mime)
+
 
 if authentication_status:
     if username == "ulugbek":
@@ -70,91 +399,6 @@ if authentication_status:
         unsafe_allow_html=True,
     )
         authenticator.logout("Выход", "sidebar")
-        def generate_pdf(data, document_number, date):
-            # Create instance of FPDF class
-            pdf = FPDF()
-
-            # Add a page
-            pdf.add_page()
-
-            # Set font for the title
-            pdf.add_font('DejaVu', '', 'DejaVuSansCondensed.ttf', uni=True)
-            pdf.set_font('DejaVu', '', 14)
-
-            pdf.image('km_logo.png', x=15, y=15, w=40)
-            pdf.ln(20)
-            # Title
-            pdf.cell(200, 10, txt="Скоринг рассрочки",  ln=True, align='C')
-            pdf.ln(10)  # Add a little space after the title
-
-
-            # Define the variables list on the left side
-            # Mapping between internal variable names and human-readable names
-            variable_mapping = {
-                'Manager': 'Менеджер',
-                'district': 'Филиал',
-                'phone': 'Телефон номер',
-                'name': 'ФИО',
-                'age': 'Возраст',
-                'gender': 'Пол',
-                'amount': 'Сумма рассрочки',
-                'duration': 'Срок',
-                'marital_status': 'Семейное положение',
-                'credit_history_count': 'Количество кредитов(история)',
-                'Result': 'Результат',
-                'Probability': 'Вероятность возврата',
-                'Date': 'Дата',
-                'DocumentNumber': 'Номер документа'
-            }
-
-            var = ['Manager', 'district', 'phone', 'name', 'age', 'gender', 'amount', 'duration',
-                'marital_status', 'credit_history_count', 'Result', 'Probability', 'Date', 'DocumentNumber']
-
-            # Add content to the PDF using a table
-            pdf.set_fill_color(255, 255, 255)  # Set white fill color
-            col_width = 80
-            row_height = 10
-            x_position = (pdf.w - col_width * 2) / 2  # Calculate x position to center the table
-            y_position = pdf.get_y()
-            for var_name in var:
-                # Get the human-readable name corresponding to the internal variable name
-                variable = variable_mapping.get(var_name, '')
-                value = data.get(var_name, [''])[0]  # Get the value from data or empty string if not found
-                pdf.set_xy(x_position, y_position)
-                pdf.cell(col_width, row_height, txt=variable, border=1, fill=False)
-                pdf.cell(col_width, row_height, txt=str(value), border=1, fill=False)
-                pdf.ln(row_height)
-                y_position = pdf.get_y()
-            pdf.set_xy(x_position, pdf.get_y() + 20)  # Move down 10 units
-            pdf.cell(col_width, row_height, txt="Менеджер:", border=0, fill=False)
-            pdf.cell(col_width, row_height, txt="Директор:", border=0, fill=False)
-
-            # current_x = pdf.get_x()  # Get current X position
-            # current_y = pdf.get_y()  # Get current Y position
-
-            # # Calculate new positions with desired margins
-            # new_x = current_x -100 # Add 20mm to the right
-            # new_y = current_y + 15   # Subtract 5mm from the top (moving upwards)
-
-            # # Set new position
-            # pdf.set_xy(new_x, new_y)
-            # pdf.cell(0, 10, 'Менеджер:', 0, 0, 'L')
-            # pdf.cell(0, 10, 'Директор:', 0, 0, 'C')
-            # Output the cell
-            # pdf.cell(0, 10, txt="Подпись: ______________________", ln=True, align='R')
-
-            # Save the PDF to a file
-            pdf.output("result.pdf")
-
-            # Return the PDF file name or content depending on your requirement
-            with open("result.pdf", "rb") as pdf_file:
-                PDFbyte = pdf_file.read()
-
-            st.download_button(label="Скачать документ",
-                            data=PDFbyte,
-                            file_name="test.pdf",
-                            mime='application/octet-stream')
-
         st.image("km_logo.png", use_container_width=False, width=300)
         # Ввод данных с использованием инпутов
         st.title('Модель скоринга')
@@ -163,6 +407,8 @@ if authentication_status:
         top_left, top_right = st.columns((3, 1))
         prediction = None
         input_data = None
+        factors = None
+        post = None
         document_number = None
         current_date = None
         kredit = None
@@ -181,6 +427,7 @@ if authentication_status:
                     default_district = "Душанбе"  # Default district if no match found
 
                     district = district_options.get(manager, default_district)
+                    cutoff = cutoff_for(username, district)
 
                     # # Use district variable in your Streamlit app
                     # st.write(rf'$\textsf{{\normalsize Филиал}}$: {district}')
@@ -200,82 +447,31 @@ if authentication_status:
                 with col3:
 
                     phone = st.text_input(r'$\textsf{\normalsize Телефон номер}$', value=None, placeholder="928009292")
-                    credit_history_count = st.number_input(r'$\textsf{\normalsize Количество рассрочки (история клиента)}$', value=0, step=1)
+                    prior, prior_approved = find_prior(phone, name)
+                    credit_history_count = history_count_input(phone, prior_approved)
                     kredit = st.selectbox(r'$\textsf{\normalsize Активный кредит в других банках}$', ['Нет', "Да"])
-                    if st.button('Получить результат', type="primary"):
+                    if st.button('Получить результат', type="primary", disabled=not model_status()):
                         current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        document_number = f'Doc_{current_date.replace(" ", "_").replace(":", "_")}'
-                        mapping_dis = {
-                        "Душанбе": "dushanbe",
-                        "Худжанд": "khujand",
-                        "Пенджикент": "panjakent",
-                        "Джаббор Расулов": "j.rasulov",
-                        "Спитамен": "spitamen",
-                        "Исфара": "isfara"
-                        }
-                        mapping_mar = {
-                            'Женат/Замужем': 'married', 'Не женат/Не замужем':'single', 'Вдова/Вдовец':'widow/widower', 'Разведен':'divorced'
+                        document_number = document_number_for(current_date)
+                        applicant = {
+                            'Manager': manager, 'district': district, 'name': name, 'phone': phone,
+                            'age': age, 'gender': gender, 'amount': amount, 'duration': duration,
+                            'marital_status': marital_status, 'credit_history_count': credit_history_count,
                         }
-
-                        input_data = pd.DataFrame({
-                            'age': [age],
-                            'amount': [amount],
-                            'credit_history_count': [credit_history_count],
-                            'district': [mapping_dis[district]],
-                            'duration': [duration],
-                            'gender': [1 if gender == 'Мужчина' else 0],
-                            'marital_status': [mapping_mar[marital_status]],
-                        })
-
-                        prediction = model.predict_proba(input_data)[:, 0]
-
-
-                        input_data['Manager'] = manager
-                        input_data['district'] = district
-                        input_data['name'] = name
-                        # input_data['surname'] = surname
-                        input_data['phone'] = phone
-                        input_data['Result'] = 'Одобрено' if prediction > 1 - 0.11 else 'Отказано'
-                        input_data['gender'] = gender
-                        input_data['marital_status'] = marital_status
-                        input_data['Probability'] = f'{round(prediction[0]*100, 2)}%'
-                        input_data['Date'] = current_date
-                        input_data['DocumentNumber'] = document_number
+                        with stage('predict_proba'):
+                            probability, model_version = score_applicant(applicant)
+                            prediction = np.array([probability])
+                        with stage('dataframe'):
+                            input_data = pd.DataFrame([make_record(applicant, prediction[0], cutoff, current_date, document_number, model_version)])
+                        with stage('explain'):
+                            factors = explain_applicant(applicant)
+                            input_data['Factors'] = format_factors(factors)
+                        if kredit != "Да":
+                            post = start_post_decision(input_data)
+                            st.session_state.setdefault('scored_documents', set()).add(document_number)
+                with col4:
+                    prior_section(prior)
         with top_right:
-            def authenticate_gspread():
-                # Load Google Sheets API credentials
-                from  read_json import  response_json
-                response_ = response_json()
-                sa = gspread.service_account_from_dict(response_)
-                return sa
-
-            # Function to duplicate data to Google Sheets
-            def duplicate_to_gsheet(new_row):
-                # Authenticate with Google Sheets
-                gc = authenticate_gspread()
-
-                # Create a new Google Sheets spreadsheet
-                sh = gc.open("KreditMarket")
-
-                # Select the first sheet (index 0)
-                worksheet = sh.worksheet("Scoring")
-
-                # Check if there's any content in the worksheet
-                existing_data = worksheet.get_all_values()
-
-                # Get existing headers if they exist
-                headers = existing_data[0] if existing_data else None
-
-                if not headers:
-                    headers = ['Менеджер', 'Филиал', 'Телефон номер', 'ФИО', 'Возраст', 'Пол', 'Сумма кредита', 'Период', 'Семейное положение', 'Количество кредитов(история)', 'Результат', 'Вероятность возврата', 'Дата', 'Номер документа']
-                    worksheet.append_row(headers)
-
-                # Convert the new_row DataFrame to a list and append it to the worksheet
-                new_row = new_row[['Manager','district', 'phone', 'name', 'age', 'gender', 'amount', 'duration', 'marital_status', "credit_history_count",
-                                    'Result', 'Probability', 'Date', 'DocumentNumber']]
-                new_row_list = new_row.values.tolist()
-                worksheet.append_rows(new_row_list)
-
             # Предсказание
             st.subheader('Результат:')
             if kredit is not None:
@@ -284,7 +480,7 @@ if authentication_status:
                 else:
                     if prediction is not None:
                         st.write(f'Вероятность возврата: {round(prediction[0]*100, 2)}%')
-                        if prediction > 1 - 0.11:
+                        if prediction > cutoff:
                             if_success="Одобрено!"
                             htmlstr1=f"""<p style='background-color:green;
                                                                     color:white;
@@ -298,12 +494,18 @@ if authentication_status:
                             st.markdown(htmlstr1,unsafe_allow_html=True)
                             # st.success(r'$\textsf{\Large }$')
                             st.balloons()
-                            duplicate_to_gsheet(input_data)
                         else:
                             st.error(r'$\textsf{\Large Отказано! 😞}$')
-                            duplicate_to_gsheet(input_data)
 
-                        generate_pdf(input_data, document_number, current_date)
+                        factors_section(factors)
+                        generate_pdf(input_data, document_number, current_date, pdf=post.tasks['pdf'])
+            post_decision_status(post)
+
+        batch_scoring_section(username, manager)
+        history_section()
+        dashboard_section()
+        simulator_section()
+        admin_section()
     else:
         st.markdown(
         """
@@ -323,91 +525,6 @@ if authentication_status:
         unsafe_allow_html=True,
     )
         authenticator.logout("Выход", "sidebar")
-        def generate_pdf(data, document_number, date):
-            # Create instance of FPDF class
-            pdf = FPDF()
-
-            # Add a page
-            pdf.add_page()
-
-            # Set font for the title
-            pdf.add_font('DejaVu', '', 'DejaVuSansCondensed.ttf', uni=True)
-            pdf.set_font('DejaVu', '', 14)
-
-            pdf.image('km_logo.png', x=15, y=15, w=40)
-            pdf.ln(20)
-            # Title
-            pdf.cell(200, 10, txt="Скоринг рассрочки",  ln=True, align='C')
-            pdf.ln(10)  # Add a little space after the title
-
-
-            # Define the variables list on the left side
-            # Mapping between internal variable names and human-readable names
-            variable_mapping = {
-                'Manager': 'Менеджер',
-                'district': 'Филиал',
-                'phone': 'Телефон номер',
-                'name': 'ФИО',
-                'age': 'Возраст',
-                'gender': 'Пол',
-                'amount': 'Сумма рассрочки',
-                'duration': 'Срок',
-                'marital_status': 'Семейное положение',
-                'credit_history_count': 'Количество кредитов(история)',
-                'Result': 'Результат',
-                'Probability': 'Вероятность возврата',
-                'Date': 'Дата',
-                'DocumentNumber': 'Номер документа'
-            }
-
-            var = ['Manager', 'district', 'phone', 'name', 'age', 'gender', 'amount', 'duration',
-                'marital_status', 'credit_history_count', 'Result', 'Probability', 'Date', 'DocumentNumber']
-
-            # Add content to the PDF using a table
-            pdf.set_fill_color(255, 255, 255)  # Set white fill color
-            col_width = 80
-            row_height = 10
-            x_position = (pdf.w - col_width * 2) / 2  # Calculate x position to center the table
-            y_position = pdf.get_y()
-            for var_name in var:
-                # Get the human-readable name corresponding to the internal variable name
-                variable = variable_mapping.get(var_name, '')
-                value = data.get(var_name, [''])[0]  # Get the value from data or empty string if not found
-                pdf.set_xy(x_position, y_position)
-                pdf.cell(col_width, row_height, txt=variable, border=1, fill=False)
-                pdf.cell(col_width, row_height, txt=str(value), border=1, fill=False)
-                pdf.ln(row_height)
-                y_position = pdf.get_y()
-            pdf.set_xy(x_position, pdf.get_y() + 20)  # Move down 10 units
-            pdf.cell(col_width, row_height, txt="Менеджер:", border=0, fill=False)
-            pdf.cell(col_width, row_height, txt="Директор:", border=0, fill=False)
-
-            # current_x = pdf.get_x()  # Get current X position
-            # current_y = pdf.get_y()  # Get current Y position
-
-            # # Calculate new positions with desired margins
-            # new_x = current_x -100 # Add 20mm to the right
-            # new_y = current_y + 15   # Subtract 5mm from the top (moving upwards)
-
-            # # Set new position
-            # pdf.set_xy(new_x, new_y)
-            # pdf.cell(0, 10, 'Менеджер:', 0, 0, 'L')
-            # pdf.cell(0, 10, 'Директор:', 0, 0, 'C')
-            # Output the cell
-            # pdf.cell(0, 10, txt="Подпись: ______________________", ln=True, align='R')
-
-            # Save the PDF to a file
-            pdf.output("result.pdf")
-
-            # Return the PDF file name or content depending on your requirement
-            with open("result.pdf", "rb") as pdf_file:
-                PDFbyte = pdf_file.read()
-
-            st.download_button(label="Скачать документ",
-                            data=PDFbyte,
-                            file_name="test.pdf",
-                            mime='application/octet-stream')
-
         st.image("km_logo.png", use_container_width=False, width=300)
         # Ввод данных с использованием инпутов
         st.title('Модель скоринга')
@@ -416,6 +533,8 @@ if authentication_status:
         top_left, top_right = st.columns((3, 1))
         prediction = None
         input_data = None
+        factors = None
+        post = None
         document_number = None
         current_date = None
         kredit = None
@@ -434,6 +553,7 @@ if authentication_status:
                     default_district = "Душанбе"  # Default district if no match found
 
                     district = district_options.get(manager, default_district)
+                    cutoff = cutoff_for(username, district)
 
                     # # Use district variable in your Streamlit app
                     # st.write(rf'$\textsf{{\normalsize Филиал}}$: {district}')
@@ -454,82 +574,31 @@ if authentication_status:
                 with col3:
                     phone = st.text_input(r'$\textsf{\normalsize Телефон номер}$', value=None, placeholder="928009292")
 
-                    credit_history_count = st.number_input(r'$\textsf{\normalsize Количество рассрочки (история клиента)}$', value=0, step=1)
+                    prior, prior_approved = find_prior(phone, name)
+                    credit_history_count = history_count_input(phone, prior_approved)
                     kredit = st.selectbox(r'$\textsf{\normalsize Активный кредит в других банках}$', ['Нет', "Да"])
-                    if st.button('Получить результат', type="primary"):
+                    if st.button('Получить результат', type="primary", disabled=not model_status()):
                         current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        document_number = f'Doc_{current_date.replace(" ", "_").replace(":", "_")}'
-                        mapping_dis = {
-                        "Душанбе": "dushanbe",
-                        "Худжанд": "khujand",
-                        "Пенджикент": "panjakent",
-                        "Джаббор Расулов": "j.rasulov",
-                        "Спитамен": "spitamen",
-                        "Исфара": "isfara"
+                        document_number = document_number_for(current_date)
+                        applicant = {
+                            'Manager': manager, 'district': district, 'name': name, 'phone': phone,
+                            'age': age, 'gender': gender, 'amount': amount, 'duration': duration,
+                            'marital_status': marital_status, 'credit_history_count': credit_history_count,
                         }
-                        mapping_mar = {
-                            'Женат/Замужем': 'married', 'Не женат/Не замужем':'single', 'Вдова/Вдовец':'widow/widower', 'Разведен':'divorced'
-                        }
-
-                        input_data = pd.DataFrame({
-                            'age': [age],
-                            'amount': [amount],
-                            'credit_history_count': [credit_history_count],
-                            'district': [mapping_dis[district]],
-                            'duration': [duration],
-                            'gender': [1 if gender == 'Мужчина' else 0],
-                            'marital_status': [mapping_mar[marital_status]],
-                        })
-
-                        prediction = model.predict_proba(input_data)[:, 0]
-
-
-                        input_data['Manager'] = manager
-                        input_data['district'] = district
-                        input_data['name'] = name
-                        # input_data['surname'] = surname
-                        input_data['phone'] = phone
-                        input_data['Result'] = 'Одобрено' if prediction > 1 - 0.15 else 'Отказано'
-                        input_data['gender'] = gender
-                        input_data['marital_status'] = marital_status
-                        input_data['Probability'] = f'{round(prediction[0]*100, 2)}%'
-                        input_data['Date'] = current_date
-                        input_data['DocumentNumber'] = document_number
+                        with stage('predict_proba'):
+                            probability, model_version = score_applicant(applicant)
+                            prediction = np.array([probability])
+                        with stage('dataframe'):
+                            input_data = pd.DataFrame([make_record(applicant, prediction[0], cutoff, current_date, document_number, model_version)])
+                        with stage('explain'):
+                            factors = explain_applicant(applicant)
+                            input_data['Factors'] = format_factors(factors)
+                        if kredit != "Да":
+                            post = start_post_decision(input_data)
+                            st.session_state.setdefault('scored_documents', set()).add(document_number)
+                with col4:
+                    prior_section(prior)
         with top_right:
-            def authenticate_gspread():
-                # Load Google Sheets API credentials
-                from  read_json import  response_json
-                response_ = response_json()
-                sa = gspread.service_account_from_dict(response_)
-                return sa
-
-            # Function to duplicate data to Google Sheets
-            def duplicate_to_gsheet(new_row):
-                # Authenticate with Google Sheets
-                gc = authenticate_gspread()
-
-                # Create a new Google Sheets spreadsheet
-                sh = gc.open("KreditMarket")
-
-                # Select the first sheet (index 0)
-                worksheet = sh.worksheet("Scoring")
-
-                # Check if there's any content in the worksheet
-                existing_data = worksheet.get_all_values()
-
-                # Get existing headers if they exist
-                headers = existing_data[0] if existing_data else None
-
-                if not headers:
-                    headers = ['Менеджер', 'Филиал', 'Телефон номер', 'ФИО', 'Возраст', 'Пол', 'Сумма кредита', 'Период', 'Семейное положение', 'Количество кредитов(история)', 'Результат', 'Вероятность возврата', 'Дата', 'Номер документа']
-                    worksheet.append_row(headers)
-
-                # Convert the new_row DataFrame to a list and append it to the worksheet
-                new_row = new_row[['Manager','district', 'phone', 'name', 'age', 'gender', 'amount', 'duration', 'marital_status', "credit_history_count",
-                                    'Result', 'Probability', 'Date', 'DocumentNumber']]
-                new_row_list = new_row.values.tolist()
-                worksheet.append_rows(new_row_list)
-
             # Предсказание
             st.subheader('Результат:')
             if kredit is not None:
@@ -538,7 +607,7 @@ if authentication_status:
                 else:
                     if prediction is not None:
                         st.write(f'Вероятность возврата: {round(prediction[0]*100, 2)}%')
-                        if prediction > 1 - 0.15:
+                        if prediction > cutoff:
                             if_success="Одобрено!"
                             htmlstr1=f"""<p style='background-color:green;
                                                                     color:white;
@@ -552,11 +621,12 @@ if authentication_status:
                             st.markdown(htmlstr1,unsafe_allow_html=True)
                             # st.success(r'$\textsf{\Large }$')
                             st.balloons()
-                            generate_pdf(input_data, document_number, current_date)
-                            duplicate_to_gsheet(input_data)
                         else:
                             st.error(r'$\textsf{\Large Отказано! 😞}$')
-                            generate_pdf(input_data, document_number, current_date)
-                            duplicate_to_gsheet(input_data)
 
-                        # generate_pdf(input_data, document_number, current_date)
+                        factors_section(factors)
+                        generate_pdf(input_data, document_number, current_date, pdf=post.tasks['pdf'])
+            post_decision_status(post)
+
+        batch_scoring_section(username, manager)
+        history_section(manager)
@@ -0,0 +1,47 @@
+"""Дашборд: агрегаты, обновляемые триггером, против пересчёта по истории.
+
+    python -m benchmarks.bench_dashboard            # 1 000 000 записей (~2 года)
+    python -m benchmarks.bench_dashboard 200000
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_history import fill, median_ms, records
+from history import History, _STATS_VALUES
+
+
+def main(n=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        history = History(os.path.join(tmp, 'history.sqlite3'))
+        start = time.perf_counter()
+        fill(history, n)
+        print(f'{n} records written in {time.perf_counter() - start:.1f} s (aggregates maintained by trigger)')
+
+        batch = list(records(1000, seed=3))
+        for r in batch:
+            r['DocumentNumber'] += '_new'
+        start = time.perf_counter()
+        for r in batch:
+            history.record([r])
+        print(f'record() one by one: {(time.perf_counter() - start) / len(batch) * 1000:.3f} ms/record')
+
+        for by in (['Manager'], ['district'], ['duration'], ['day'], ['day', 'Manager']):
+            ms = median_ms(lambda: history.summary(by), 20)
+            print(f'summary({", ".join(by)}) over all time: {ms:.2f} ms')
+
+        def rescan():
+            with history._lock:
+                return history._conn.execute(
+                    f'SELECT "Manager", {_STATS_VALUES} FROM history GROUP BY "Manager"').fetchall()
+
+        print(f'same by rescanning history: {median_ms(rescan, 3):.0f} ms')
+        start = time.perf_counter()
+        history.rebuild_stats()
+        print(f'rebuild_stats: {time.perf_counter() - start:.1f} s, verify_stats mismatches: {history.verify_stats()}')
+        history.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,60 @@
+"""Мониторинг дрейфа: цена observe() на одно решение, память и срабатывание.
+
+Эталон строится по синтетическим заявкам; затем в монитор идёт тот же поток
+(PSI должен остаться низким) и поток с выросшими суммами и вероятностями
+(должна сработать тревога по amount и score).
+
+    python -m benchmarks.bench_drift
+"""
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.bench_fast_model import applicants
+from drift import DriftMonitor, build_reference
+
+
+def stream(n, seed, shift=False):
+    rng = np.random.default_rng(seed)
+    rows = applicants(n, seed)
+    scores = rng.beta(8, 2, n)
+    if shift:
+        for row in rows:
+            row['amount'] = int(row['amount'] * 1.8)
+        scores = rng.beta(14, 2, n)
+    return list(zip(rows, scores.tolist()))
+
+
+def main():
+    reference = build_reference(stream(20000, 0), 'synthetic')
+    alerts = []
+    monitor = DriftMonitor(reference, window=1000, on_alert=alerts.append)
+
+    rows = stream(50000, 1)
+    start = time.perf_counter()
+    for applicant, probability in rows:
+        monitor.observe(applicant, probability)
+    elapsed = time.perf_counter() - start
+    # Память после заполнения окна не растёт: ещё столько же решений под tracemalloc
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for applicant, probability in rows:
+        monitor.observe(applicant, probability)
+    grown = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f'observe(): {elapsed / len(rows) * 1e6:.1f} us per decision, '
+          f'memory growth over {len(rows)} more decisions: {grown} bytes')
+    print('same distribution, PSI:', monitor.status()['psi'])
+    assert not alerts
+
+    for applicant, probability in stream(1000, 2, shift=True):
+        monitor.observe(applicant, probability)
+    status = monitor.status()
+    print('shifted amount and score, PSI:', status['psi'])
+    print('alerts:', [(a['feature'], a['psi']) for a in alerts])
+    assert {a['feature'] for a in alerts} == {'amount', 'score'}
+
+
+if __name__ == '__main__':
+    main()
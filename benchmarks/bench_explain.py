@@ -0,0 +1,38 @@
+"""Объяснения решений: таблица листьев против прямого SHAP CatBoost.
+
+    python explain.py model.fast        # построить model.fast/shap.npz
+    python -m benchmarks.bench_explain
+"""
+import time
+
+import numpy as np
+
+import model_registry
+from benchmarks.bench_fast_model import APPLICANT, applicants, timed
+from explain import Explainer, format_factors, get_explainer, top_factors
+
+
+def main():
+    entry = model_registry.load_fast('model.pkl')
+    start = time.perf_counter()
+    table = get_explainer(entry)
+    print(f'load explainer (shap.npz): {(time.perf_counter() - start) * 1000:.0f} ms')
+    assert table.tables is not None, 'нет model.fast/shap.npz'
+    native = Explainer(entry.model)
+
+    batch = applicants(1000)
+    print(f'single row, CatBoost get_feature_importance: {timed(lambda: native.contributions([APPLICANT]), 20):.2f} ms')
+    print(f'single row, leaf table:                      {timed(lambda: table.contributions([APPLICANT]), 500):.3f} ms')
+    print(f'1000 rows, CatBoost get_feature_importance:  {timed(lambda: native.contributions(batch), 2):.0f} ms')
+    print(f'1000 rows, leaf table:                       {timed(lambda: table.contributions(batch), 10):.1f} ms')
+
+    # Те же числа, что у CatBoost, и сумма вкладов + ожидаемое = логарифм шансов возврата
+    print(f'max |Δ| vs CatBoost on 1000 rows: {np.abs(native.contributions(batch) - table.contributions(batch)).max():.3g}')
+    p = entry.model.predict_applicants(batch)
+    diff = np.abs(table.contributions(batch).sum(axis=1) + table.expected_value - np.log(p / (1 - p))).max()
+    print(f'max |Σ contributions + expected - log odds|: {diff:.3g}')
+    print('example:', format_factors(top_factors(table.contributions([APPLICANT])[0])))
+
+
+if __name__ == '__main__':
+    main()
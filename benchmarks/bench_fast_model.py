@@ -0,0 +1,55 @@
+"""Задержка скоринга: PyCaret-пайплайн против fast_model.FastModel.
+
+    python fast_model.py            # скомпилировать model.fast
+    python -m benchmarks.bench_fast_model
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import model_registry
+from fast_model import FastModel, fast_path_for
+from scoring import mapping_dis, mapping_mar, predict, prepare_features
+
+APPLICANT = {'age': 24, 'amount': 3000, 'credit_history_count': 1, 'district': 'Худжанд',
+             'duration': 6, 'gender': 'Мужчина', 'marital_status': 'Женат/Замужем'}
+
+
+def applicants(n, seed=0):
+    rng = np.random.default_rng(seed)
+    districts, maritals = list(mapping_dis), list(mapping_mar)
+    return [{'age': int(rng.integers(18, 70)), 'amount': int(rng.integers(300, 30000)),
+             'credit_history_count': int(rng.integers(0, 6)), 'district': districts[rng.integers(len(districts))],
+             'duration': int(rng.choice([3, 6, 9, 12])), 'gender': rng.choice(['Мужчина', 'Женщина']),
+             'marital_status': maritals[rng.integers(len(maritals))]} for _ in range(n)]
+
+
+def timed(fn, rounds):
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    pipeline = model_registry.get_model('model.pkl')
+    fast = FastModel.load(fast_path_for('model.pkl'))
+    batch = applicants(1000)
+
+    expected = predict(pipeline, prepare_features(pd.DataFrame(batch)))
+    diff = float(np.abs(expected - fast.predict_applicants(batch)).max())
+    print(f'max |Δp| on 1000 form inputs: {diff:.3g}')
+
+    single_old = timed(lambda: predict(pipeline, prepare_features(pd.DataFrame([APPLICANT]))), 50)
+    single_new = timed(lambda: fast.predict_applicants([APPLICANT]), 500)
+    batch_old = timed(lambda: predict(pipeline, prepare_features(pd.DataFrame(batch))), 5)
+    batch_new = timed(lambda: fast.predict_applicants(batch), 20)
+    print(f'{"":12} {"pipeline ms":>12} {"fast ms":>10}')
+    print(f'{"1 row":12} {single_old:12.3f} {single_new:10.3f}')
+    print(f'{"1000 rows":12} {batch_old:12.3f} {batch_new:10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Время до первой отрисовки формы входа в новом процессе.
+
+Каждый замер — отдельный процесс (как после перезапуска или деплоя): app.py
+выполняется через Streamlit AppTest для сессии без входа, то есть ровно до
+формы логина. Streamlit к этому моменту уже импортирован, как и в сервере.
+
+С --ref то же самое замеряется на другой ревизии (git worktree во временном
+каталоге) и печатаются оба числа — например, до ленивых импортов:
+
+    python -m benchmarks.bench_first_paint
+    python -m benchmarks.bench_first_paint --ref 6c23157^
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUNDS = 3
+
+SCRIPT = """
+import time
+from streamlit.testing.v1 import AppTest
+# Разовые расходы самого AppTest (поиск компонентов и т.п.) — на пустом скрипте
+AppTest.from_string('import streamlit as st; st.write(1)').run()
+at = AppTest.from_file('app.py', default_timeout=120)
+start = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - start
+assert not at.exception, at.exception
+print(elapsed)
+"""
+
+
+def first_paint(tree=BASE_DIR):
+    out = subprocess.run([sys.executable, '-c', SCRIPT], cwd=tree, capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError(out.stderr[-2000:])
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure(label, tree=BASE_DIR, rounds=ROUNDS):
+    samples = [first_paint(tree) for _ in range(rounds)]
+    print(f'{label}: time to login form: median {statistics.median(samples) * 1000:.0f} ms '
+          f'({", ".join(f"{s * 1000:.0f}" for s in samples)})')
+    return statistics.median(samples)
+
+
+def measure_ref(ref, rounds=ROUNDS):
+    # Ревизия целиком (app.py, модель, hashed_pw.pkl) — в отдельном worktree
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = os.path.join(tmp, 'tree')
+        subprocess.run(['git', 'worktree', 'add', '--detach', tree, ref], cwd=BASE_DIR, check=True,
+                       capture_output=True)
+        try:
+            return measure(ref, tree, rounds)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', tree], cwd=BASE_DIR, capture_output=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Время до первой отрисовки формы входа')
+    parser.add_argument('--ref', help='ревизия для сравнения, например 6c23157^')
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    args = parser.parse_args(argv)
+    before = measure_ref(args.ref, args.rounds) if args.ref else None
+    after = measure('working tree', rounds=args.rounds)
+    if before is not None:
+        print(f'{args.ref} -> working tree: {before * 1000:.0f} ms -> {after * 1000:.0f} ms ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Выборки из истории решений на большой таблице.
+
+    python -m benchmarks.bench_history            # 1 000 000 записей
+    python -m benchmarks.bench_history 200000
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from history import History
+from scoring import mapping_dis
+
+SURNAMES = ['Зокиров', 'Мирзоев', 'Нурматов', 'Махмадияров', 'Рахимов', 'Каримов', 'Сафаров', 'Юсупов',
+            'Шарипов', 'Назаров', 'Хасанов', 'Латипов', 'Саидов', 'Одинаев', 'Давлатов', 'Исмоилов']
+NAMES = ['Улугбек', 'Джамшед', 'Фаррух', 'Бахром', 'Камол', 'Шахноза', 'Мадина', 'Фируза', 'Рустам',
+         'Парвиз', 'Нигина', 'Зарина', 'Алишер', 'Сухроб', 'Манижа', 'Далер']
+MANAGERS = ["Зокиров Улугбек", "Мирзоев Чахонгир", "Нурматов Камолчон", "Махмадияров Бахром", "Менеджер Исфара"]
+
+
+def records(n, seed=0, days=730):
+    # Равномерно за два года, ~n/3 разных телефонов
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=days)
+    step = days * 86400 / n
+    for i in range(n):
+        date = (start + timedelta(seconds=i * step)).strftime('%Y-%m-%d %H:%M:%S')
+        probability = rng.uniform(0.6, 1.0)
+        yield {
+            'DocumentNumber': f'Doc_{date.replace(" ", "_").replace(":", "_")}_{i}', 'Date': date,
+            'Manager': rng.choice(MANAGERS), 'district': rng.choice(list(mapping_dis)),
+            'name': f'{rng.choice(SURNAMES)} {rng.choice(NAMES)} {rng.choice(NAMES)}ович',
+            'phone': f'9{rng.randrange(n // 3 or 1):08d}', 'age': rng.randint(18, 70), 'gender': 'Мужчина',
+            'amount': rng.randint(300, 30000), 'duration': rng.choice([3, 6, 9, 12]), 'marital_status': 'Женат/Замужем',
+            'credit_history_count': rng.randint(0, 5), 'Result': 'Одобрено' if probability > 0.85 else 'Отказано',
+            'Probability': f'{round(probability * 100, 2)}%',
+            'ModelVersion': '0a659fccb029',
+        }
+
+
+def fill(history, n, chunk=50000):
+    batch = []
+    for record in records(n):
+        batch.append(record)
+        if len(batch) >= chunk:
+            history.record(batch)
+            batch = []
+    history.record(batch)
+
+
+def median_ms(fn, rounds=200):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[rounds // 2] * 1000
+
+
+def main(n=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        history = History(os.path.join(tmp, 'history.sqlite3'))
+        start = time.perf_counter()
+        fill(history, n)
+        print(f'{history.count()} records written in {time.perf_counter() - start:.1f} s')
+
+        rng = random.Random(1)
+        phones = [f'9{rng.randrange(n // 3 or 1):08d}' for _ in range(1000)]
+        docs = [r['DocumentNumber'] for r in records(n) if rng.random() < 1000 / n]
+        since = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+        it = iter(range(10 ** 9))
+        print(f'applied_recently(phone, 30 days): {median_ms(lambda: history.applied_recently(phones[next(it) % 1000])):.3f} ms')
+        print(f'by_phone(phone):                  {median_ms(lambda: history.by_phone(phones[next(it) % 1000])):.3f} ms')
+        print(f'by_document(number):              {median_ms(lambda: history.by_document(docs[next(it) % len(docs)])):.3f} ms')
+        print(f'search(manager, district, 7 days):  '
+              f'{median_ms(lambda: history.search(MANAGERS[0], "Худжанд", since), 20):.3f} ms')
+        history.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,98 @@
+"""Подмена модели под нагрузкой: паузы в скоринге нет, битая версия не встаёт.
+
+Во временном хранилище публикуются две версии (вторая — тот же пайплайн,
+пересохранённый со сжатием), несколько потоков непрерывно скорят через
+LiveModel, в середине прогона активируется вторая версия, затем в CURRENT
+записывается версия с испорченным файлом.
+
+    python -m benchmarks.bench_hot_swap
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import joblib
+
+import model_registry
+from benchmarks.bench_fast_model import APPLICANT
+from model_store import CURRENT_FILE, LiveModel, ModelStore
+from scoring import predict_applicants
+
+THREADS = 4
+
+
+def main(duration=3.0):
+    import warnings
+    warnings.filterwarnings('ignore')
+    root = tempfile.mkdtemp(prefix='model-store-')
+    try:
+        store = ModelStore(os.path.join(root, 'models'))
+        v1 = store.publish('model.pkl', note='v1')
+        retrained = os.path.join(root, 'model.pkl')
+        joblib.dump(model_registry.get_model('model.pkl'), retrained, compress=3)
+        v2 = store.publish(retrained, note='v2')
+        store.activate(v1)
+
+        live = LiveModel(store, interval=0.05)
+        live.start().wait()
+        versions = Counter()
+        latencies = []
+        errors = []
+        stop = threading.Event()
+
+        def worker():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    entry = live.current()
+                    predict_applicants(entry.model, [APPLICANT])
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                latencies.append(time.perf_counter() - start)
+                versions[entry.version] += 1
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for t in threads:
+            t.start()
+        time.sleep(duration / 3)
+        before = len(latencies)
+        activated = time.perf_counter()
+        store.activate(v2)
+        while live.version != v2:
+            time.sleep(0.001)
+        swap_time = time.perf_counter() - activated
+        time.sleep(duration / 3)
+
+        # Испорченный файл: контрольная сумма не сходится, рабочая версия остаётся
+        with open(store.path(v1), 'ab') as f:
+            f.write(b'\0')
+        pointer = os.path.join(store.root, CURRENT_FILE)
+        with open(pointer + '.tmp', 'w') as f:
+            f.write(v1)
+        os.replace(pointer + '.tmp', pointer)
+        deadline = time.perf_counter() + 5
+        while v1 not in live.status()['rejected'] and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        time.sleep(duration / 3)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        steady = sorted(latencies[:before])
+        print(f'{len(latencies)} predictions in {THREADS} threads, errors: {len(errors)}')
+        print(f'by version: {dict(versions)}')
+        print(f'swap {v1} -> {v2}: visible after {swap_time * 1000:.0f} ms (load + checksums + canary in background)')
+        print(f'latency p50 {steady[len(steady) // 2] * 1000:.2f} ms before swap, '
+              f'max {max(steady) * 1000:.2f} ms before / {max(latencies[before:]) * 1000:.2f} ms after')
+        status = live.status()
+        print(f"corrupted {v1}: active {status['version']}, rejected {status['rejected']}, error: {status['last_error']}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Очередь выгрузки в Google Sheets против локальной замены gspread.
+
+    python -m benchmarks.bench_outbox
+"""
+import os
+import tempfile
+import time
+
+import sheets
+from benchmarks.bench_sheets import ROW
+from benchmarks.fake_gspread import FakeClient
+from outbox import Outbox
+
+RECORDS = 1000
+
+
+def main():
+    client = FakeClient(latency=0.05)
+    sheets.set_client(client)
+    worksheet = sheets.get_worksheet()
+    with tempfile.TemporaryDirectory() as tmp:
+        box = Outbox(os.path.join(tmp, 'outbox.sqlite3'), interval=0.05, base_backoff=0.05)
+        rows = [ROW[:-1] + [f'Doc_{i}'] for i in range(RECORDS)]
+
+        start = time.perf_counter()
+        for row in rows:
+            box.enqueue([row])
+        box.enqueue(rows[:10])  # повтор того же документа — должен отброситься
+        enqueue_ms = (time.perf_counter() - start) / RECORDS * 1000
+        print(f'enqueue: {enqueue_ms:.3f} ms/record, depth={box.depth()}')
+
+        worksheet.fail_next = 2  # две сетевые ошибки подряд
+        box.start()
+        while box.depth():
+            time.sleep(0.01)
+        box.stop()
+        print(box.stats())
+        print(f'sheet rows: {len(worksheet.rows)} (1 header + {RECORDS}), requests: {worksheet.requests}')
+    sheets.reset()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Документов скоринга в секунду: прежний generate_pdf против pdf_report.render_pdf.
+
+    python -m benchmarks.bench_pdf
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+from fpdf import FPDF
+
+import pdf_report
+
+ROUNDS = 10
+DATA = pd.DataFrame({
+    'Manager': ['Зокиров Улугбек'], 'district': ['Худжанд'], 'phone': ['928009292'], 'name': ['Тестов Тест'],
+    'age': [24], 'gender': ['Мужчина'], 'amount': [3000], 'duration': [6], 'marital_status': ['Женат/Замужем'],
+    'credit_history_count': [0], 'Result': ['Одобрено'], 'Probability': ['93.74%'],
+    'Date': ['2024-01-01 10:00:00'], 'DocumentNumber': ['Doc_2024-01-01_10_00_00'],
+})
+
+
+def old_generate_pdf(data):
+    # Прежний путь: новый шрифт и логотип на каждый документ, общий result.pdf на диске
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.add_font('DejaVu', '', 'DejaVuSansCondensed.ttf', uni=True)
+    pdf.set_font('DejaVu', '', 14)
+    pdf.image('km_logo.png', x=15, y=15, w=40)
+    pdf.ln(20)
+    pdf.cell(200, 10, txt="Скоринг рассрочки", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_fill_color(255, 255, 255)
+    x_position = (pdf.w - 80 * 2) / 2
+    y_position = pdf.get_y()
+    for var_name in pdf_report.var:
+        pdf.set_xy(x_position, y_position)
+        pdf.cell(80, 10, txt=pdf_report.variable_mapping[var_name], border=1, fill=False)
+        pdf.cell(80, 10, txt=str(data.get(var_name, [''])[0]), border=1, fill=False)
+        pdf.ln(10)
+        y_position = pdf.get_y()
+    pdf.set_xy(x_position, pdf.get_y() + 20)
+    pdf.cell(80, 10, txt="Менеджер:", border=0, fill=False)
+    pdf.cell(80, 10, txt="Директор:", border=0, fill=False)
+    pdf.output("result.pdf")
+    with open("result.pdf", "rb") as pdf_file:
+        return pdf_file.read()
+
+
+def docs_per_second(fn):
+    fn(DATA)  # прогрев
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(DATA)
+    return ROUNDS / (time.perf_counter() - start)
+
+
+def main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Прежний код пишет result.pdf и кэш метрик шрифта в рабочую папку
+        shutil.copy(pdf_report.FONT_PATH, tmp)
+        shutil.copy(pdf_report.LOGO_PATH, tmp)
+        os.chdir(tmp)
+        try:
+            old = docs_per_second(old_generate_pdf)
+        finally:
+            os.chdir(cwd)
+    new = docs_per_second(pdf_report.render_pdf)
+    print(f'before: {old:8.1f} docs/s')
+    print(f'after:  {new:8.1f} docs/s  (x{new / old:.1f})')
+
+
+if __name__ == '__main__':
+    main()
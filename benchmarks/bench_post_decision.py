@@ -0,0 +1,117 @@
+"""Время до вердикта не зависит от задержки выгрузки в Google Sheets.
+
+Выгрузка идёт прямо в лист (sheets.duplicate_to_gsheet, без очереди) через
+медленную локальную замену gspread: каждый запрос ждёт latency секунд.
+
+1. Пайплайн: последовательно (PDF, история, выгрузка — как было в app.py)
+   против post_decision — вердикт и документ готовы, пока выгрузка ещё идёт.
+2. Streamlit AppTest: нажатие «Получить результат» целиком, с выгрузкой
+   без задержки и с задержкой; ошибка выгрузки видна менеджеру, документ есть.
+
+    python -m benchmarks.bench_post_decision
+"""
+import os
+import tempfile
+import time
+import warnings
+from functools import partial
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP = tempfile.mkdtemp()
+os.environ.setdefault('HISTORY_PATH', os.path.join(TMP, 'history.sqlite3'))
+
+import pandas as pd  # noqa: E402
+
+import sheets  # noqa: E402
+from benchmarks.fake_gspread import FakeClient  # noqa: E402
+from history import get_history  # noqa: E402
+from pdf_report import render_pdf  # noqa: E402
+from post_decision import Pipeline  # noqa: E402
+from scoring import make_record  # noqa: E402
+
+APPLICANT = {'Manager': 'Зокиров Улугбек', 'district': 'Худжанд', 'name': 'Иванов Иван', 'phone': '928009292',
+             'age': 24, 'gender': 'Мужчина', 'amount': 3000, 'duration': 6,
+             'marital_status': 'Женат/Замужем', 'credit_history_count': 1}
+LATENCIES = [0.0, 0.25, 1.0]
+
+
+def record(i):
+    return pd.DataFrame([make_record(APPLICANT, 0.93, 0.85, '2026-10-18 10:00:00', f'Doc_bench_{i}', 'bench')])
+
+
+def pipeline(pool, latency, i):
+    sheets.set_client(FakeClient(latency))
+    data = record(i)
+
+    start = time.perf_counter()
+    render_pdf(data)
+    get_history().record(data)
+    sheets.duplicate_to_gsheet(data)
+    sequential = time.perf_counter() - start
+
+    data = record(i + 1000)
+    start = time.perf_counter()
+    post = pool.start({'pdf': partial(render_pdf, data), 'history': partial(get_history().record, data),
+                       'export': partial(sheets.duplicate_to_gsheet, data)})
+    verdict = time.perf_counter() - start
+    post.result('pdf')
+    document = time.perf_counter() - start
+    post.wait()
+    done = time.perf_counter() - start
+    assert not post.failures(), post.failures()
+    return sequential, verdict, document, done
+
+
+def click(latency, fail=False):
+    from streamlit.testing.v1 import AppTest
+    import model_store
+    client = FakeClient(latency)
+    sheets.set_client(client)
+    if fail:
+        client.open(sheets.SPREADSHEET).worksheet(sheets.WORKSHEET).fail_next = 1
+    at = AppTest.from_file(os.path.join(BASE_DIR, 'app.py'), default_timeout=120)
+    at.session_state['authentication_status'] = True
+    at.session_state['username'] = 'ulugbek'
+    at.session_state['name'] = 'Зокиров Улугбек'
+    at.run()
+    model_store.live.start().wait()
+    at.run()
+    start = time.perf_counter()
+    at.button[0].click().run()
+    elapsed = time.perf_counter() - start
+    assert not at.exception, at.exception
+    assert [b for b in at.get('download_button')], 'нет кнопки документа'
+    shown = [w.value for w in at.warning]
+    # Незавершённая к концу скрипта выгрузка проверяется на следующем rerun
+    time.sleep(latency * 5 + 0.5)
+    at.run()
+    return elapsed, shown + [w.value for w in at.warning]
+
+
+def main():
+    warnings.filterwarnings('ignore')
+    pool = Pipeline()
+    pipeline(pool, 0.0, 100)  # прогрев: шрифты, база истории
+    print('latency  sequential  verdict  pdf ready  all done   (ms)')
+    for i, latency in enumerate(LATENCIES):
+        sequential, verdict, document, done = pipeline(pool, latency, i)
+        print(f'{latency:5.2f} s  {sequential * 1000:10.0f}  {verdict * 1000:7.2f}  {document * 1000:9.1f}  {done * 1000:8.0f}')
+        assert document < 0.5, 'документ ждал выгрузку'
+
+    # app.py ставит в очередь outbox.duplicate_to_gsheet; здесь — прямая выгрузка в медленный лист
+    with mock.patch('outbox.duplicate_to_gsheet', sheets.duplicate_to_gsheet):
+        click(0.0)  # прогрев: модель, шрифты
+        fast, _ = click(0.0)
+        slow, _ = click(1.0)
+        print(f'AppTest click -> verdict and document: export latency 0 s: {fast * 1000:.0f} ms, '
+              f'1 s per request: {slow * 1000:.0f} ms')
+        assert slow - fast < 0.5, 'вердикт ждал выгрузку'
+        _, shown = click(0.0, fail=True)
+        print('export failure shown to manager:', shown)
+        assert any('Google Sheets' in w for w in shown)
+    sheets.reset()
+
+
+if __name__ == '__main__':
+    main()
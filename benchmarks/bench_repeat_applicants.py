@@ -0,0 +1,49 @@
+"""Поиск повторных заявителей: построение индекса и задержка поиска на rerun.
+
+    python -m benchmarks.bench_repeat_applicants            # 1 000 000 записей истории
+    python -m benchmarks.bench_repeat_applicants 200000
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_history import NAMES, SURNAMES, fill, median_ms, records
+from history import History
+from repeat_applicants import ApplicantIndex
+
+
+def main(n=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        history = History(os.path.join(tmp, 'history.sqlite3'))
+        fill(history, n)
+        index = ApplicantIndex(history)
+        start = time.perf_counter()
+        index.start().wait()
+        print(f'index over {n} records built in {time.perf_counter() - start:.1f} s: {index.stats()}')
+
+        rng = random.Random(1)
+        phones = [f'+992 9{rng.randrange(n // 3 or 1):08d}' for _ in range(1000)]
+        names = [f'{rng.choice(NAMES)} {rng.choice(SURNAMES).lower()}  {rng.choice(NAMES)}ович' for _ in range(1000)]
+        it = iter(range(10 ** 9))
+        print(f'lookup(phone):          {median_ms(lambda: index.lookup(phones[next(it) % 1000])):.3f} ms')
+        print(f'lookup(phone, name):    '
+              f'{median_ms(lambda: index.lookup(phones[next(it) % 1000], names[next(it) % 1000])):.3f} ms')
+        # Одна опечатка в фамилии: находится через индекс удалений, без перебора имён
+        typos = [f'{rng.choice(NAMES)} {rng.choice(SURNAMES)[:-1]}  {rng.choice(NAMES)}ович' for _ in range(1000)]
+        print(f'lookup(name with typo): {median_ms(lambda: index.lookup(None, typos[next(it) % 1000])):.3f} ms')
+        print(f'approved_count(phone):  {median_ms(lambda: index.approved_count(phones[next(it) % 1000])):.3f} ms')
+
+        # Новая запись (другой процесс или эта же сессия) видна следующему поиску
+        record = next(records(1, seed=2))
+        record.update(DocumentNumber='Doc_new', phone='+992 900 00 00 01', name='Новый Заявитель')
+        history.record([record])
+        start = time.perf_counter()
+        found = index.lookup('900000001')
+        print(f'incremental refresh + lookup: {(time.perf_counter() - start) * 1000:.3f} ms, found {len(found)}')
+        history.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,53 @@
+"""Задержка добавления строки в лист Scoring в зависимости от размера листа.
+
+    python -m benchmarks.bench_sheets
+"""
+import time
+
+import sheets
+from benchmarks.fake_gspread import FakeClient
+
+SIZES = [0, 1000, 10000, 100000]
+ROUNDS = 50
+ROW = ['Зокиров Улугбек', 'Худжанд', '928009292', 'Тест', 24, 'Мужчина', 3000, 6, 'Женат/Замужем', 0,
+       'Одобрено', '93.74%', '2024-01-01 10:00:00', 'Doc_2024-01-01_10_00_00']
+
+
+def old_append(client, row):
+    # Прежний duplicate_to_gsheet: open -> worksheet -> get_all_values -> append
+    worksheet = client.open(sheets.SPREADSHEET).worksheet(sheets.WORKSHEET)
+    existing_data = worksheet.get_all_values()
+    if not (existing_data[0] if existing_data else None):
+        worksheet.append_row(sheets.HEADERS)
+    worksheet.append_rows([row])
+
+
+def prefill(client, size):
+    worksheet = client.open(sheets.SPREADSHEET).worksheet(sheets.WORKSHEET)
+    worksheet.rows = [list(sheets.HEADERS)] + [list(ROW) for _ in range(size)]
+
+
+def measure(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+def main():
+    print(f'{"rows":>8} {"old ms":>10} {"new ms":>10}')
+    for size in SIZES:
+        client = FakeClient()
+        prefill(client, size)
+        old = measure(lambda: old_append(client, ROW))
+
+        client = FakeClient()
+        prefill(client, size)
+        sheets.set_client(client)
+        new = measure(lambda: sheets.append_rows([ROW]))
+        sheets.reset()
+        print(f'{size:>8} {old:>10.3f} {new:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Симулятор порога: бинарный поиск по отсортированным вероятностям против
+прямого подсчёта (p > cutoff).sum() на каждый порог.
+
+    python -m benchmarks.bench_simulator            # 1 000 000 заявок
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_history import median_ms
+from scoring import mapping_dis
+from simulator import ThresholdSimulator
+
+
+def main(n=1000000):
+    rng = np.random.default_rng(0)
+    probabilities = rng.beta(8, 2, n)
+    amounts = rng.integers(300, 30000, n).astype(float)
+    districts = rng.choice(list(mapping_dis), n)
+    # Как cutoffs.json: у одной учётной записи свой порог, у одного филиала — свой
+    applied = np.where(rng.random(n) < 0.3, 0.89, np.where(districts == 'Худжанд', 0.8, 0.85))
+
+    start = time.perf_counter()
+    simulator = ThresholdSimulator(probabilities, amounts, districts, applied)
+    print(f'build over {n} scores with {len(simulator.groups())} groups: {(time.perf_counter() - start) * 1000:.0f} ms')
+
+    cutoffs = np.linspace(0.5, 0.99, 1000)
+    it = iter(range(10 ** 9))
+    print(f'at(cutoff):               {median_ms(lambda: simulator.at(cutoffs[next(it) % 1000])):.4f} ms')
+    print(f'at(cutoff, district):     {median_ms(lambda: simulator.at(cutoffs[next(it) % 1000], "Худжанд")):.4f} ms')
+    print(f'curve(1000 cutoffs):      {median_ms(lambda: simulator.curve(cutoffs), 50):.3f} ms')
+    print(f'at_recorded():            {median_ms(lambda: simulator.at_recorded(), 20):.3f} ms')
+    print(f'direct count, 1 cutoff:   {median_ms(lambda: (probabilities > 0.85).sum(), 20):.3f} ms')
+    print(f'direct count, 1000 cutoffs: {median_ms(lambda: [(probabilities > c).sum() for c in cutoffs], 3):.0f} ms')
+
+    # Те же числа, что и прямой подсчёт
+    for c in (0.5, 0.85, 0.89, 0.99):
+        expected = probabilities > c
+        got = simulator.at(c)
+        assert got['approved'] == expected.sum() and np.isclose(got['volume'], amounts[expected].sum())
+    expected = probabilities > applied
+    got = simulator.at_recorded()
+    assert got['approved'] == expected.sum() and np.isclose(got['volume'], amounts[expected].sum())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
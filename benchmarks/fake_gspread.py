@@ -0,0 +1,87 @@
+import threading
+import time
+
+import gspread
+
+
+# Локальная замена gspread: Client.open -> Spreadsheet.worksheet -> Worksheet.
+# Каждый запрос ждёт latency секунд, get_all_values копирует весь лист,
+# как настоящий API, который отдаёт все строки по сети.
+class FakeWorksheet:
+    def __init__(self, title, latency=0.0):
+        self.title = title
+        self.latency = latency
+        self.rows = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.fail_next = 0
+
+    def _request(self):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_next:
+            self.fail_next -= 1
+            raise gspread.exceptions.GSpreadException('fake API error')
+
+    def get_all_values(self):
+        self._request()
+        with self._lock:
+            return [list(map(str, row)) for row in self.rows]
+
+    def row_values(self, row):
+        self._request()
+        with self._lock:
+            return [str(v) for v in self.rows[row - 1]] if len(self.rows) >= row else []
+
+    def col_values(self, col):
+        self._request()
+        with self._lock:
+            return [str(row[col - 1]) if len(row) >= col else '' for row in self.rows]
+
+    def update(self, range_name, values, **kwargs):
+        # Только строка, начиная с ячейки вида 'O1'
+        self._request()
+        row, col = gspread.utils.a1_to_rowcol(range_name)
+        with self._lock:
+            while len(self.rows) < row:
+                self.rows.append([])
+            for i, value in enumerate(values[0], col - 1):
+                line = self.rows[row - 1]
+                line.extend([''] * (i + 1 - len(line)))
+                line[i] = value
+
+    def append_row(self, values, **kwargs):
+        self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self._request()
+        with self._lock:
+            self.rows.extend(list(v) for v in values)
+
+
+class FakeSpreadsheet:
+    def __init__(self, title, latency=0.0):
+        self.title = title
+        self.latency = latency
+        self._worksheets = {}
+
+    def worksheet(self, title):
+        if self.latency:
+            time.sleep(self.latency)
+        if title not in self._worksheets:
+            self._worksheets[title] = FakeWorksheet(title, self.latency)
+        return self._worksheets[title]
+
+
+class FakeClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._spreadsheets = {}
+
+    def open(self, title):
+        if self.latency:
+            time.sleep(self.latency)
+        if title not in self._spreadsheets:
+            self._spreadsheets[title] = FakeSpreadsheet(title, self.latency)
+        return self._spreadsheets[title]
@@ -0,0 +1,90 @@
+"""Нагрузочный тест HTTP API скоринга.
+
+    python api_clients.py add load-test --district Худжанд   # печатает ключ
+    uvicorn api:app --port 8000 &
+    python -m benchmarks.load_api --url http://127.0.0.1:8000 --token <ключ> --concurrency 8 --requests 2000
+"""
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+APPLICANT = {
+    'Manager': 'Зокиров Улугбек', 'district': 'Худжанд', 'name': 'Тест', 'phone': '928009292',
+    'age': 24, 'gender': 'Мужчина', 'amount': 3000, 'duration': 6,
+    'marital_status': 'Женат/Замужем', 'credit_history_count': 0,
+}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def worker(url, path, body, count, latencies, errors, token=None):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--token', default=os.environ.get('API_TOKEN'), help='ключ клиента API (api_clients.py add)')
+    parser.add_argument('--batch', type=int, default=0, help='размер пачки для /score/batch (0 — /score)')
+    args = parser.parse_args()
+
+    if args.batch:
+        path, body = '/score/batch', json.dumps({'applicants': [APPLICANT] * args.batch})
+    else:
+        path, body = '/score', json.dumps(APPLICANT)
+    per_worker = max(1, args.requests // args.concurrency)
+    latencies, errors = [], []
+    threads = [threading.Thread(target=worker, args=(args.url, path, body, per_worker, latencies, errors, args.token))
+               for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    ms = [x * 1000 for x in latencies]
+    print(json.dumps({
+        'endpoint': path,
+        'concurrency': args.concurrency,
+        'requests': len(latencies) + len(errors),
+        'errors': len(errors),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(ms, 50), 2),
+        'p95_ms': round(percentile(ms, 95), 2),
+        'p99_ms': round(percentile(ms, 99), 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""Нагрузочный прогон Streamlit-приложения: N менеджеров одновременно в одном процессе.
+
+Каждая сессия — Streamlit AppTest над app.py в своём потоке, как сессии
+сервера Streamlit: вход через stauth.Authenticate (настоящая проверка bcrypt;
+пользователи load_N добавляются к hashed_pw.pkl в памяти), заполнение формы
+(каждое поле — rerun, как в браузере) и «Получить результат» с проверкой, что
+показан вердикт и кнопка документа. Ключ сервисного аккаунта (read_json) и
+gspread заменены локальными (benchmarks.fake_gspread с задержкой
+--sheet-latency), история и очередь выгрузки — во временном каталоге.
+
+По каждому уровню параллельности: решений в секунду, p50/p95/p99 входа,
+rerun при заполнении и решения, пиковый RSS процесса, доля ошибок. AppTest
+сам разбирает дерево элементов, поэтому задержки — верхняя оценка для сервера.
+
+    python -m benchmarks.load_app --levels 1,2,4,8 --decisions 5
+    python -m benchmarks.load_app --levels 16 --sessions 2 --output load.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import pickle
+import random
+import tempfile
+import threading
+import time
+import traceback
+import warnings
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP = tempfile.mkdtemp()
+os.environ.setdefault('HISTORY_PATH', os.path.join(TMP, 'history.sqlite3'))
+
+import bcrypt  # noqa: E402
+
+import model_registry  # noqa: E402
+import outbox  # noqa: E402
+import read_json  # noqa: E402
+import sheets  # noqa: E402
+from benchmarks.bench_history import MANAGERS, NAMES, SURNAMES  # noqa: E402
+from benchmarks.fake_gspread import FakeClient  # noqa: E402
+from benchmarks.load_api import percentile  # noqa: E402
+
+PASSWORD = 'load-test'
+FAKE_KEY = {'type': 'service_account', 'project_id': 'load-test', 'client_email': 'load@test.invalid'}
+MAX_USERS = 256
+
+
+def _credentials_with_test_users():
+    # Тот же bcrypt (12 раундов), что в hashed_pw.pkl: вход стоит столько же, сколько настоящий
+    password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(12)).decode()
+    users = {f'load_{i}': {'name': MANAGERS[i % len(MANAGERS)], 'password': password} for i in range(MAX_USERS)}
+    real_load = pickle.load
+
+    def load(file, *args, **kwargs):
+        data = real_load(file, *args, **kwargs)
+        if isinstance(data, dict) and 'usernames' in data:
+            data['usernames'].update(users)
+        return data
+    return load
+
+
+@contextlib.contextmanager
+def _one_runtime():
+    # AppTest.run() на время прогона ставит глобальный Runtime._instance и
+    # патчит config.get_option, а в конце сбрасывает их — параллельные сессии
+    # сбрасывали это друг другу посреди скрипта. И каждый run компилирует
+    # app.py заново, а параллельный compile() в CPython 3.11 падает с
+    # SystemError. Здесь, как на сервере, один Runtime (медиафайлы, кэши) и
+    # один ScriptCache на все сессии; AppTest пишет Runtime в подкласс.
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    runtime = mock.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    runtime.bidi_component_registry = BidiComponentManager()
+    runtime.bidi_component_registry.discover_and_register_components(start_file_watching=False)
+    script_cache = ScriptCache()
+    Runtime._instance = runtime
+    try:
+        with patch_config_options({'global.appTest': True}), \
+                mock.patch.object(app_test, 'Runtime', type('SessionRuntime', (Runtime,), {})), \
+                mock.patch.object(app_test, 'ScriptCache', lambda: script_cache), \
+                mock.patch.object(local_script_runner, 'ScriptCache', lambda: script_cache), \
+                mock.patch.object(app_test, 'patch_config_options', lambda overrides: contextlib.nullcontext()):
+            yield
+    finally:
+        Runtime._instance = None
+
+
+def _widget(elements, label):
+    return next(e for e in elements if label in e.label)
+
+
+class Session:
+    """Один менеджер: вход, затем decisions раз форма и «Получить результат»."""
+
+    def __init__(self, username, seed):
+        from streamlit.testing.v1 import AppTest
+        self.username = username
+        self.rng = random.Random(seed)
+        self.at = AppTest.from_file(os.path.join(BASE_DIR, 'app.py'), default_timeout=120)
+
+    def _run(self, widget=None):
+        (widget or self.at).run()
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def login(self):
+        self._run()
+        self.at.text_input[0].input(self.username)
+        self.at.text_input[1].input(PASSWORD)
+        self._run(self.at.button[0].click())
+        if self.at.session_state['authentication_status'] is not True:
+            raise RuntimeError('вход не выполнен')
+
+    def fill(self, reruns):
+        # Элементы ищутся заново после каждого rerun: старое дерево держит снятые виджеты
+        rng = self.rng
+        for kind, label, value in [
+                ('text_input', 'ФИО', f'{rng.choice(SURNAMES)} {rng.choice(NAMES)}'),
+                ('text_input', 'Телефон', f'9{rng.randrange(10 ** 8):08d}'),
+                ('number_input', 'Возраст', rng.randint(18, 70)),
+                ('number_input', 'Сумма рассрочки', rng.randint(300, 30000))]:
+            start = time.perf_counter()
+            self._run(_widget(getattr(self.at, kind), label).set_value(value))
+            reruns.append(time.perf_counter() - start)
+
+    def decide(self):
+        self._run(_widget(self.at.button, 'Получить результат').click())
+        shown = [e.value for e in self.at.markdown] + [e.value for e in self.at.error]
+        if not any('Вероятность' in v or 'Отказано' in v for v in shown):
+            raise RuntimeError('нет вердикта')
+        if not self.at.get('download_button'):
+            raise RuntimeError('нет кнопки документа')
+
+
+class RssSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = model_registry._rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, model_registry._rss_bytes())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def worker(index, sessions, decisions, stats):
+    for s in range(sessions):
+        try:
+            session = Session(f'load_{index % MAX_USERS}', seed=index * 1000 + s)
+            start = time.perf_counter()
+            session.login()
+            stats['login'].append(time.perf_counter() - start)
+        except Exception:
+            stats['errors'].append(traceback.format_exc(limit=1))
+            continue
+        for _ in range(decisions):
+            try:
+                session.fill(stats['rerun'])
+                start = time.perf_counter()
+                session.decide()
+                stats['decision'].append(time.perf_counter() - start)
+            except Exception:
+                stats['errors'].append(traceback.format_exc(limit=1))
+
+
+def run_level(concurrency, sessions, decisions):
+    stats = {'login': [], 'rerun': [], 'decision': [], 'errors': []}
+    threads = [threading.Thread(target=worker, args=(i, sessions, decisions, stats), name=f'manager-{i}')
+               for i in range(concurrency)]
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    attempts = concurrency * sessions * (1 + decisions)
+    ms = lambda values, q: round(percentile(values, q) * 1000, 1)
+    return {
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 2),
+        'decisions': len(stats['decision']),
+        'decisions_per_s': round(len(stats['decision']) / elapsed, 2),
+        'login_p50_ms': ms(stats['login'], 50), 'login_p95_ms': ms(stats['login'], 95),
+        'rerun_p50_ms': ms(stats['rerun'], 50), 'rerun_p95_ms': ms(stats['rerun'], 95),
+        'decision_p50_ms': ms(stats['decision'], 50), 'decision_p95_ms': ms(stats['decision'], 95),
+        'decision_p99_ms': ms(stats['decision'], 99),
+        'error_rate': round(len(stats['errors']) / attempts, 4),
+        'errors': sorted(set(e.strip().splitlines()[-1] for e in stats['errors']))[:5],
+        'peak_rss_mb': round(rss.peak / 2 ** 20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--levels', default='1,2,4,8', help='уровни параллельности через запятую')
+    parser.add_argument('--sessions', type=int, default=1, help='сессий (входов) на поток')
+    parser.add_argument('--decisions', type=int, default=5, help='решений на сессию')
+    parser.add_argument('--sheet-latency', type=float, default=0.2, help='задержка запроса к fake gspread, с')
+    parser.add_argument('--output', help='записать результаты в JSON')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    sheets.set_client(FakeClient(args.sheet_latency))
+    outbox._outbox = outbox.Outbox(os.path.join(TMP, 'outbox.sqlite3')).start()
+    read_json.provider.fetch = lambda: FAKE_KEY
+    levels = [int(level) for level in args.levels.split(',')]
+    if max(levels) > MAX_USERS:
+        parser.error(f'не больше {MAX_USERS} сессий одновременно')
+
+    results = []
+    with _one_runtime(), mock.patch('pickle.load', _credentials_with_test_users()), \
+            mock.patch('read_json.response_json', lambda: FAKE_KEY):
+        run_level(1, 1, 1)  # прогрев: импорты, модель, шрифты
+        print('conc  dec/s  login p50/p95   rerun p50/p95   decision p50/p95/p99   errors  peak RSS')
+        for level in levels:
+            r = run_level(level, args.sessions, args.decisions)
+            results.append(r)
+            print(f"{level:4d}  {r['decisions_per_s']:5.1f}  {r['login_p50_ms']:6.0f}/{r['login_p95_ms']:<6.0f}  "
+                  f"{r['rerun_p50_ms']:6.0f}/{r['rerun_p95_ms']:<6.0f}  "
+                  f"{r['decision_p50_ms']:6.0f}/{r['decision_p95_ms']:.0f}/{r['decision_p99_ms']:<6.0f}  "
+                  f"{r['error_rate']:6.1%}  {r['peak_rss_mb']:.0f} MB")
+            for error in r['errors']:
+                print('      ', error)
+    outbox._outbox.stop()
+    sheets.reset()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Набор бенчмарков всего пути скоринга, офлайн.
+
+Использует model.pkl / model.fast, DejaVuSansCondensed.ttf, km_logo.png из
+репозитория и локальную замену gspread. Пишет результаты в JSON и сравнивает
+с сохранённой базой: если метрика медленнее базы больше чем в (1 + tolerance)
+раз (и больше чем на --min-delta секунд), код выхода 1.
+
+    python -m benchmarks.run                       # сравнить с benchmarks/baseline.json
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --update-baseline     # записать новую базу
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')
+
+COLD_START = """
+import time
+start = time.perf_counter()
+import model_registry
+model_registry.{loader}('model.pkl')
+print(time.perf_counter() - start)
+"""
+
+
+def median_seconds(fn, rounds, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def cold_start(loader, rounds):
+    samples = []
+    for _ in range(rounds):
+        out = subprocess.run([sys.executable, '-c', COLD_START.format(loader=loader)], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def run(quick=False):
+    import warnings
+    warnings.filterwarnings('ignore')
+    import pandas as pd
+
+    import model_registry
+    import pdf_report
+    import sheets
+    from benchmarks.bench_fast_model import APPLICANT, applicants
+    from benchmarks.bench_history import fill
+    from benchmarks.bench_pdf import DATA
+    from benchmarks.bench_sheets import ROW
+    from benchmarks.fake_gspread import FakeClient
+    from explain import get_explainer
+    from history import History
+    from scoring import predict, prepare_features
+
+    scale = 0.2 if quick else 1
+    rounds = lambda n: max(3, int(n * scale))
+    results = {}
+
+    results['cold_start_pipeline_s'] = cold_start('get_model', 1 if quick else 3)
+    results['cold_start_fast_s'] = cold_start('get_scoring_model', 1 if quick else 3)
+
+    pipeline = model_registry.get_model('model.pkl')
+    fast = model_registry.get_scoring_model('model.pkl')
+    batch = applicants(1000)
+    batch_frame = pd.DataFrame(batch)
+    single_frame = pd.DataFrame([APPLICANT])
+    results['predict_single_pipeline_s'] = median_seconds(
+        lambda: predict(pipeline, prepare_features(single_frame)), rounds(50))
+    results['predict_batch1000_pipeline_s'] = median_seconds(
+        lambda: predict(pipeline, prepare_features(batch_frame)), rounds(10))
+    if fast is not pipeline:
+        results['predict_single_fast_s'] = median_seconds(lambda: fast.predict_applicants([APPLICANT]), rounds(500))
+        results['predict_batch1000_fast_s'] = median_seconds(lambda: fast.predict_applicants(batch), rounds(20))
+        explainer = get_explainer(model_registry.load_fast('model.pkl'))
+        results['explain_single_s'] = median_seconds(lambda: explainer.contributions([APPLICANT]), rounds(500))
+        results['explain_batch1000_s'] = median_seconds(lambda: explainer.contributions(batch), rounds(10))
+
+    results['generate_pdf_s'] = median_seconds(lambda: pdf_report.render_pdf(DATA), rounds(30))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = History(os.path.join(tmp, 'history.sqlite3'))
+        fill(history, int(100000 * scale))
+        results['history_by_phone_s'] = median_seconds(lambda: history.applied_recently('900000042'), rounds(500))
+        results['history_by_document_s'] = median_seconds(
+            lambda: history.by_document('Doc_missing'), rounds(500))
+        history.close()
+
+    client = FakeClient()
+    worksheet = client.open(sheets.SPREADSHEET).worksheet(sheets.WORKSHEET)
+    worksheet.rows = [list(sheets.HEADERS)] + [list(ROW) for _ in range(int(100000 * scale))]
+    sheets.set_client(client)
+    try:
+        results['sheet_export_s'] = median_seconds(lambda: sheets.append_rows([ROW]), rounds(200))
+    finally:
+        sheets.reset()
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta=0.0):
+    failures = []
+    for name, value in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            status = 'new'
+        elif value > base * (1 + tolerance) and value - base > min_delta:
+            status = 'SLOWER'
+            failures.append(name)
+        else:
+            status = 'ok'
+        ratio = f'{value / base:6.2f}x' if base else '       '
+        print(f'{name:32} {value * 1000:12.3f} ms  {ratio}  {status}')
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', help='куда записать результаты (JSON)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='допустимое замедление, доля (0.5 = +50%%)')
+    parser.add_argument('--min-delta', type=float, default=0.0002,
+                        help='абсолютный порог в секундах: микросекундный шум не считается регрессией')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--quick', action='store_true', help='меньше повторов и строк в листе')
+    args = parser.parse_args(argv)
+
+    os.chdir(BASE_DIR)
+    results = run(args.quick)
+    report = {'python': platform.python_version(), 'machine': platform.machine(),
+              'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'baseline written to {args.baseline}')
+        return 0
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    failures = compare(results, baseline, args.tolerance, args.min_delta)
+    if failures:
+        print(f'regressions over +{args.tolerance:.0%}: {", ".join(failures)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
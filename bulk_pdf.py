@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import pdf_report
+from scoring import ERROR, document_number_for
+
+# Сколько документов одновременно «в полёте»: ограничивает память,
+# сколько бы строк ни было во входном файле
+WINDOW_PER_WORKER = 8
+WORKERS = int(os.environ.get('BULK_PDF_WORKERS', os.cpu_count() or 1))
+# fpdf 1.7.2 держит каждую страницу несжатой (~17 КБ) до output(), поэтому
+# один PDF ограничен; большие файлы — ZIP, он пишется потоком
+MERGED_LIMIT = int(os.environ.get('BULK_PDF_MERGED_LIMIT', 2000))
+
+_WARMUP = {name: [''] for name in pdf_report.var}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # Каждый процесс один раз разбирает шрифт и логотип
+    pdf_report.render_pdf(_WARMUP)
+
+
+def _as_data(record):
+    return {k: [v] for k, v in record.items()}
+
+
+def _render(record):
+    return pdf_report.render_pdf(_as_data(record))
+
+
+def iter_records(frames, date=None):
+    """Строки результатов скоринга (DataFrame или куски) -> dict для документа."""
+    date = date or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    prefix = document_number_for(date)
+    if hasattr(frames, 'to_dict'):
+        frames = [frames]
+    n = 0
+    for frame in frames:
+        for record in frame.to_dict('records'):
+            if record.get('Result') == ERROR:
+                continue  # строка не оценена — документа нет
+            n += 1
+            record.setdefault('Date', date)
+            record.setdefault('DocumentNumber', f'{prefix}_{n}')
+            yield {k: ('' if v is None or v != v else v) for k, v in record.items()}
+
+
+def get_pool():
+    # Один пул на процесс: шрифт и логотип разбираются при старте воркера,
+    # а не на каждую выгрузку
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: приложение многопоточное (outbox, credentials), fork небезопасен
+                context = multiprocessing.get_context('spawn')
+                _pool = ProcessPoolExecutor(WORKERS, mp_context=context, initializer=_init_worker)
+    return _pool
+
+
+def _drop_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def write_zip(records, out):
+    """Отрисовать документы в пуле процессов и по мере готовности писать в ZIP.
+
+    Возвращает число документов.
+    """
+    pool = get_pool()
+    pending = deque()
+    count = 0
+    try:
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive:
+
+            def write_next():
+                nonlocal count
+                name, future = pending.popleft()
+                count += 1
+                archive.writestr(f'{count:06d}_{name}.pdf', future.result())
+
+            for record in records:
+                pending.append((record.get('DocumentNumber', ''), pool.submit(_render, record)))
+                if len(pending) >= WORKERS * WINDOW_PER_WORKER:
+                    write_next()
+            while pending:
+                write_next()
+    except BrokenProcessPool:
+        # Воркер упал — сломанный пул не переиспользуется, следующий вызов создаст новый
+        _drop_pool(pool)
+        raise
+    return count
+
+
+def write_merged(records, out, limit=MERGED_LIMIT):
+    """Все документы одним многостраничным PDF, не больше limit страниц.
+
+    fpdf 1.7.2 не умеет склеивать готовые PDF, поэтому страницы рисуются в
+    одном документе: шрифт и логотип встраиваются один раз. Но все страницы
+    до output() лежат в памяти несжатыми, и файл собирается одной строкой —
+    память растёт с числом документов, отсюда limit (ValueError сверх него).
+    """
+    pdf = pdf_report.ReportPDF()
+    count = 0
+    for record in records:
+        if count >= limit:
+            raise ValueError(f'Один PDF — не больше {limit} документов, для большего файла выберите ZIP')
+        pdf_report.draw_document(pdf, _as_data(record))
+        count += 1
+    if count:
+        out.write(pdf.output(dest='S').encode('latin1'))
+    return count
@@ -0,0 +1,265 @@
+"""Мониторинг дрейфа входов и вероятностей модели.
+
+Эталон (drift_reference.json) — распределения признаков и вероятности на
+обучающей выборке или на истории за спокойный период: для чисел — корзины по
+децилям эталона, для категорий — доли значений. Монитор держит скользящее окно
+из последних DRIFT_WINDOW решений: кольцевой буфер номеров корзин и счётчики,
+поэтому observe() — O(1) по времени и памяти. PSI по каждому признаку
+пересчитывается раз в DRIFT_CHECK_EVERY решений; при превышении порога
+пишется предупреждение в лог и запись в alerts.
+
+    python drift.py reference train.csv                      # колонки как в пакетном скоринге
+    python drift.py reference --history --since 2026-01-01 --until 2026-03-31
+"""
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from history import _probability, get_history
+from prediction_cache import feature_key
+from scoring import FEATURES
+
+REFERENCE_PATH = os.environ.get('DRIFT_REFERENCE', 'drift_reference.json')
+WINDOW = int(os.environ.get('DRIFT_WINDOW', 1000))
+CHECK_EVERY = int(os.environ.get('DRIFT_CHECK_EVERY', 50))
+MIN_COUNT = int(os.environ.get('DRIFT_MIN_COUNT', 200))
+PSI_WARN = float(os.environ.get('DRIFT_PSI_WARN', 0.1))
+PSI_ALERT = float(os.environ.get('DRIFT_PSI_ALERT', 0.25))
+NUMERIC = ['age', 'amount', 'credit_history_count', 'duration', 'score']
+CATEGORICAL = ['district', 'gender', 'marital_status']
+OTHER = '__other__'
+EPSILON = 1e-4
+
+logger = logging.getLogger(__name__)
+
+
+def _values(applicant, probability):
+    # Те же нормализованные значения, что видит модель (и ключ кэша предсказаний)
+    values = dict(zip(FEATURES, feature_key(applicant)))
+    values['score'] = probability
+    return values
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def build_reference(rows, source=''):
+    """rows — пары (applicant dict, вероятность возврата) -> dict эталона."""
+    columns = {name: [] for name in NUMERIC + CATEGORICAL}
+    for applicant, probability in rows:
+        for name, value in _values(applicant, probability).items():
+            columns[name].append(value)
+    n = len(columns['score'])
+    if not n:
+        raise ValueError('пустая выборка для эталона')
+    features = {}
+    for name in NUMERIC:
+        known = np.array([v for v in columns[name] if not _is_missing(v)], dtype=float)
+        edges = sorted(set(np.quantile(known, np.linspace(0.1, 0.9, 9)).tolist())) if len(known) else []
+        counts = np.zeros(len(edges) + 2)  # корзины + пропуск
+        for value in columns[name]:
+            counts[-1 if _is_missing(value) else bisect.bisect_right(edges, value)] += 1
+        features[name] = {'type': 'numeric', 'edges': edges, 'expected': (counts / n).tolist()}
+    for name in CATEGORICAL:
+        values = [OTHER if _is_missing(v) else str(v) for v in columns[name]]
+        categories = sorted(set(values) - {OTHER})
+        index = {c: i for i, c in enumerate(categories)}
+        counts = np.zeros(len(categories) + 1)
+        for value in values:
+            counts[index.get(value, -1)] += 1
+        features[name] = {'type': 'categorical', 'categories': categories, 'expected': (counts / n).tolist()}
+    return {'created': datetime.now().isoformat(timespec='seconds'), 'source': source, 'n': n, 'features': features}
+
+
+def psi(expected, actual):
+    """Population Stability Index; пустые корзины сглаживаются EPSILON."""
+    expected = np.maximum(np.asarray(expected, dtype=float), EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=float), EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class _Feature:
+    def __init__(self, name, spec, window):
+        self.name = name
+        self.edges = spec.get('edges')
+        self.index = {c: i for i, c in enumerate(spec.get('categories', ()))}
+        self.expected = spec['expected']
+        self.counts = [0] * len(self.expected)
+        self.ring = array('H', [0]) * window  # номера корзин последних window решений
+        self.pos = 0
+        self.size = 0
+
+    def bin(self, value):
+        if self.edges is not None:
+            return len(self.counts) - 1 if _is_missing(value) else bisect.bisect_right(self.edges, value)
+        return self.index.get(str(value), len(self.counts) - 1) if not _is_missing(value) else len(self.counts) - 1
+
+    def add(self, value):
+        b = self.bin(value)
+        if self.size == len(self.ring):
+            self.counts[self.ring[self.pos]] -= 1
+        else:
+            self.size += 1
+        self.ring[self.pos] = b
+        self.counts[b] += 1
+        self.pos = (self.pos + 1) % len(self.ring)
+
+    def psi(self):
+        return psi(self.expected, [c / self.size for c in self.counts]) if self.size else None
+
+
+class DriftMonitor:
+    def __init__(self, reference, window=WINDOW, check_every=CHECK_EVERY, min_count=MIN_COUNT,
+                 warn=PSI_WARN, alert=PSI_ALERT, on_alert=None):
+        self.reference = reference
+        self.check_every = check_every
+        self.min_count = min_count
+        self.warn = warn
+        self.alert = alert
+        self.on_alert = on_alert
+        self.count = 0
+        self.alerts = deque(maxlen=100)
+        self._features = [_Feature(name, spec, window) for name, spec in reference['features'].items()]
+        self._psi = {}
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def observe(self, applicant, probability):
+        """Учесть одно решение: O(1), проверка PSI — раз в check_every решений."""
+        values = _values(applicant, probability)
+        with self._lock:
+            for feature in self._features:
+                feature.add(values.get(feature.name))
+            self.count += 1
+            if self.count % self.check_every == 0:
+                self._check()
+
+    def _check(self):
+        for feature in self._features:
+            value = feature.psi() if feature.size >= self.min_count else None
+            self._psi[feature.name] = value
+            state = None if value is None else 'alert' if value >= self.alert else 'warn' if value >= self.warn else 'ok'
+            previous = self._state.get(feature.name)
+            self._state[feature.name] = state
+            if state == 'alert' and previous != 'alert':
+                event = {'time': time.time(), 'feature': feature.name, 'psi': round(value, 4), 'window': feature.size}
+                self.alerts.append(event)
+                logger.warning('drift: %s PSI=%.3f на последних %d решениях', feature.name, value, feature.size)
+                if self.on_alert is not None:
+                    self.on_alert(event)
+
+    def status(self):
+        with self._lock:
+            self._check()
+            return {
+                'reference': {k: self.reference.get(k) for k in ('created', 'source', 'n')},
+                'observed': self.count,
+                'window': max((f.size for f in self._features), default=0),
+                'psi': {name: value and round(value, 4) for name, value in self._psi.items()},
+                'state': dict(self._state),
+                'alerts': list(self.alerts),
+            }
+
+    def render_prometheus(self):
+        lines = ['# HELP scoring_drift_psi PSI признака на скользящем окне относительно эталона',
+                 '# TYPE scoring_drift_psi gauge']
+        for name, value in self.status()['psi'].items():
+            if value is not None:
+                lines.append(f'scoring_drift_psi{{feature="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+_monitor = None
+_loaded = None  # (path, mtime_ns)
+_monitor_lock = threading.Lock()
+
+
+def get_monitor(path=REFERENCE_PATH):
+    """Монитор с эталоном из path (перечитывается при изменении файла) или None без эталона."""
+    global _monitor, _loaded
+    try:
+        stamp = (path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    if stamp != _loaded:
+        with _monitor_lock:
+            if stamp != _loaded:
+                with open(path, encoding='utf-8') as f:
+                    _monitor = DriftMonitor(json.load(f))
+                _loaded = stamp
+    return _monitor
+
+
+def observe(applicant, probability):
+    # Вызывается на каждое решение; без эталона ничего не делает
+    monitor = get_monitor()
+    if monitor is not None:
+        monitor.observe(applicant, probability)
+
+
+def observe_records(applicants, records):
+    # Пакет из API: вероятность берётся из готовой записи ('93.74%')
+    monitor = get_monitor()
+    if monitor is not None:
+        for applicant, record in zip(applicants, records):
+            monitor.observe(applicant, _probability(record['Probability']))
+
+
+def _rows_from_file(path):
+    import model_registry
+    from scoring import predict_applicants, read_chunks
+    model = model_registry.get_scoring_model()
+    with open(path, 'rb') as source:
+        for chunk in read_chunks(source, path):
+            # Пустая ячейка — пропуск, как у модели, а не категория ''
+            applicants = chunk.where(chunk != '').to_dict('records')
+            yield from zip(applicants, predict_applicants(model, applicants))
+
+
+def _rows_from_history(since, until):
+    # Страницами по rowid: память не растёт с размером периода
+    for page in get_history().pages(since=since, until=until):
+        for record in page:
+            yield record, _probability(record['Probability'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Эталон для мониторинга дрейфа')
+    commands = parser.add_subparsers(dest='command', required=True)
+    reference = commands.add_parser('reference', help='построить эталон')
+    reference.add_argument('source', nargs='?', help='CSV/XLSX с колонками формы (обучающая выборка)')
+    reference.add_argument('--history', action='store_true', help='взять решения из локальной истории')
+    reference.add_argument('--since')
+    reference.add_argument('--until')
+    reference.add_argument('--output', default=REFERENCE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.history:
+        rows, source = _rows_from_history(args.since, args.until), f'history {args.since}..{args.until}'
+    elif args.source:
+        rows, source = _rows_from_file(args.source), args.source
+    else:
+        parser.error('нужен файл выборки или --history')
+    result = build_reference(rows, source)
+    tmp = args.output + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, args.output)
+    print(f"{args.output}: {result['n']} решений, источник {source}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
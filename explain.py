@@ -0,0 +1,249 @@
+"""Почему такое решение: вклады признаков по родному SHAP CatBoost.
+
+CatBoost считает TreeSHAP заново на каждый вызов (~15-25 мс на строку).
+Для симметричных деревьев вклад дерева зависит только от листа, в который
+попала строка, поэтому таблица «дерево × лист -> вклады признаков»
+считается один раз самим CatBoost (get_feature_importance(type='ShapValues')
+по каждому дереву на входах, попадающих в каждый лист) и сохраняется рядом с
+быстрым путём в model.fast/shap.npz. Объяснение строки — номера листов
+(сравнение с порогами сплитов) и сумма строк таблицы, векторно для пачки.
+Перед сохранением таблица сверяется с get_feature_importance целой модели.
+
+Без таблицы (не симметричные деревья, старый model.fast, пайплайн без
+быстрого пути) — прямой вызов get_feature_importance.
+
+    python explain.py model.fast                      # построить таблицу
+    python explain.py history --output factors.csv     # вклады по всей истории
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+from scoring import FEATURES
+
+SHAP_FILE = 'shap.npz'
+TOP = 3
+CHUNK = 256
+TOLERANCE = 1e-6
+LABELS = {'age': 'Возраст', 'amount': 'Сумма рассрочки', 'credit_history_count': 'Количество кредитов(история)',
+          'district': 'Филиал', 'duration': 'Срок', 'gender': 'Пол', 'marital_status': 'Семейное положение'}
+
+
+def _splits(estimator):
+    # Признаки и пороги сплитов по уровням: (деревья × глубина); пустые уровни — порог +inf
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.json')
+        estimator.save_model(path, format='json')
+        with open(path) as f:
+            trees = json.load(f).get('oblivious_trees')
+    if not trees or any(s['split_type'] != 'FloatFeature' for t in trees for s in t['splits']):
+        raise ValueError('таблица вкладов строится только для симметричных деревьев по числовым признакам')
+    depth = max(len(t['splits']) for t in trees)
+    features = np.zeros((len(trees), depth), dtype=np.intp)
+    borders = np.full((len(trees), depth), np.inf)
+    for i, tree in enumerate(trees):
+        for level, split in enumerate(tree['splits']):
+            features[i, level] = split['float_feature_index']
+            borders[i, level] = split['border']
+    return features, borders
+
+
+def _leaf_inputs(features, borders, n_features):
+    # По строке на каждый лист дерева: значения, проходящие сплиты по битам номера листа.
+    # Лист недостижим, если один признак требует противоречивых сторон.
+    depth = int(np.isfinite(borders).sum())
+    X = np.zeros((1 << depth, n_features))
+    reachable = np.ones(1 << depth, dtype=bool)
+    for leaf in range(1 << depth):
+        low, high = {}, {}
+        for level in range(depth):
+            f, border = features[level], borders[level]
+            if leaf >> level & 1:
+                low[f] = max(low.get(f, -np.inf), border)
+            else:
+                high[f] = min(high.get(f, np.inf), border)
+        for f in set(low) | set(high):
+            lo, hi = low.get(f, -np.inf), high.get(f, np.inf)
+            if lo >= hi:
+                reachable[leaf] = False
+            else:
+                X[leaf, f] = hi if np.isfinite(hi) else lo + 1.0
+    return X, reachable
+
+
+def build_tables(estimator, n_features):
+    """Таблица вкладов (деревья × листья × признаки) по SHAP каждого дерева отдельно."""
+    from catboost import Pool
+    features, borders = _splits(estimator)
+    values = np.zeros((len(features), 1 << features.shape[1], n_features))
+    for t in range(len(features)):
+        X, reachable = _leaf_inputs(features[t], borders[t], n_features)
+        tree = estimator.copy()
+        tree.shrink(t + 1, t)
+        leaves = tree.calc_leaf_indexes(Pool(X))[:, 0]
+        reachable &= leaves == np.arange(len(X))
+        shap = tree.get_feature_importance(Pool(X[reachable]), type='ShapValues', thread_count=1)
+        values[t, leaves[reachable]] = shap[:, :-1]
+    return features, borders, values
+
+
+class Explainer:
+    """Вклады признаков в логарифм шансов возврата (класс 0) для FastModel или пайплайна."""
+
+    def __init__(self, model, tables=None):
+        self.model = model
+        self.estimator = model.estimator if hasattr(model, 'estimator') else model.steps[-1][1]
+        names = list(self.estimator.feature_names_)
+        # one-hot колонки marital_status_* складываются в один признак формы
+        self._groups = np.array([[name == f or name.startswith(f + '_') for f in FEATURES] for name in names],
+                                dtype=float)
+        self.tables = tables
+        if tables is not None:
+            self._features, self._borders, self._values = tables
+            self._bits = 1 << np.arange(self._features.shape[1])
+            self._trees = np.arange(len(self._features))[:, None]
+        self.expected_value = -float(self.estimator.get_feature_importance(
+            self._pool(self.encode([{}])), type='ShapValues')[0, -1])
+
+    @staticmethod
+    def _pool(X):
+        from catboost import Pool
+        return Pool(X)
+
+    @classmethod
+    def load(cls, model, path):
+        with np.load(path) as data:
+            return cls(model, (data['features'], data['borders'], data['values']))
+
+    def save(self, path):
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(tmp, features=self._features, borders=self._borders, values=self._values)
+        os.replace(tmp, path)
+
+    def encode(self, applicants):
+        if hasattr(self.model, 'encode'):
+            return self.model.encode(applicants)
+        import pandas as pd
+        from scoring import prepare_features
+        frame = pd.DataFrame(applicants, columns=FEATURES)
+        return self.model[:-1].transform(prepare_features(frame)).to_numpy(float)
+
+    def shap_values(self, X):
+        """SHAP по закодированным колонкам модели (класс 1, как у CatBoost), без ожидаемого значения."""
+        if self.tables is None:
+            return self.estimator.get_feature_importance(self._pool(X), type='ShapValues')[:, :-1]
+        out = np.empty((len(X), self._values.shape[2]))
+        for start in range(0, len(X), CHUNK):
+            chunk = X[start:start + CHUNK]
+            leaves = ((chunk[:, self._features] > self._borders) * self._bits).sum(axis=2)
+            out[start:start + CHUNK] = self._values[self._trees, leaves.T].sum(axis=0)
+        return out
+
+    def contributions(self, applicants):
+        # (заявители × FEATURES): плюс — за возврат, минус — против
+        return -self.shap_values(self.encode(applicants)) @ self._groups
+
+    def verify(self, applicants, tolerance=TOLERANCE):
+        # Таблица против get_feature_importance целой модели
+        X = self.encode(applicants)
+        native = self.estimator.get_feature_importance(self._pool(X), type='ShapValues')[:, :-1]
+        diff = float(np.abs(native - self.shap_values(X)).max())
+        if diff > tolerance:
+            raise AssertionError(f'таблица вкладов расходится с CatBoost: max |Δ| = {diff:.3g}')
+        return diff
+
+
+def top_factors(contributions, k=TOP):
+    """Строка вкладов -> k самых сильных признаков [(признак, вклад)], сильные первыми."""
+    order = np.argsort(-np.abs(contributions))[:k]
+    return [(FEATURES[i], float(contributions[i])) for i in order]
+
+
+def factor_lines(factors):
+    # 'Сумма рассрочки ↓0.84' — стрелка: за (↑) или против (↓) возврата
+    return [f"{LABELS[name]} {'↑' if value > 0 else '↓'}{abs(value):.2f}" for name, value in factors]
+
+
+def format_factors(factors):
+    # Одной строкой для записи и PDF: 'Сумма рассрочки ↓0.84; Срок ↓0.31'
+    return '; '.join(factor_lines(factors))
+
+
+def compile_tables(fast_dir, verify_applicants=None):
+    """Построить и сохранить model.fast/shap.npz для скомпилированного быстрого пути."""
+    from fast_model import FastModel, grid
+    fast = FastModel.load(fast_dir)
+    explainer = Explainer(fast, build_tables(fast.estimator, len(fast.feature_names)))
+    diff = explainer.verify(verify_applicants or list(grid(fast.spec)))
+    explainer.save(os.path.join(fast_dir, SHAP_FILE))
+    return diff
+
+
+_explainers = {}  # (path, version) -> Explainer
+_lock = threading.Lock()
+
+
+def get_explainer(entry):
+    """Explainer для model_registry.LoadedModel; таблица берётся из model.fast/shap.npz, если есть."""
+    key = (entry.path, entry.version)
+    explainer = _explainers.get(key)
+    if explainer is None:
+        with _lock:
+            explainer = _explainers.get(key)
+            if explainer is None:
+                path = os.path.join(entry.path, SHAP_FILE)
+                if os.path.isfile(path):
+                    explainer = Explainer.load(entry.model, path)
+                else:
+                    explainer = Explainer(entry.model)
+                for old in [k for k in _explainers if k[0] == entry.path]:
+                    del _explainers[old]
+                _explainers[key] = explainer
+    return explainer
+
+
+def explain_history(entry, out, since=None, until=None, chunk=10000):
+    """Вклады признаков по всем записям истории за период -> CSV (DocumentNumber, вклады).
+
+    История читается страницами по chunk записей, так что память не растёт с её размером.
+    """
+    import csv
+    from history import get_history
+    explainer = get_explainer(entry)
+    writer = csv.writer(out)
+    writer.writerow(['DocumentNumber'] + FEATURES)
+    n = 0
+    for part in get_history().pages(since=since, until=until, size=chunk):
+        values = explainer.contributions(part)
+        writer.writerows([r['DocumentNumber']] + [round(v, 6) for v in row] for r, row in zip(part, values))
+        n += len(part)
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Вклады признаков по SHAP CatBoost')
+    parser.add_argument('target', help='каталог model.fast или history')
+    parser.add_argument('--model', default='model.pkl')
+    parser.add_argument('--since')
+    parser.add_argument('--until')
+    parser.add_argument('--output', default='factors.csv')
+    args = parser.parse_args(argv)
+    if args.target == 'history':
+        import model_registry
+        entry = model_registry.load_fast(args.model) or model_registry.load(args.model)
+        with open(args.output, 'w', newline='', encoding='utf-8') as out:
+            n = explain_history(entry, out, args.since, args.until)
+        print(f'{args.output}: {n} записей')
+    else:
+        diff = compile_tables(args.target)
+        print(f'{os.path.join(args.target, SHAP_FILE)}: max |Δ| с CatBoost = {diff:.3g}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Быстрый путь инференса: модель без PyCaret и pandas.
+
+PyCaret-пайплайн из model.pkl компилируется в каталог с двумя файлами:
+encoders.json (заполнение пропусков, target-encoding district, one-hot
+marital_status, порядок признаков) и catboost.cbm (родной формат CatBoost).
+
+    python fast_model.py model.pkl model.fast
+
+Компиляция строит кодировщики прогоном самого пайплайна по всем известным
+категориям и проверяет совпадение вероятностей на сетке входов.
+"""
+import itertools
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+from scoring import FEATURES, GENDERS, mapping_dis, mapping_mar
+
+ENCODERS_FILE = 'encoders.json'
+CATBOOST_FILE = 'catboost.cbm'
+NUMERIC = ['age', 'amount', 'credit_history_count', 'duration', 'gender']
+UNKNOWN = '__unknown__'
+MISSING = '__missing__'
+
+
+def fast_path_for(pipeline_path):
+    return os.path.splitext(pipeline_path)[0] + '.fast'
+
+
+def _known_categories(pipeline, column):
+    for _, step in pipeline.steps[:-1]:
+        encoder = getattr(step.transformer, 'ordinal_encoder', None)
+        if encoder is None:
+            continue
+        for entry in encoder.mapping:
+            if entry['col'] == column:
+                return [c for c in entry['mapping'].index if isinstance(c, str)]
+    raise ValueError(f'в пайплайне нет кодировщика для {column}')
+
+
+def _encode_with_pipeline(pipeline, rows):
+    import pandas as pd
+    frame = pd.DataFrame(rows, columns=FEATURES)
+    return pipeline[:-1].transform(frame)
+
+
+def compile_pipeline(pipeline, out_dir, source_version=None):
+    estimator = pipeline.steps[-1][1]
+    order = list(estimator.feature_names_)
+    imputer = dict(pipeline.steps)['numerical_imputer'].transformer
+    categorical_imputer = dict(pipeline.steps)['categorical_imputer'].transformer
+    numeric_fill = dict(zip(NUMERIC, map(float, imputer.statistics_)))
+    categorical_fill = dict(zip(['district', 'marital_status'], categorical_imputer.statistics_.tolist()))
+
+    base = {f: numeric_fill.get(f, 0.0) for f in NUMERIC}
+    districts = _known_categories(pipeline, 'district') + [UNKNOWN, MISSING]
+    maritals = _known_categories(pipeline, 'marital_status') + [UNKNOWN, MISSING]
+    # Пропуск — NaN, как его отдаёт scoring.prepare_features: пайплайн заполняет
+    # его самым частым значением (None импьютер пропустил бы мимо)
+    rows = [dict(base, district=np.nan if d == MISSING else d, marital_status=categorical_fill['marital_status'])
+            for d in districts]
+    rows += [dict(base, district=categorical_fill['district'], marital_status=np.nan if m == MISSING else m)
+             for m in maritals]
+    encoded = _encode_with_pipeline(pipeline, rows)
+
+    marital_columns = [c for c in order if c.startswith('marital_status_')]
+    district_values = encoded['district'].tolist()[:len(districts)]
+    marital_values = encoded[marital_columns].values.tolist()[len(districts):]
+    spec = {
+        'source_version': source_version,
+        'order': order,
+        'numeric_fill': numeric_fill,
+        'categorical_fill': categorical_fill,
+        'district': dict(zip(districts, district_values)),
+        'marital_columns': marital_columns,
+        'marital_status': dict(zip(maritals, marital_values)),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    estimator.save_model(os.path.join(out_dir, CATBOOST_FILE))
+    with open(os.path.join(out_dir, ENCODERS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(spec, f, ensure_ascii=False, indent=1)
+    return FastModel(spec, estimator)
+
+
+class FastModel:
+    """Вход — dict с полями формы (русские подписи или коды) либо готовая матрица."""
+
+    def __init__(self, spec, estimator):
+        self.spec = spec
+        self.estimator = estimator
+        self.version = spec.get('source_version')
+        self.feature_names = spec['order']
+        self._district = spec['district']
+        self._district_unknown = self._district[UNKNOWN]
+        self._marital = spec['marital_status']
+        self._marital_unknown = self._marital[UNKNOWN]
+        self._fill = spec['numeric_fill']
+        order = spec['order']
+        self._numeric_index = [(f, order.index(f)) for f in NUMERIC]
+        self._district_index = order.index('district')
+        self._marital_index = [order.index(c) for c in spec['marital_columns']]
+        self.classes_ = np.array([0., 1.])
+
+    @classmethod
+    def load(cls, path):
+        from catboost import CatBoostClassifier
+        with open(os.path.join(path, ENCODERS_FILE), encoding='utf-8') as f:
+            spec = json.load(f)
+        estimator = CatBoostClassifier()
+        estimator.load_model(os.path.join(path, CATBOOST_FILE))
+        return cls(spec, estimator)
+
+    def _number(self, name, value):
+        if name == 'gender' and isinstance(value, str):
+            value = GENDERS.get(value.strip())
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return self._fill[name]
+        return self._fill[name] if math.isnan(value) else value
+
+    @staticmethod
+    def _category(value, mapping):
+        if value is None or value != value:
+            return MISSING
+        value = str(value).strip()
+        return mapping.get(value, value)
+
+    def encode_row(self, applicant, out=None):
+        row = out if out is not None else np.empty(len(self.feature_names))
+        for name, i in self._numeric_index:
+            row[i] = self._number(name, applicant.get(name))
+        district = self._category(applicant.get('district'), mapping_dis)
+        row[self._district_index] = self._district.get(district, self._district_unknown)
+        marital = self._category(applicant.get('marital_status'), mapping_mar)
+        row[self._marital_index] = self._marital.get(marital, self._marital_unknown)
+        return row
+
+    def encode(self, applicants):
+        X = np.empty((len(applicants), len(self.feature_names)))
+        for i, applicant in enumerate(applicants):
+            self.encode_row(applicant, X[i])
+        return X
+
+    def predict_proba_array(self, X):
+        return self.estimator.predict(X, prediction_type='Probability', thread_count=1)
+
+    def predict_applicants(self, applicants):
+        # Вероятность возврата (класс 0), как scoring.predict_applicants
+        return self.predict_proba_array(self.encode(applicants))[:, 0]
+
+    def encode_frame(self, frame):
+        # Векторно для DataFrame с уже закодированными значениями (как вход пайплайна)
+        import pandas as pd
+        X = np.empty((len(frame), len(self.feature_names)))
+        for name, i in self._numeric_index:
+            X[:, i] = pd.to_numeric(frame[name], errors='coerce').fillna(self._fill[name]).to_numpy(float)
+        district = frame['district']
+        codes = district.map(self._district).fillna(self._district_unknown).to_numpy(float)
+        X[:, self._district_index] = np.where(district.isna(), self._district[MISSING], codes)
+        marital = frame['marital_status']
+        names = list(self._marital)
+        table = np.array([self._marital[n] for n in names], dtype=float)
+        index = marital.map({n: i for i, n in enumerate(names)}).fillna(names.index(UNKNOWN)).to_numpy(int)
+        index[marital.isna().to_numpy()] = names.index(MISSING)
+        X[:, self._marital_index] = table[index]
+        return X
+
+    def predict_proba(self, frame):
+        # Совместимость с пайплайном: DataFrame с колонками FEATURES
+        return self.predict_proba_array(self.encode_frame(frame))
+
+
+def grid(spec):
+    """Сетка входов для проверки эквивалентности: все категории × числа × пропуски."""
+    districts = [d for d in spec['district'] if d not in (UNKNOWN, MISSING)] + ['unknown-branch', '', None]
+    maritals = [m for m in spec['marital_status'] if m not in (UNKNOWN, MISSING)] + ['unknown-status', '', None]
+    numbers = itertools.product([18, 24, 41, 70, None], [0, 500, 3000, 25000], [0, 1, 5],
+                                [3, 6, 12], [0, 1])
+    for (age, amount, history, duration, gender), district, marital in zip(
+            numbers, itertools.cycle(districts), itertools.cycle(maritals)):
+        yield {'age': age, 'amount': amount, 'credit_history_count': history, 'district': district,
+               'duration': duration, 'gender': gender, 'marital_status': marital}
+    for district in districts:
+        for marital in maritals:
+            yield {'age': 30, 'amount': 3000, 'credit_history_count': 1, 'district': district,
+                   'duration': 6, 'gender': 1, 'marital_status': marital}
+
+
+def verify(pipeline, fast, tolerance=1e-9):
+    """Максимальное расхождение вероятностей пайплайна и быстрого пути на сетке."""
+    import pandas as pd
+    rows = list(grid(fast.spec))
+    frame = pd.DataFrame(rows, columns=FEATURES)
+    frame[NUMERIC] = frame[NUMERIC].astype(float)
+    categorical = ['district', 'marital_status']
+    frame[categorical] = frame[categorical].where(frame[categorical].notna(), np.nan)
+    expected = pipeline.predict_proba(frame)
+    diff = max(float(np.abs(expected - fast.predict_proba_array(fast.encode(rows))).max()),
+               float(np.abs(expected - fast.predict_proba(frame)).max()))
+    if diff > tolerance:
+        raise AssertionError(f'быстрый путь расходится с пайплайном: max |Δp| = {diff:.3g} на {len(rows)} входах')
+    return diff, len(rows)
+
+
+def main(argv):
+    import model_registry
+    source = argv[1] if len(argv) > 1 else 'model.pkl'
+    out_dir = argv[2] if len(argv) > 2 else fast_path_for(source)
+    loaded = model_registry.load(source)
+    compile_pipeline(loaded.model, out_dir, loaded.version)
+    diff, n = verify(loaded.model, FastModel.load(out_dir))
+    print(f'{out_dir}: версия {loaded.version}, {n} входов, max |Δp| = {diff:.3g}')
+    from explain import SHAP_FILE, compile_tables
+    print(f'{os.path.join(out_dir, SHAP_FILE)}: max |Δ| с CatBoost = {compile_tables(out_dir):.3g}')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,312 @@
+"""Локальная история решений скоринга (SQLite, WAL).
+
+Каждая запись — поля input_data (scoring.make_record) и версия модели.
+Индексы по телефону, номеру документа, менеджеру, филиалу и дате: выборки
+вроде «обращался ли этот телефон за 30 дней» и повторная печать по номеру
+документа не читают таблицу целиком.
+
+Агрегаты для дашборда (history_stats: день × менеджер × филиал × срок)
+обновляет триггер на каждую вставку — в той же транзакции и для любого
+процесса, который пишет в базу; rebuild_stats() пересчитывает их с нуля.
+"""
+import math
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+HISTORY_PATH = os.environ.get('HISTORY_PATH', 'history.sqlite3')
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Поля записи в порядке колонок таблицы
+FIELDS = ['DocumentNumber', 'Date', 'Manager', 'district', 'name', 'phone', 'age', 'gender', 'amount',
+          'duration', 'marital_status', 'credit_history_count', 'Result', 'Probability', 'ModelVersion']
+_COLUMNS = ', '.join(f'"{f}"' for f in FIELDS)
+
+# Разрезы дашборда: имя -> выражение в history_stats
+DIMENSIONS = {'Manager': '"Manager"', 'district': 'district', 'duration': 'duration', 'day': 'day'}
+_STATS_KEY = ('substr("Date", 1, 10), coalesce("Manager", \'\'), coalesce(district, \'\'),'
+              ' coalesce(CAST(duration AS INTEGER), 0)')
+_STATS_VALUES = ('count(*), sum("Result" = \'Одобрено\'), sum(coalesce(CAST(amount AS REAL), 0)),'
+                 ' sum(coalesce(repay_probability, 0)), count(repay_probability)')
+
+
+def phone_key(phone):
+    # Только цифры, без кода страны: «+992 928-00-92-92» и «928009292» — один номер
+    if phone is None or phone != phone:
+        return None
+    digits = re.sub(r'\D', '', str(phone))
+    if len(digits) == 12 and digits.startswith('992'):
+        digits = digits[3:]
+    return digits or None
+
+
+def _probability(value):
+    # '93.74%' -> 0.9374, чтобы по вероятности можно было считать
+    try:
+        return float(str(value).rstrip('%')) / 100
+    except (TypeError, ValueError):
+        return None
+
+
+def _repay_probability(record):
+    # Неокруглённая вероятность из make_record; записи без неё — из строки '93.74%'
+    value = _value(record.get('RepayProbability'))
+    return _probability(record.get('Probability')) if value is None else value
+
+
+def _value(value):
+    # numpy-скаляры из DataFrame и NaN -> значения SQLite
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _filters(manager=None, district=None, since=None, until=None):
+    # until включительно, как в summary и scores: день 'YYYY-MM-DD' — до его конца
+    if until is not None and len(str(until)) <= 10:
+        until = str(until)[:10] + ' 23:59:59'
+    where, params = ['1'], []
+    for column, value in [('"Manager" = ?', manager), ('district = ?', district),
+                          ('"Date" >= ?', since), ('"Date" <= ?', until)]:
+        if value is not None:
+            where.append(column)
+            params.append(value)
+    return ' AND '.join(where), params
+
+
+class History:
+    """Запись и выборки по истории решений. Потокобезопасен: одно соединение под блокировкой."""
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS history ('
+            ' "DocumentNumber" TEXT PRIMARY KEY,'
+            ' "Date" TEXT, "Manager" TEXT, district TEXT, name TEXT, phone TEXT, age, gender, amount, duration,'
+            ' marital_status TEXT, credit_history_count, "Result" TEXT, "Probability" TEXT, "ModelVersion" TEXT,'
+            ' phone_key TEXT,'
+            ' repay_probability REAL,'
+            ' cutoff REAL)'
+        )
+        if 'cutoff' not in [row[1] for row in self._conn.execute('PRAGMA table_info(history)')]:
+            # База прошлой версии: порог у старых записей неизвестен
+            self._conn.execute('ALTER TABLE history ADD COLUMN cutoff REAL')
+        for name, columns in [('phone', 'phone_key, "Date"'), ('manager', '"Manager", "Date"'),
+                              ('district', 'district, "Date"'), ('date', '"Date"')]:
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS history_{name} ON history ({columns})')
+        self._create_stats()
+
+    def _create_stats(self):
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS history_stats ('
+            ' day TEXT NOT NULL, "Manager" TEXT NOT NULL, district TEXT NOT NULL, duration INTEGER NOT NULL,'
+            ' n INTEGER NOT NULL, approved INTEGER NOT NULL, amount_sum REAL NOT NULL,'
+            ' probability_sum REAL NOT NULL, probability_n INTEGER NOT NULL,'
+            ' PRIMARY KEY (day, "Manager", district, duration))'
+        )
+        # Ключ тот же, что _STATS_KEY, но по NEW.* — держать в согласии
+        self._conn.execute(
+            'CREATE TRIGGER IF NOT EXISTS history_stats_insert AFTER INSERT ON history BEGIN'
+            ' INSERT INTO history_stats VALUES ('
+            ' substr(NEW."Date", 1, 10), coalesce(NEW."Manager", \'\'), coalesce(NEW.district, \'\'),'
+            ' coalesce(CAST(NEW.duration AS INTEGER), 0),'
+            ' 1, NEW."Result" = \'Одобрено\', coalesce(CAST(NEW.amount AS REAL), 0),'
+            ' coalesce(NEW.repay_probability, 0), NEW.repay_probability IS NOT NULL)'
+            ' ON CONFLICT DO UPDATE SET n = n + 1, approved = approved + excluded.approved,'
+            ' amount_sum = amount_sum + excluded.amount_sum, probability_sum = probability_sum + excluded.probability_sum,'
+            ' probability_n = probability_n + excluded.probability_n;'
+            ' END'
+        )
+        # База из прошлой версии: агрегатов ещё нет, а история есть
+        if not self._conn.execute('SELECT 1 FROM history_stats LIMIT 1').fetchone() and self.count():
+            self.rebuild_stats()
+
+    def record(self, records):
+        """Сохранить записи (list of dict или DataFrame).
+
+        DocumentNumber уникален (scoring.document_number_for): совпадение — это
+        ошибка, а не повтор, поэтому sqlite3.IntegrityError и вся пачка откатывается.
+        """
+        if hasattr(records, 'to_dict'):
+            records = records.to_dict('records')
+        rows = [[_value(r.get(f)) for f in FIELDS]
+                + [phone_key(r.get('phone')), _repay_probability(r), _value(r.get('Cutoff'))]
+                for r in records]
+        if not rows:
+            return 0
+        placeholders = ', '.join('?' * (len(FIELDS) + 3))
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(f'INSERT INTO history VALUES ({placeholders})', rows)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+        return len(rows)
+
+    def _select(self, where, params, limit=None):
+        sql = f'SELECT {_COLUMNS} FROM history WHERE {where} ORDER BY "Date" DESC'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def by_document(self, document_number):
+        rows = self._select('"DocumentNumber" = ?', (document_number,))
+        return rows[0] if rows else None
+
+    def by_phone(self, phone, days=None, limit=100):
+        """Обращения с этого телефона, новые первыми; days — только за последние N дней."""
+        key = phone_key(phone)
+        if key is None:
+            return []
+        if days is None:
+            return self._select('phone_key = ?', (key,), limit)
+        since = (datetime.now() - timedelta(days=days)).strftime(DATE_FORMAT)
+        return self._select('phone_key = ? AND "Date" >= ?', (key, since), limit)
+
+    def applied_recently(self, phone, days=30):
+        return bool(self.by_phone(phone, days, limit=1))
+
+    def search(self, manager=None, district=None, since=None, until=None, limit=1000):
+        """Записи по менеджеру/филиалу за период since..until включительно
+        ('YYYY-MM-DD' или 'YYYY-MM-DD HH:MM:SS', как Date)."""
+        where, params = _filters(manager, district, since, until)
+        return self._select(where, params, limit)
+
+    def pages(self, manager=None, district=None, since=None, until=None, size=10000):
+        """Те же записи, что search, страницами по rowid (keyset): в памяти не больше size записей."""
+        where, params = _filters(manager, district, since, until)
+        sql = f'SELECT rowid, {_COLUMNS} FROM history WHERE rowid > ? AND {where} ORDER BY rowid LIMIT ?'
+        after = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, [after, *params, size]).fetchall()
+            if not rows:
+                return
+            after = rows[-1][0]
+            yield [dict(zip(FIELDS, tuple(row)[1:])) for row in rows]
+
+    def changes(self, after_rowid, limit=50000):
+        """(rowid, phone_key, name, Result) записей новее after_rowid — для инкрементальных индексов."""
+        with self._lock:
+            return self._conn.execute('SELECT rowid, phone_key, name, "Result" FROM history'
+                                      ' WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                                      (after_rowid, limit)).fetchall()
+
+    def by_rowids(self, rowids):
+        """{rowid: запись} для rowid из changes()."""
+        if not rowids:
+            return {}
+        sql = f'SELECT rowid, {_COLUMNS} FROM history WHERE rowid IN ({", ".join("?" * len(rowids))})'
+        with self._lock:
+            rows = self._conn.execute(sql, list(rowids)).fetchall()
+        return {row[0]: dict(zip(FIELDS, tuple(row)[1:])) for row in rows}
+
+    def summary(self, by=('Manager',), since=None, until=None):
+        """Заявки, одобрения, доля одобренных, средняя сумма и вероятность по разрезам by
+        за дни since..until включительно ('YYYY-MM-DD'). Читает только агрегаты."""
+        columns = [DIMENSIONS[d] for d in by]
+        where, params = ['1'], []
+        if since is not None:
+            where.append('day >= ?')
+            params.append(str(since)[:10])
+        if until is not None:
+            where.append('day <= ?')
+            params.append(str(until)[:10])
+        values = ['sum(n)', 'sum(approved)', 'sum(amount_sum)', 'sum(probability_sum)', 'sum(probability_n)']
+        sql = f'SELECT {", ".join(columns + values)} FROM history_stats WHERE {" AND ".join(where)}'
+        if columns:
+            sql += f' GROUP BY {", ".join(columns)} ORDER BY {", ".join(columns)}'
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            if not row[len(by)]:
+                continue  # пустой период без разрезов
+            n, approved, amount_sum, probability_sum, probability_n = tuple(row)[len(by):]
+            record = dict(zip(by, row))
+            record.update(n=n, approved=approved, approval_rate=approved / n, avg_amount=amount_sum / n,
+                          mean_probability=probability_sum / probability_n if probability_n else None)
+            result.append(record)
+        return result
+
+    def _stats_from_history(self):
+        return self._conn.execute(
+            f'SELECT {_STATS_KEY}, {_STATS_VALUES} FROM history GROUP BY 1, 2, 3, 4 ORDER BY 1, 2, 3, 4').fetchall()
+
+    def rebuild_stats(self):
+        """Пересчитать агрегаты из всей истории."""
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute('DELETE FROM history_stats')
+                self._conn.execute(f'INSERT INTO history_stats SELECT {_STATS_KEY}, {_STATS_VALUES} FROM history'
+                                   ' GROUP BY 1, 2, 3, 4')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def verify_stats(self):
+        """Число групп, где инкрементальные агрегаты расходятся с пересчётом из истории."""
+        with self._lock:
+            expected = self._stats_from_history()
+            actual = self._conn.execute('SELECT * FROM history_stats ORDER BY 1, 2, 3, 4').fetchall()
+        actual = {tuple(row)[:4]: tuple(row)[4:] for row in actual}
+        mismatched = 0
+        for row in expected:
+            values = actual.pop(tuple(row)[:4], None)
+            if values is None or not all(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+                                         for a, b in zip(values, tuple(row)[4:])):
+                mismatched += 1
+        return mismatched + len(actual)
+
+    def scores(self, since=None, until=None):
+        """(вероятность, сумма, филиал, менеджер, порог, одобрено) по заявкам за дни since..until — для simulator."""
+        where, params = ['repay_probability IS NOT NULL'], []
+        if since is not None:
+            where.append('"Date" >= ?')
+            params.append(str(since)[:10])
+        if until is not None:
+            where.append('"Date" <= ?')
+            params.append(str(until)[:10] + ' 23:59:59')
+        sql = ('SELECT repay_probability, CAST(amount AS REAL), district, "Manager", cutoff, "Result" = \'Одобрено\''
+               f' FROM history WHERE {" AND ".join(where)}')
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def last_rowid(self):
+        with self._lock:
+            return self._conn.execute('SELECT max(rowid) FROM history').fetchone()[0] or 0
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = History()
+    return _history
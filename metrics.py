@@ -0,0 +1,46 @@
+import bisect
+import threading
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин (как в Prometheus)."""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        # Верхняя граница корзины, в которую попадает q-й квантиль
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, n in zip(self.buckets + [float('inf')], counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, seen = [], 0
+            for bound, n in zip(self.buckets + [float('inf')], self.counts):
+                seen += n
+                cumulative.append((bound, seen))
+            return {'buckets': cumulative, 'sum': self.sum, 'count': self.count}
+
+
+# Границы по умолчанию для задержек, секунды
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
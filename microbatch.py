@@ -0,0 +1,100 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import LATENCY_BUCKETS, Histogram
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+# Окно сбора пачки — настраивается по гистограммам batch_size / queue_wait
+MAX_BATCH = int(os.environ.get('SCORING_MAX_BATCH', 64))
+MAX_WAIT = float(os.environ.get('SCORING_BATCH_WAIT_MS', 3)) / 1000
+
+
+class MicroBatcher:
+    """Собирает одновременные запросы скоринга в один векторный вызов.
+
+    Первый запрос ждёт не дольше max_wait секунд, пока подтянутся другие
+    (или пока не наберётся max_batch), затем вся пачка уходит в
+    predict_many(items) одним вызовом и каждый получает свой результат.
+    """
+
+    def __init__(self, predict_many, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.predict_many = predict_many
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='scoring-microbatch', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def predict(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_wait.observe(started - enqueued)
+            self.batch_sizes.observe(len(batch))
+            try:
+                results = self.predict_many([item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    @staticmethod
+    def _snapshot(histogram):
+        # JSON (/health) не допускает inf: верхняя корзина как в Prometheus
+        snap = histogram.snapshot()
+        snap['buckets'] = [('+Inf' if bound == float('inf') else bound, n) for bound, n in snap['buckets']]
+        return snap
+
+    def stats(self):
+        return {
+            'max_batch': self.max_batch,
+            'max_wait': self.max_wait,
+            'batch_size': self._snapshot(self.batch_sizes),
+            'queue_wait': self._snapshot(self.queue_wait),
+            'batch_size_p50': self.batch_sizes.quantile(0.5),
+            'queue_wait_p99': self.queue_wait.quantile(0.99),
+        }
+
+
+_batchers = {}
+_lock = threading.Lock()
+
+
+def get_batcher(name, predict_many, **kwargs):
+    # Один экземпляр на процесс: Streamlit пересоздаёт модульные переменные app.py на каждый rerun
+    batcher = _batchers.get(name)
+    if batcher is None:
+        with _lock:
+            batcher = _batchers.get(name)
+            if batcher is None:
+                batcher = _batchers[name] = MicroBatcher(predict_many, **kwargs)
+    return batcher
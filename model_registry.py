@@ -0,0 +1,136 @@
+import hashlib
+import os
+import threading
+import time
+
+from tracing import stage
+
+# Реестр моделей на процесс: Streamlit перезапускает app.py на каждое
+# действие пользователя, но импортированные модули живут весь процесс,
+# поэтому модель распаковывается один раз и общая для всех сессий.
+_lock = threading.Lock()
+_models = {}  # (abs path, version) -> LoadedModel
+_stats = {}   # abs path -> (mtime_ns, size, version)
+_stale_fast = set()  # (fast dir, version), скомпилированные под другую версию
+
+
+class LoadedModel:
+    def __init__(self, path, version, model, load_time, memory_bytes):
+        self.path = path
+        self.version = version
+        self.model = model
+        self.load_time = load_time
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+
+    def info(self):
+        return {
+            'path': self.path,
+            'version': self.version,
+            'load_time': round(self.load_time, 4),
+            'memory_mb': round(self.memory_bytes / 2**20, 2),
+            'loaded_at': self.loaded_at,
+        }
+
+
+def _rss_bytes():
+    # Resident set size процесса; /proc есть в контейнере и на Linux-серверах
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def file_version(path):
+    # Версия = первые 12 символов sha256 файла; пересчитывается только если
+    # изменились mtime/size, чтобы не читать 1 МБ на каждом rerun
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    cached = _stats.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    version = h.hexdigest()[:12]
+    _stats[path] = (st.st_mtime_ns, st.st_size, version)
+    return version
+
+
+def load(path='model.pkl'):
+    """Вернуть LoadedModel для path, загрузив его не более одного раза."""
+    path = os.path.abspath(path)
+    key = (path, file_version(path))
+    entry = _models.get(key)
+    if entry is not None:
+        return entry
+    with _lock:
+        entry = _models.get(key)
+        if entry is None:
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            import joblib  # тянет за собой pycaret при распаковке — только при первой загрузке
+            with stage('model_load'):
+                model = joblib.load(path)
+            load_time = time.perf_counter() - start
+            memory_bytes = max(_rss_bytes() - rss_before, 0) or os.path.getsize(path)
+            entry = LoadedModel(path, key[1], model, load_time, memory_bytes)
+            # Старые версии того же файла больше не нужны
+            for old in [k for k in _models if k[0] == path]:
+                del _models[old]
+            _models[key] = entry
+    return entry
+
+
+def get_model(path='model.pkl'):
+    return load(path).model
+
+
+def load_fast(path='model.pkl'):
+    """LoadedModel с fast_model.FastModel, если скомпилированный каталог
+    соответствует текущей версии path, иначе None."""
+    from fast_model import FastModel, fast_path_for
+    fast_dir = os.path.abspath(fast_path_for(path))
+    if not os.path.isdir(fast_dir):
+        return None
+    version = file_version(path)
+    key = (fast_dir, version)
+    entry = _models.get(key)
+    if entry is not None or key in _stale_fast:
+        return entry
+    with _lock:
+        entry = _models.get(key)
+        if entry is None:
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            with stage('model_load'):
+                model = FastModel.load(fast_dir)
+            if model.version != version:
+                _stale_fast.add(key)
+                return None
+            entry = LoadedModel(fast_dir, version, model, time.perf_counter() - start,
+                                max(_rss_bytes() - rss_before, 0))
+            for old in [k for k in _models if k[0] == fast_dir]:
+                del _models[old]
+            _models[key] = entry
+    return entry
+
+
+def get_scoring_model(path='model.pkl'):
+    # Для скоринга — быстрый путь, если он скомпилирован для этой версии модели
+    entry = load_fast(path) or load(path)
+    return entry.model
+
+
+def unload(path):
+    # Выгрузить все версии path (после подмены модели в model_store)
+    path = os.path.abspath(path)
+    with _lock:
+        for key in [k for k in _models if k[0] == path]:
+            del _models[key]
+
+
+def loaded_models():
+    return [entry.info() for entry in _models.values()]
@@ -0,0 +1,328 @@
+"""Хранилище версий модели и подмена модели без перезапуска.
+
+    models/
+      CURRENT              версия, которой скорить (одна строка)
+      3f2a9c1b0d4e/
+        manifest.json      дата, sha256 файлов, canary-заявки и эталонные вероятности
+        model.pkl
+        model.fast/        быстрый путь (fast_model) и таблица SHAP (explain), собираются при публикации
+
+    python model_store.py publish model.pkl --activate
+    python model_store.py activate 3f2a9c1b0d4e      # в том числе откат
+    python model_store.py list
+
+Работающее приложение раз в MODEL_POLL_INTERVAL секунд смотрит на CURRENT,
+загружает новую версию в фоне, сверяет контрольные суммы, прогоняет canary и
+только после этого подменяет модель — скоринг всё это время идёт на старой.
+Без каталога models/ источником служит model.pkl: его замена подхватывается
+так же.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+import model_registry
+from tracing import stage
+
+STORE_DIR = os.environ.get('MODEL_STORE', 'models')
+POLL_INTERVAL = float(os.environ.get('MODEL_POLL_INTERVAL', 5))
+MODEL_FILE = 'model.pkl'
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+CANARY_TOLERANCE = 1e-6
+
+# Заявки для проверки версии перед подменой: все филиалы и статусы, пропуски
+CANARY = [
+    {'age': 24, 'amount': 3000, 'credit_history_count': 1, 'district': 'Худжанд', 'duration': 6,
+     'gender': 'Мужчина', 'marital_status': 'Женат/Замужем'},
+    {'age': 35, 'amount': 12000, 'credit_history_count': 0, 'district': 'Душанбе', 'duration': 12,
+     'gender': 'Женщина', 'marital_status': 'Не женат/Не замужем'},
+    {'age': 52, 'amount': 800, 'credit_history_count': 4, 'district': 'Пенджикент', 'duration': 3,
+     'gender': 'Мужчина', 'marital_status': 'Вдова/Вдовец'},
+    {'age': 19, 'amount': 25000, 'credit_history_count': 0, 'district': 'Джаббор Расулов', 'duration': 9,
+     'gender': 'Женщина', 'marital_status': 'Разведен'},
+    {'age': 41, 'amount': 5000, 'credit_history_count': 2, 'district': 'Спитамен', 'duration': 6,
+     'gender': 'Мужчина', 'marital_status': 'Женат/Замужем'},
+    {'age': 28, 'amount': 1500, 'credit_history_count': 1, 'district': 'Исфара', 'duration': 3,
+     'gender': 'Женщина', 'marital_status': 'Женат/Замужем'},
+    {'age': 60, 'amount': 3000, 'credit_history_count': 3, 'district': 'unknown-branch', 'duration': 12,
+     'gender': 'Мужчина', 'marital_status': None},
+]
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path, text):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def smoke_test(model, applicants=CANARY, expected=None, tolerance=CANARY_TOLERANCE):
+    """Вероятности модели на canary-заявках; ValueError, если они вне [0, 1]
+    или расходятся с эталоном больше чем на tolerance."""
+    from scoring import predict_applicants
+    probabilities = [float(p) for p in predict_applicants(model, applicants)]
+    if len(probabilities) != len(applicants) or not all(0 <= p <= 1 for p in probabilities):
+        raise ValueError(f'canary: некорректные вероятности {probabilities}')
+    if expected is not None:
+        diff = max(abs(p - e) for p, e in zip(probabilities, expected))
+        if len(expected) != len(probabilities) or diff > tolerance:
+            raise ValueError(f'canary: расхождение с эталоном max |Δp| = {diff:.3g}')
+    return probabilities
+
+
+class ModelStore:
+    """Каталог версий: <root>/<версия>/ с манифестом и указатель <root>/CURRENT."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def exists(self):
+        return os.path.isdir(self.root)
+
+    def path(self, version, name=MODEL_FILE):
+        return os.path.join(self.root, version, name)
+
+    def manifest(self, version):
+        with open(self.path(version, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+
+    def versions(self):
+        if not self.exists():
+            return []
+        found = [v for v in os.listdir(self.root) if os.path.isfile(self.path(v, MANIFEST_FILE))]
+        return sorted(found, key=lambda v: self.manifest(v)['created'])
+
+    def current(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def verify(self, version):
+        """Сверить sha256 файлов версии с манифестом. Возвращает манифест."""
+        manifest = self.manifest(version)
+        for name, digest in manifest['files'].items():
+            if _sha256(os.path.join(self.root, version, name)) != digest:
+                raise ValueError(f'не совпадает контрольная сумма {name}')
+        return manifest
+
+    def publish(self, source, note=''):
+        """Добавить model.pkl как новую версию (вместе с быстрым путём). Возвращает версию."""
+        from explain import compile_tables
+        from fast_model import FastModel, compile_pipeline, verify
+        loaded = model_registry.load(source)
+        version = loaded.version
+        if os.path.isfile(self.path(version, MANIFEST_FILE)):
+            return version
+        # Версия собирается во временном каталоге и появляется одним rename
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, f'.{version}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        try:
+            shutil.copy2(source, os.path.join(tmp, MODEL_FILE))
+            fast_dir = os.path.join(tmp, 'model.fast')
+            compile_pipeline(loaded.model, fast_dir, version)
+            verify(loaded.model, FastModel.load(fast_dir))
+            try:
+                compile_tables(fast_dir)
+            except ValueError:
+                pass  # не симметричные деревья: объяснения прямым вызовом CatBoost
+            files = {}
+            for dirpath, _, filenames in os.walk(tmp):
+                for name in filenames:
+                    full = os.path.join(dirpath, name)
+                    files[os.path.relpath(full, tmp).replace(os.sep, '/')] = _sha256(full)
+            manifest = {
+                'version': version,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'source': os.path.abspath(source),
+                'note': note,
+                'files': files,
+                'canary': {'applicants': CANARY, 'probabilities': smoke_test(loaded.model)},
+            }
+            with open(os.path.join(tmp, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+            os.rename(tmp, os.path.join(self.root, version))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return version
+
+    def activate(self, version):
+        # Работающие процессы подхватят новый CURRENT сами
+        self.verify(version)
+        _write_atomic(os.path.join(self.root, CURRENT_FILE), version + '\n')
+
+
+class LiveModel:
+    """Модель, которой сейчас скорят.
+
+    Новая версия грузится и проверяется в фоновом потоке, подмена — одно
+    присваивание ссылки: запросы, уже получившие старую модель, дорабатывают
+    на ней, новые сразу идут на новую.
+    """
+
+    def __init__(self, store, fallback='model.pkl', interval=POLL_INTERVAL):
+        self.store = store
+        self.fallback = fallback
+        self.interval = interval
+        self.ready = threading.Event()  # первая попытка загрузки завершена
+        self.swaps = 0
+        self.last_error = None
+        self._active = None
+        self._loading = None
+        self._rejected = set()
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        active = self._active
+        return active and active.version
+
+    def _target(self):
+        # (версия, путь к model.pkl, взята ли версия из хранилища)
+        version = self.store.current() if self.store.exists() else None
+        if version:
+            return version, self.store.path(version), True
+        return model_registry.file_version(self.fallback), self.fallback, False
+
+    def check(self):
+        """Начать фоновую загрузку, если целевая версия сменилась. Не блокирует."""
+        self._next_check = time.monotonic() + self.interval
+        try:
+            version, path, in_store = self._target()
+        except OSError as e:
+            self.last_error = str(e)
+            return
+        if version == self.version:
+            return
+        with self._lock:
+            if self._loading is not None or version in self._rejected:
+                return
+            self._loading = version
+        threading.Thread(target=self._swap, args=(version, path, in_store), name='model-swap', daemon=True).start()
+
+    def _prepare(self, version, path, in_store):
+        canary = self.store.verify(version)['canary'] if in_store else None
+        entry = model_registry.load_fast(path) or model_registry.load(path)
+        if entry.version != version:
+            raise ValueError(f'файл версии {entry.version}, ожидалась {version}')
+        if canary:
+            smoke_test(entry.model, canary['applicants'], canary['probabilities'])
+        else:
+            smoke_test(entry.model)
+        return entry
+
+    def _swap(self, version, path, in_store):
+        try:
+            with stage('model_swap'):
+                entry = self._prepare(version, path, in_store)
+        except Exception as e:
+            # Битая версия не подменяет рабочую и не перезагружается по кругу
+            self._rejected.add(version)
+            self.last_error = f'{version}: {e}'
+        else:
+            old, self._active = self._active, entry
+            if old is not None:
+                self.swaps += 1
+                if old.path != entry.path:
+                    model_registry.unload(old.path)
+            self.last_error = None
+        finally:
+            self._loading = None
+            self.ready.set()
+
+    def _maybe_check(self):
+        if time.monotonic() >= self._next_check:
+            self.check()
+
+    def start(self):
+        """Запустить загрузку (если нужна) и вернуть событие готовности."""
+        self._maybe_check()
+        return self.ready
+
+    def current(self):
+        """LoadedModel для скоринга; ждёт только самую первую загрузку."""
+        self._maybe_check()
+        active = self._active
+        if active is None:
+            self.ready.wait()
+            active = self._active
+            if active is None:
+                raise RuntimeError(f'модель не загружена: {self.last_error}')
+        return active
+
+    def status(self):
+        active = self._active
+        return {
+            'version': active and active.version,
+            'path': active and active.path,
+            'store': os.path.abspath(self.store.root) if self.store.exists() else None,
+            'loading': self._loading,
+            'swaps': self.swaps,
+            'rejected': sorted(self._rejected),
+            'last_error': self.last_error,
+        }
+
+
+# Одна на процесс — общая для сессий Streamlit и запросов API
+live = LiveModel(ModelStore())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Хранилище версий модели')
+    parser.add_argument('--store', default=STORE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish = commands.add_parser('publish', help='добавить model.pkl как новую версию')
+    publish.add_argument('source')
+    publish.add_argument('--note', default='')
+    publish.add_argument('--activate', action='store_true')
+    activate = commands.add_parser('activate', help='сделать версию текущей (или откатиться)')
+    activate.add_argument('version')
+    verify = commands.add_parser('verify', help='проверить контрольные суммы и canary')
+    verify.add_argument('version')
+    commands.add_parser('list')
+    args = parser.parse_args(argv)
+
+    store = ModelStore(args.store)
+    if args.command == 'publish':
+        version = store.publish(args.source, args.note)
+        print(version)
+        if args.activate:
+            store.activate(version)
+    elif args.command in ('activate', 'verify'):
+        # Та же проверка, что сделает приложение, — до того как указатель сменится
+        canary = store.verify(args.version)['canary']
+        path = store.path(args.version)
+        entry = model_registry.load_fast(path) or model_registry.load(path)
+        smoke_test(entry.model, canary['applicants'], canary['probabilities'])
+        if args.command == 'activate':
+            store.activate(args.version)
+        print(f'{args.version}: ok')
+    else:
+        current = store.current()
+        for version in store.versions():
+            manifest = store.manifest(version)
+            print(f"{'*' if version == current else ' '} {version}  {manifest['created']}  {manifest['note']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
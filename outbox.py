@@ -0,0 +1,215 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import sheets
+
+OUTBOX_PATH = 'outbox.sqlite3'
+_KEY = sheets.COLUMNS.index('DocumentNumber')
+
+
+def _json_default(value):
+    # numpy-скаляры из DataFrame.values.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class Outbox:
+    """Локальная очередь записей для Google Sheets.
+
+    Запись сначала попадает в SQLite (переживает перезапуск и сетевые ошибки),
+    фоновый поток выгружает её в лист пачками — один append_rows на пачку.
+    Ключ записи — DocumentNumber (уникален, scoring.document_number_for):
+    повтор того же документа игнорируется. Попытка отмечается до отправки;
+    пачка, чья прошлая попытка не подтвердилась (ошибка или падение процесса
+    после append_rows), сначала сверяется с листом (sent_keys), чтобы не
+    задвоить строки. После max_attempts неудачных попыток строки
+    откладываются (parked) и не держат очередь; retry_parked возвращает их.
+    Отправленные строки хранятся keep_sent секунд и удаляются.
+    """
+
+    def __init__(self, path=OUTBOX_PATH, sink=None, sent_keys=None, batch_size=200, interval=1.0,
+                 base_backoff=1.0, max_backoff=60.0, max_attempts=20, keep_sent=24 * 3600):
+        self.path = path
+        if sink is None:
+            sink, sent_keys = sheets.append_rows, sent_keys or sheets.document_numbers
+        self.sink = sink
+        self.sent_keys = sent_keys
+        self.max_attempts = max_attempts
+        self.keep_sent = keep_sent
+        self.batch_size = batch_size
+        self.interval = interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._failures = 0
+        self._latencies = deque(maxlen=100)
+        self.sent = 0
+        self.errors = 0
+        self.last_error = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            ' document_number TEXT PRIMARY KEY,'
+            ' row TEXT NOT NULL,'
+            ' created REAL NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' sent REAL,'
+            ' parked REAL)'
+        )
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(outbox)')]
+        if 'submission' in columns:
+            # Очередь прошлой версии (ключ uuid4): неотправленные строки сохраняют свои ключи
+            self._conn.execute('ALTER TABLE outbox RENAME COLUMN submission TO document_number')
+        if 'parked' not in columns:
+            self._conn.execute('ALTER TABLE outbox ADD COLUMN parked REAL')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (sent, created)')
+
+    def enqueue(self, rows, keys=None):
+        """Поставить строки листа (sheets.to_rows) в очередь; ключ по умолчанию — их DocumentNumber."""
+        now = time.time()
+        keys = keys or [row[_KEY] for row in rows]
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO outbox (document_number, row, created) VALUES (?, ?, ?)',
+                [(str(key), json.dumps(row, ensure_ascii=False, default=_json_default), now)
+                 for key, row in zip(keys, rows)],
+            )
+        self._wake.set()
+
+    def depth(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM outbox WHERE sent IS NULL AND parked IS NULL').fetchone()[0]
+
+    def parked(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM outbox WHERE parked IS NOT NULL').fetchone()[0]
+
+    def retry_parked(self):
+        """Вернуть отложенные строки в очередь (например, после исправления листа)."""
+        with self._lock:
+            n = self._conn.execute('UPDATE outbox SET parked = NULL, attempts = 0 WHERE parked IS NOT NULL').rowcount
+        self._wake.set()
+        return n
+
+    def _mark_sent(self, keys):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany('UPDATE outbox SET sent = ? WHERE document_number = ?', [(now, key) for key in keys])
+            self._conn.execute('DELETE FROM outbox WHERE sent < ?', (now - self.keep_sent,))
+
+    def flush(self):
+        """Выгрузить одну пачку. Возвращает число отправленных строк."""
+        with self._lock:
+            pending = self._conn.execute(
+                'SELECT document_number, row, attempts FROM outbox WHERE sent IS NULL AND parked IS NULL'
+                ' ORDER BY created LIMIT ?',
+                (self.batch_size,),
+            ).fetchall()
+        if not pending:
+            return 0
+        keys = [key for key, _, _ in pending]
+        start = time.perf_counter()
+        try:
+            if self.sent_keys is not None and any(attempts for _, _, attempts in pending):
+                # Прошлая попытка могла дойти до листа: уже записанные не отправлять повторно
+                present = self.sent_keys()
+                done = [key for key in keys if key in present]
+                if done:
+                    self._mark_sent(done)
+                    pending = [p for p in pending if p[0] not in present]
+                    keys = [key for key, _, _ in pending]
+                    if not pending:
+                        return len(done)
+            with self._lock:
+                self._conn.executemany('UPDATE outbox SET attempts = attempts + 1 WHERE document_number = ?',
+                                       [(key,) for key in keys])
+            self.sink([json.loads(row) for _, row, _ in pending])
+        except Exception as e:
+            with self._lock:
+                self._conn.executemany(
+                    'UPDATE outbox SET parked = ? WHERE document_number = ? AND attempts >= ?',
+                    [(time.time(), key, self.max_attempts) for key in keys])
+            self.errors += 1
+            self.last_error = repr(e)
+            raise
+        self._latencies.append(time.perf_counter() - start)
+        self._mark_sent(keys)
+        self.sent += len(pending)
+        return len(pending)
+
+    def drain(self):
+        total = 0
+        while True:
+            n = self.flush()
+            if not n:
+                return total
+            total += n
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.drain()
+                self._failures = 0
+                delay = self.interval
+            except Exception:
+                # Экспоненциальная задержка с джиттером
+                self._failures += 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (self._failures - 1))
+                delay *= random.uniform(0.5, 1.0)
+                self._stop.wait(delay)
+                continue
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sheets-outbox', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        return {
+            'depth': self.depth(),
+            'parked': self.parked(),
+            'sent': self.sent,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'flush_latency_last': self._latencies[-1] if latencies else None,
+            'flush_latency_p50': latencies[len(latencies) // 2] if latencies else None,
+            'flush_latency_max': latencies[-1] if latencies else None,
+        }
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox().start()
+    return _outbox
+
+
+# Function to duplicate data to Google Sheets (через локальную очередь)
+def duplicate_to_gsheet(new_row):
+    get_outbox().enqueue(sheets.to_rows(new_row))
@@ -0,0 +1,195 @@
+import os
+import re
+import threading
+import types
+from collections import OrderedDict
+
+import fpdf.fpdf
+from fpdf import FPDF
+from fpdf.ttfonts import TTFontFile
+
+from tracing import timed
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FONT_PATH = os.path.join(BASE_DIR, 'DejaVuSansCondensed.ttf')
+LOGO_PATH = os.path.join(BASE_DIR, 'km_logo.png')
+
+# Mapping between internal variable names and human-readable names
+variable_mapping = {
+    'Manager': 'Менеджер',
+    'district': 'Филиал',
+    'phone': 'Телефон номер',
+    'name': 'ФИО',
+    'age': 'Возраст',
+    'gender': 'Пол',
+    'amount': 'Сумма рассрочки',
+    'duration': 'Срок',
+    'marital_status': 'Семейное положение',
+    'credit_history_count': 'Количество кредитов(история)',
+    'Result': 'Результат',
+    'Probability': 'Вероятность возврата',
+    'Date': 'Дата',
+    'DocumentNumber': 'Номер документа'
+}
+
+var = ['Manager', 'district', 'phone', 'name', 'age', 'gender', 'amount', 'duration',
+       'marital_status', 'credit_history_count', 'Result', 'Probability', 'Date', 'DocumentNumber']
+
+# Разобранные один раз на процесс метрики шрифта и PNG логотипа
+_lock = threading.Lock()
+_fonts = {}
+_images = {}
+
+
+class _SubsetCache(TTFontFile):
+    # fpdf 1.7.2 при каждом output() заново читает TTF и строит подмножество
+    # глифов. В документах почти всегда одни и те же символы, поэтому готовое
+    # подмножество кэшируется по набору кодов.
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+    max_size = 64
+
+    def makeSubset(self, file, subset):
+        key = (file, tuple(subset))
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+        if hit is None:
+            stream = TTFontFile.makeSubset(self, file, subset)
+            hit = (stream, dict(self.codeToGlyph), self.maxUni)
+            with self._cache_lock:
+                self._cache[key] = hit
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        stream, code_to_glyph, self.maxUni = hit
+        self.codeToGlyph = dict(code_to_glyph)
+        return stream
+
+
+# FPDF._putfonts с _SubsetCache вместо TTFontFile в глобальных именах: кэш
+# действует только в ReportPDF, модуль fpdf и другие FPDF в процессе не меняются
+_putfonts = types.FunctionType(FPDF._putfonts.__code__, dict(vars(fpdf.fpdf), TTFontFile=_SubsetCache),
+                               '_putfonts', FPDF._putfonts.__defaults__, FPDF._putfonts.__closure__)
+
+
+def _font_metrics(path):
+    metrics = _fonts.get(path)
+    if metrics is None:
+        with _lock:
+            metrics = _fonts.get(path)
+            if metrics is None:
+                ttf = TTFontFile()
+                ttf.getMetrics(path)
+                metrics = {
+                    'name': re.sub('[ ()]', '', ttf.fullName),
+                    'type': 'TTF',
+                    'desc': {
+                        'Ascent': int(round(ttf.ascent, 0)),
+                        'Descent': int(round(ttf.descent, 0)),
+                        'CapHeight': int(round(ttf.capHeight, 0)),
+                        'Flags': ttf.flags,
+                        'FontBBox': "[%s %s %s %s]" % tuple(int(round(b, 0)) for b in ttf.bbox),
+                        'ItalicAngle': int(ttf.italicAngle),
+                        'StemV': int(round(ttf.stemV, 0)),
+                        'MissingWidth': int(round(ttf.defaultWidth, 0)),
+                    },
+                    'up': round(ttf.underlinePosition),
+                    'ut': round(ttf.underlineThickness),
+                    'cw': ttf.charWidths,
+                    'originalsize': os.stat(path).st_size,
+                }
+                _fonts[path] = metrics
+    return metrics
+
+
+class ReportPDF(FPDF):
+    """FPDF, который берёт шрифт и картинки из кэша процесса."""
+
+    _putfonts = _putfonts
+
+    def add_font(self, family, style='', fname='', uni=False):
+        if not uni:
+            return FPDF.add_font(self, family, style, fname, uni)
+        fontkey = family.lower() + style.upper()
+        if fontkey in self.fonts:
+            return
+        metrics = _font_metrics(os.path.abspath(fname))
+        self.fonts[fontkey] = {
+            'i': len(self.fonts) + 1, 'type': metrics['type'],
+            'name': metrics['name'], 'desc': metrics['desc'],
+            'up': metrics['up'], 'ut': metrics['ut'],
+            'cw': metrics['cw'],
+            'ttffile': os.path.abspath(fname), 'fontkey': fontkey,
+            'subset': list(range(0, 32)), 'unifilename': None,
+        }
+        self.font_files[fontkey] = {'length1': metrics['originalsize'],
+                                    'type': "TTF", 'ttffile': os.path.abspath(fname)}
+        self.font_files[fname] = {'type': "TTF"}
+
+    def image(self, name, x=None, y=None, w=0, h=0, type='', link=''):
+        if name not in self.images and name.lower().endswith('.png'):
+            info = _images.get(name)
+            if info is None:
+                with _lock:
+                    info = _images.get(name)
+                    if info is None:
+                        info = _images[name] = self._parsepng(name)
+            # _putimages удаляет data из info — каждому документу своя копия
+            self.images[name] = dict(info, i=len(self.images) + 1)
+            if 'smask' in info and self.pdf_version < '1.4':
+                # _parsepng ставит это сам; при попадании в кэш — вручную
+                self.pdf_version = '1.4'
+        return FPDF.image(self, name, x, y, w, h, type, link)
+
+
+def draw_document(pdf, data):
+    # Одна страница документа скоринга
+    pdf.add_page()
+
+    # Set font for the title
+    pdf.add_font('DejaVu', '', FONT_PATH, uni=True)
+    pdf.set_font('DejaVu', '', 14)
+
+    pdf.image(LOGO_PATH, x=15, y=15, w=40)
+    pdf.ln(20)
+    # Title
+    pdf.cell(200, 10, txt="Скоринг рассрочки", ln=True, align='C')
+    pdf.ln(10)  # Add a little space after the title
+
+    # Add content to the PDF using a table
+    pdf.set_fill_color(255, 255, 255)  # Set white fill color
+    col_width = 80
+    row_height = 10
+    x_position = (pdf.w - col_width * 2) / 2  # Calculate x position to center the table
+    y_position = pdf.get_y()
+    for var_name in var:
+        # Get the human-readable name corresponding to the internal variable name
+        variable = variable_mapping.get(var_name, '')
+        value = data.get(var_name, [''])[0]  # Get the value from data or empty string if not found
+        pdf.set_xy(x_position, y_position)
+        pdf.cell(col_width, row_height, txt=variable, border=1, fill=False)
+        pdf.cell(col_width, row_height, txt=str(value), border=1, fill=False)
+        pdf.ln(row_height)
+        y_position = pdf.get_y()
+    # Основные факторы решения (explain.py), по строке на признак; в старых записях их нет
+    factors = data.get('Factors', [None])[0]
+    if isinstance(factors, str) and factors:
+        for i, line in enumerate(factors.split('; ')):
+            pdf.set_xy(x_position, y_position)
+            pdf.cell(col_width, row_height, txt='Основные факторы' if i == 0 else '', border=1, fill=False)
+            pdf.cell(col_width, row_height, txt=line, border=1, fill=False)
+            pdf.ln(row_height)
+            y_position = pdf.get_y()
+    pdf.set_xy(x_position, pdf.get_y() + 20)  # Move down 10 units
+    pdf.cell(col_width, row_height, txt="Менеджер:", border=0, fill=False)
+    pdf.cell(col_width, row_height, txt="Директор:", border=0, fill=False)
+
+
+@timed('generate_pdf')
+def render_pdf(data):
+    """Документ скоринга в виде bytes, без временных файлов на диске."""
+    pdf = ReportPDF()
+    draw_document(pdf, data)
+    # manage binary data as latin1, как делает сам fpdf при записи в файл
+    return pdf.output(dest='S').encode('latin1')
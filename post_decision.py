@@ -0,0 +1,79 @@
+"""Работа после решения: PDF, история и выгрузка в Google Sheets параллельно.
+
+Как только predict_proba вернул вероятность, start() ставит задачи в общий
+для процесса пул потоков, и страница сразу показывает вердикт. Кнопка
+«Скачать документ» берёт bytes из future PDF; ошибка одной задачи не мешает
+остальным и показывается отдельно.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+WORKERS = int(os.environ.get('POST_DECISION_WORKERS', 4))
+
+logger = logging.getLogger(__name__)
+
+
+class PostDecision:
+    """Задачи одного решения: {имя: Future}; label — например, номер документа."""
+
+    def __init__(self, tasks, label=None):
+        self.tasks = tasks
+        self.label = label
+
+    def result(self, name, timeout=None):
+        return self.tasks[name].result(timeout)
+
+    def wait(self, timeout=None):
+        # -> имена незавершённых задач; wait один раз, таймаут общий на все задачи
+        not_done = wait(self.tasks.values(), timeout).not_done
+        return [name for name, future in self.tasks.items() if future in not_done]
+
+    def failures(self):
+        # Только завершившиеся с ошибкой; ещё идущие не ждём
+        return {name: future.exception() for name, future in self.tasks.items()
+                if future.done() and future.exception() is not None}
+
+
+class Pipeline:
+    def __init__(self, workers=WORKERS):
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='post-decision')
+        self.submitted = 0
+        self.failed = 0
+        self.recent_failures = deque(maxlen=20)
+
+    def start(self, tasks, label=None):
+        """tasks — {имя: функция без аргументов}; все сразу уходят в пул."""
+        futures = {}
+        for name, fn in tasks.items():
+            future = self._pool.submit(fn)
+            future.add_done_callback(lambda f, name=name: self._done(name, f))
+            futures[name] = future
+        self.submitted += len(futures)
+        return PostDecision(futures, label)
+
+    def _done(self, name, future):
+        error = future.exception()
+        if error is not None:
+            self.failed += 1
+            self.recent_failures.append({'time': time.time(), 'task': name, 'error': repr(error)})
+            logger.warning('post-decision task %s failed: %r', name, error)
+
+    def stats(self):
+        return {'submitted': self.submitted, 'failed': self.failed, 'recent_failures': list(self.recent_failures)}
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = Pipeline()
+    return _pipeline
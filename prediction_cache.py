@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+
+from scoring import mapping_dis, mapping_mar
+
+CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value
+
+
+def _label(value, mapping):
+    if value is None or value != value:
+        return None
+    value = str(value).strip()
+    return mapping.get(value, value)
+
+
+def feature_key(applicant):
+    # Только то, что видит модель: ФИО, телефон, менеджер на ключ не влияют
+    gender = applicant.get('gender')
+    if isinstance(gender, str):
+        gender = 1.0 if gender.strip() in ('Мужчина', '1', '1.0') else 0.0
+    return (
+        _number(applicant.get('age')),
+        _number(applicant.get('amount')),
+        _number(applicant.get('credit_history_count')),
+        _label(applicant.get('district'), mapping_dis),
+        _number(applicant.get('duration')),
+        _number(gender),
+        _label(applicant.get('marital_status'), mapping_mar),
+    )
+
+
+class PredictionCache:
+    """Ограниченный LRU-кэш вероятностей по нормализованным признакам.
+
+    Кэш привязан к версии модели: при смене версии он очищается.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._data.clear()
+            self.version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._check_version(version)
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, key, value):
+        with self._lock:
+            self._check_version(version)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, version, applicant, compute):
+        # compute(applicant) вызывается вне блокировки — кэш не сериализует скоринг
+        key = feature_key(applicant)
+        value = self.get(version, key)
+        if value is None:
+            value = float(compute(applicant))
+            self.put(version, key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'version': self.version,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else None,
+            }
+
+
+# Один кэш на процесс — общий для сессий Streamlit и запросов API
+cache = PredictionCache()
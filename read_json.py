@@ -1,15 +1,145 @@
-import requests
+import json
 import os
+import threading
+import time
+
+import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from tracing import timed
 load_dotenv()
 
 LINK = os.environ.get("LINK")
+# Сколько секунд считать ключ сервисного аккаунта свежим
+CREDENTIALS_TTL = float(os.environ.get("CREDENTIALS_TTL", 3600))
+# Необязательный зашифрованный кэш на диске для холодного старта (ключ Fernet)
+CREDENTIALS_CACHE_PATH = os.environ.get("CREDENTIALS_CACHE_PATH")
+CREDENTIALS_CACHE_KEY = os.environ.get("CREDENTIALS_CACHE_KEY")
+TIMEOUT = (3.05, 10)
 
+headers = {
+    'Content-Type': 'application/json'
+    }
 
-def response_json():
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=2))
+_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=2))
+
+
+@timed('read_json')
+def fetch_json():
+    response = _session.get(LINK, headers=headers, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+class CredentialsProvider:
+    """Кэш ключа сервисного аккаунта в памяти (TTL) и, по желанию, на диске.
+
+    get() не ходит в сеть, если есть хоть какое-то значение: за refresh_ahead
+    секунд до истечения (и после) обновление запускается в фоне, а вызывающий
+    получает текущее значение. Блокирующий запрос — только при самом первом
+    старте без дискового кэша.
+    """
+
+    def __init__(self, fetch=fetch_json, ttl=CREDENTIALS_TTL, refresh_ahead=None,
+                 cache_path=CREDENTIALS_CACHE_PATH, cache_key=CREDENTIALS_CACHE_KEY):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_ahead = ttl * 0.2 if refresh_ahead is None else refresh_ahead
+        self.cache_path = cache_path
+        self.cache_key = cache_key
+        self._value = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.last_error = None
+
+    def _fernet(self):
+        from cryptography.fernet import Fernet
+        return Fernet(self.cache_key)
+
+    def _read_disk(self):
+        if not (self.cache_path and self.cache_key and os.path.exists(self.cache_path)):
+            return None
+        try:
+            with open(self.cache_path, 'rb') as f:
+                payload = json.loads(self._fernet().decrypt(f.read()))
+            return payload['value'], payload['expires']
+        except Exception as e:
+            self.last_error = repr(e)
+            return None
 
-    headers = {
-        'Content-Type': 'application/json'
-        }
-    response = requests.get(LINK, headers=headers)
-    return response.json()
\ No newline at end of file
+    def _write_disk(self, value, expires):
+        if not (self.cache_path and self.cache_key):
+            return
+        token = self._fernet().encrypt(json.dumps({'value': value, 'expires': expires}).encode())
+        tmp = self.cache_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(token)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, self.cache_path)
+
+    def refresh(self):
+        value = self.fetch()
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._value, self._expires = value, expires
+        try:
+            self._write_disk(value, expires)
+        except Exception as e:
+            self.last_error = repr(e)
+        return value
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = repr(e)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='credentials-refresh', daemon=True).start()
+
+    def prefetch(self):
+        # Прогреть кэш при старте приложения, не дожидаясь первой выгрузки
+        if self._value is None:
+            cached = self._read_disk()
+            if cached is not None:
+                with self._lock:
+                    self._value, self._expires = cached
+        if self._value is None or time.time() >= self._expires - self.refresh_ahead:
+            self._refresh_in_background()
+
+    def invalidate(self):
+        # Ключ отвергнут API: текущее значение ещё отдаётся, свежее грузится в фоне
+        with self._lock:
+            self._expires = 0.0
+        self._refresh_in_background()
+
+    def get(self):
+        if self._value is None:
+            cached = self._read_disk()
+            if cached is not None:
+                with self._lock:
+                    if self._value is None:
+                        self._value, self._expires = cached
+        if self._value is None:
+            return self.refresh()
+        if time.time() >= self._expires - self.refresh_ahead:
+            self._refresh_in_background()
+        return self._value
+
+
+provider = CredentialsProvider()
+
+
+def response_json():
+    return provider.get()
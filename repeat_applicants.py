@@ -0,0 +1,203 @@
+"""Повторные обращения: индекс прежних заявителей в памяти.
+
+Ключи — нормализованный телефон (history.phone_key) и ключ ФИО (регистр,
+порядок слов, таджикские буквы, латиница). ФИО ищется и приблизительно: одна
+опечатка (вставка, пропуск, замена или перестановка букв) в одном слове от
+4 букв — через индекс удалений по словам, без перебора всех имён. Индекс
+хранит только rowid записей истории и дополняется по rowid > последнего,
+поэтому поиск дёшев на каждом rerun Streamlit и видит записи других
+процессов (API).
+"""
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from history import get_history, phone_key
+
+# Таджикские и «мягкие» буквы к русским базовым
+_FOLD = str.maketrans({'ё': 'е', 'э': 'е', 'й': 'и', 'ӣ': 'и', 'ӯ': 'у', 'ҳ': 'х', 'қ': 'к', 'ғ': 'г', 'ҷ': 'ч',
+                       'ъ': '', 'ь': ''})
+# Латиница (в порядке: сначала сочетания)
+_LATIN = [('sh', 'ш'), ('ch', 'ч'), ('zh', 'ж'), ('kh', 'х'), ('yo', 'е'), ('ye', 'е'), ('yu', 'ю'), ('ya', 'я'),
+          ('ts', 'ц'), ('j', 'дж')]
+_LATIN_LETTERS = str.maketrans('abvgdezikl' 'mnoprstufx' 'hcyqw', 'абвгдезикл' 'мнопрстуфх' 'хкикв')
+_APOSTROPHES = re.compile(r"['`ʼ‘’]")
+_HAS_LATIN = re.compile(r'[a-z]')
+_REPEATS = re.compile(r'(.)\1+')
+_WORDS = re.compile(r'[а-я]+')
+MAX_RESULTS = 10
+# Короче — опечатка слишком часто даёт другое настоящее имя
+FUZZY_MIN_LENGTH = 4
+
+
+def name_key(name):
+    """'Зоқиров  Улуғбек' и 'ulugbek zokirov' -> один ключ; None, если меньше двух слов."""
+    if not name or name != name:
+        return None
+    return _name_key(str(name))
+
+
+@lru_cache(maxsize=65536)
+def _name_key(name):
+    text = name.lower()
+    if _HAS_LATIN.search(text):
+        text = _APOSTROPHES.sub('', text)
+        for latin, cyrillic in _LATIN:
+            text = text.replace(latin, cyrillic)
+        text = text.translate(_LATIN_LETTERS)
+    words = _WORDS.findall(_REPEATS.sub(r'\1', text.translate(_FOLD)))
+    if len(words) < 2:
+        return None
+    return ' '.join(sorted(words))
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _one_edit(a, b):
+    # Расстояние Дамерау–Левенштейна (без повторных правок) не больше 1
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 1 or (len(diff) == 2 and diff[1] == diff[0] + 1
+                                  and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    return a in _deletes(b)
+
+
+class ApplicantIndex:
+    def __init__(self, history):
+        self.history = history
+        self.ready = threading.Event()
+        self._by_phone = defaultdict(list)
+        self._by_name = defaultdict(list)
+        # Для приблизительного ФИО: слово или слово без одной буквы -> слова из ключей
+        self._words_by_delete = defaultdict(set)
+        self._approved = set()
+        self._last_rowid = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def refresh(self, chunk=50000):
+        # Дочитать новые записи истории; при первом вызове — всю таблицу
+        with self._lock:
+            while True:
+                rows = self.history.changes(self._last_rowid, chunk)
+                for rowid, phone, name, result in rows:
+                    if result == 'Одобрено':
+                        self._approved.add(rowid)
+                    if phone:
+                        self._by_phone[phone].append(rowid)
+                    key = name_key(name)
+                    if key:
+                        if key not in self._by_name:
+                            self._add_words(key)
+                        self._by_name[key].append(rowid)
+                if rows:
+                    self._last_rowid = rows[-1][0]
+                if len(rows) < chunk:
+                    break
+        self.ready.set()
+
+    def _add_words(self, key):
+        for word in key.split():
+            if len(word) >= FUZZY_MIN_LENGTH:
+                for variant in _deletes(word) | {word}:
+                    self._words_by_delete[variant].add(word)
+
+    def _similar_keys(self, key):
+        # Известные ключи ФИО, отличные от key одной опечаткой в одном слове
+        words = key.split()
+        found = set()
+        for i, word in enumerate(words):
+            if len(word) < FUZZY_MIN_LENGTH:
+                continue
+            candidates = set()
+            for variant in _deletes(word) | {word}:
+                candidates |= self._words_by_delete.get(variant, set())
+            others = words[:i] + words[i + 1:]
+            for similar in candidates:
+                if similar != word and _one_edit(word, similar):
+                    candidate = ' '.join(sorted(others + [similar]))
+                    if candidate in self._by_name:
+                        found.add(candidate)
+        return found
+
+    def start(self):
+        # Первичное построение в фоне, чтобы не задерживать страницу
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.refresh, name='applicant-index', daemon=True)
+                self._thread.start()
+        return self.ready
+
+    def lookup(self, phone=None, name=None, limit=MAX_RESULTS):
+        """Прежние записи по телефону и/или ФИО, новые первыми; 'match' — чем совпали
+        ('телефон', 'ФИО' или 'ФИО неточно' — одна опечатка). Пока индекс строится — пустой список."""
+        if not self.ready.is_set():
+            return []
+        self.refresh()
+        matches = self._matches(phone, name)
+        rowids = sorted(matches)[-limit:]
+        records = self.history.by_rowids(rowids)
+        result = []
+        for rowid in reversed(rowids):
+            record = records[rowid]
+            record['match'] = ', '.join(matches[rowid])
+            result.append(record)
+        return result
+
+    def _matches(self, phone, name):
+        # Списки индекса копируются под блокировкой: refresh другой сессии дописывает их
+        key = name_key(name)
+        with self._lock:
+            found = [('телефон', list(self._by_phone.get(phone_key(phone), ()))),
+                     ('ФИО', list(self._by_name.get(key, ())))]
+            if key:
+                found.append(('ФИО неточно', [rowid for similar in self._similar_keys(key)
+                                              for rowid in self._by_name[similar]]))
+        matches = {}
+        for label, rowids in found:
+            for rowid in rowids:
+                matches.setdefault(rowid, []).append(label)
+        return matches
+
+    def approved_count(self, phone, exclude=()):
+        """Сколько разных прежних заявок с этим телефоном одобрено — для предзаполнения
+        «Количество рассрочки (история клиента)». Только точный телефон: совпадение ФИО
+        бывает у тёзок. Повторный скоринг той же заявки (день, сумма, срок) считается
+        один раз; exclude — номера документов, которые не учитывать (скоринги этой сессии)."""
+        if not self.ready.is_set():
+            return 0
+        self.refresh()
+        with self._lock:
+            rowids = self._approved.intersection(self._by_phone.get(phone_key(phone), ()))
+        if not rowids:
+            return 0
+        records = self.history.by_rowids(sorted(rowids)).values()
+        return len({(r['Date'][:10], r['amount'], r['duration']) for r in records
+                    if r['DocumentNumber'] not in exclude})
+
+    def stats(self):
+        return {'ready': self.ready.is_set(), 'phones': len(self._by_phone), 'names': len(self._by_name),
+                'name_words': len(self._words_by_delete), 'approved': len(self._approved),
+                'last_rowid': self._last_rowid}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ApplicantIndex(get_history())
+    return _index
@@ -0,0 +1,283 @@
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Признаки модели в том порядке, в котором их строит форма
+FEATURES = ['age', 'amount', 'credit_history_count', 'district', 'duration', 'gender', 'marital_status']
+
+mapping_dis = {
+    "Душанбе": "dushanbe",
+    "Худжанд": "khujand",
+    "Пенджикент": "panjakent",
+    "Джаббор Расулов": "j.rasulov",
+    "Спитамен": "spitamen",
+    "Исфара": "isfara"
+}
+mapping_mar = {
+    'Женат/Замужем': 'married', 'Не женат/Не замужем': 'single', 'Вдова/Вдовец': 'widow/widower', 'Разведен': 'divorced'
+}
+
+GENDERS = {'Мужчина': 1, 'Женщина': 0, '1': 1, '0': 0, '1.0': 1, '0.0': 0}
+# Допустимые значения числовых полей, включительно
+LIMITS = {'age': (18, 100), 'amount': (1, 1000000), 'credit_history_count': (0, 1000), 'duration': (1, 120)}
+ERROR = 'Ошибка'
+
+CHUNK_SIZE = 10000
+
+# Порог одобрения: вероятность возврата должна быть выше. Пороги по филиалам
+# и учётным записям — в cutoffs.json, файл перечитывается при изменении.
+CUTOFFS_PATH = os.environ.get('SCORING_CUTOFFS', 'cutoffs.json')
+DEFAULT_CUTOFF = 1 - 0.15
+_district_names = {code: name for name, code in mapping_dis.items()}
+_cutoff_configs = {}  # path -> (mtime_ns, config)
+
+
+def load_cutoffs(path=CUTOFFS_PATH):
+    """{'default': 0.85, 'districts': {'Худжанд': ...}, 'users': {'ulugbek': 0.89}}"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {'default': DEFAULT_CUTOFF, 'districts': {}, 'users': {}}
+    cached = _cutoff_configs.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    config.setdefault('default', DEFAULT_CUTOFF)
+    config.setdefault('districts', {})
+    config.setdefault('users', {})
+    values = [config['default'], *config['districts'].values(), *config['users'].values()]
+    if not all(isinstance(v, (int, float)) and 0 < v < 1 for v in values):
+        raise ValueError(f'{path}: пороги должны быть числами от 0 до 1')
+    _cutoff_configs[path] = (mtime, config)
+    return config
+
+
+def cutoff_for(username=None, district=None):
+    # Учётная запись важнее филиала; филиал — русское название или код модели
+    config = load_cutoffs()
+    if username in config['users']:
+        return config['users'][username]
+    district = _district_names.get(district, district)
+    return config['districts'].get(district, config['default'])
+
+
+def cutoffs_for(username, districts):
+    """Векторно для колонки district (pandas Series) -> массив порогов."""
+    config = load_cutoffs()
+    if username in config['users']:
+        return np.full(len(districts), config['users'][username], dtype=float)
+    names = districts.astype(str).str.strip()
+    names = names.map(_district_names).fillna(names)
+    return names.map(config['districts']).fillna(config['default']).to_numpy(float)
+
+
+def check_columns(frame):
+    # Без колонки признака не оценить ни одну строку: ошибка всего файла
+    missing = [c for c in FEATURES if c not in frame.columns]
+    if missing:
+        raise ValueError(f'В файле нет колонок: {", ".join(missing)}')
+
+
+def row_errors(frame):
+    """Причины, по которым строку нельзя оценивать: Series строк, '' — строка корректна."""
+    check_columns(frame)
+    problems = []
+    for column, (low, high) in LIMITS.items():
+        value = pd.to_numeric(frame[column], errors='coerce')
+        problems.append((value.isna(), f'{column}: не число'))
+        problems.append((~value.isna() & ~value.between(low, high), f'{column}: вне {low}..{high}'))
+    gender = frame['gender'].astype(str).str.strip()
+    problems.append((~gender.isin(list(GENDERS)), 'gender: неизвестное значение'))
+    # Подписи формы или уже закодированные значения; опечатка в филиале — ошибка строки
+    for column, mapping in (('district', mapping_dis), ('marital_status', mapping_mar)):
+        value = frame[column].astype(str).str.strip()
+        blank = frame[column].isna() | (value == '')
+        problems.append((blank, f'{column}: пусто'))
+        problems.append((~blank & ~value.isin([*mapping, *mapping.values()]), f'{column}: неизвестное значение'))
+    errors = np.full(len(frame), '', dtype=object)
+    for mask, message in problems:
+        mask = mask.to_numpy()
+        errors[mask] = [f'{e}; {message}' if e else message for e in errors[mask]]
+    return pd.Series(errors, index=frame.index)
+
+
+def prepare_features(frame):
+    # Векторное преобразование русских подписей формы в вход модели.
+    # Уже закодированные значения (khujand, married, 1/0) проходят как есть.
+    check_columns(frame)
+    # Пропуск остаётся пропуском (его заполняет пайплайн), а не строкой 'None'/'nan'
+    district = frame['district'].astype(str).str.strip().where(frame['district'].notna())
+    marital = frame['marital_status'].astype(str).str.strip().where(frame['marital_status'].notna())
+    return pd.DataFrame({
+        'age': pd.to_numeric(frame['age'], errors='coerce'),
+        'amount': pd.to_numeric(frame['amount'], errors='coerce'),
+        'credit_history_count': pd.to_numeric(frame['credit_history_count'], errors='coerce'),
+        'district': district.map(mapping_dis).fillna(district),
+        'duration': pd.to_numeric(frame['duration'], errors='coerce'),
+        # Неизвестный пол — пропуск (его заполняет пайплайн), а не «Женщина»
+        'gender': frame['gender'].astype(str).str.strip().map(GENDERS),
+        'marital_status': marital.map(mapping_mar).fillna(marital),
+    }, index=frame.index)
+
+
+def predict(model, features):
+    # Вероятность возврата = вероятность класса 0
+    return model.predict_proba(features)[:, 0]
+
+
+def predict_applicants(model, applicants):
+    # Список dict с полями формы -> массив вероятностей возврата
+    if hasattr(model, 'predict_applicants'):
+        # fast_model.FastModel: без pandas и PyCaret
+        return model.predict_applicants(applicants)
+    return predict(model, prepare_features(pd.DataFrame(applicants)))
+
+
+def format_probability(prediction):
+    return f'{round(prediction * 100, 2)}%'
+
+
+def decide(prediction, cutoff):
+    return 'Одобрено' if prediction > cutoff else 'Отказано'
+
+
+def document_number_for(current_date):
+    # Время с точностью до секунды общее для всех менеджеров, API и пакетов,
+    # поэтому к нему добавляется случайный суффикс: номер уникален
+    return f'Doc_{current_date.replace(" ", "_").replace(":", "_")}_{uuid.uuid4().hex[:8]}'
+
+
+def make_record(applicant, prediction, cutoff, current_date=None, document_number=None, model_version=None):
+    # Те же поля и значения, что input_data в форме
+    current_date = current_date or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return {
+        'age': applicant['age'],
+        'amount': applicant['amount'],
+        'credit_history_count': applicant['credit_history_count'],
+        'district': applicant['district'],
+        'duration': applicant['duration'],
+        'gender': applicant['gender'],
+        'marital_status': applicant['marital_status'],
+        'Manager': applicant.get('Manager'),
+        'name': applicant.get('name'),
+        'phone': applicant.get('phone'),
+        'Result': decide(prediction, cutoff),
+        'Probability': format_probability(prediction),
+        # Без округления: с ними сравнивает симулятор порога
+        'RepayProbability': float(prediction),
+        'Cutoff': float(cutoff),
+        'Date': current_date,
+        'DocumentNumber': document_number or document_number_for(current_date),
+        'ModelVersion': model_version,
+    }
+
+
+def score_applicants(model, applicants, cutoff, model_version=None):
+    """Список заявителей (dict с полями формы) -> список записей как input_data.
+
+    cutoff — число или последовательность порогов по заявителям.
+    """
+    if not applicants:
+        return []
+    prediction = predict_applicants(model, applicants)
+    cutoffs = np.broadcast_to(cutoff, len(applicants))
+    current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    document_number = document_number_for(current_date)
+    if len(applicants) > 1:
+        return [make_record(a, p, c, current_date, f'{document_number}_{i}', model_version)
+                for i, (a, p, c) in enumerate(zip(applicants, prediction, cutoffs), 1)]
+    return [make_record(applicants[0], prediction[0], cutoffs[0], current_date, document_number, model_version)]
+
+
+def score_frame(model, frame, cutoff, model_version=None):
+    # Один вызов predict_proba на весь кусок; cutoff — число или функция
+    # от колонки district (например, lambda d: cutoffs_for(username, d)).
+    # Строки с ошибками не оцениваются: Result = 'Ошибка', причина в Error.
+    errors = row_errors(frame)
+    valid = (errors == '').to_numpy()
+    prediction = np.full(len(frame), np.nan)
+    if valid.any():
+        prediction[valid] = predict(model, prepare_features(frame[valid]))
+    if callable(cutoff):
+        cutoff = cutoff(frame['district'])
+    result = frame.copy()
+    result['Result'] = np.where(valid, np.where(prediction > cutoff, 'Одобрено', 'Отказано'), ERROR)
+    result['Probability'] = [format_probability(p) if ok else '' for p, ok in zip(prediction, valid)]
+    result['RepayProbability'] = prediction
+    result['Cutoff'] = np.where(valid, cutoff, np.nan)
+    result['Error'] = errors
+    if model_version is not None:
+        result['ModelVersion'] = model_version
+    return result
+
+
+def _xlsx_chunks(source, chunksize):
+    from openpyxl import load_workbook
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() for h in next(rows, ())]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunksize:
+                yield pd.DataFrame(chunk, columns=header, dtype=object)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header, dtype=object)
+    finally:
+        workbook.close()
+
+
+def read_chunks(source, filename, chunksize=CHUNK_SIZE):
+    # CSV и XLSX читаются кусками, чтобы память не росла с размером файла
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        yield from _xlsx_chunks(source, chunksize)
+    else:
+        # Строками: иначе колонка с пропуском становится float и 24 пишется как 24.0
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False):
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            yield chunk
+
+
+def score_file(model, source, out, cutoff, filename='', chunksize=CHUNK_SIZE, model_version=None,
+               manager=None, record=None):
+    """Оценить всех заявителей из source и записать CSV с Result/Probability/Error в out.
+
+    Оценённые строки получают Date, уникальный DocumentNumber и Manager;
+    record (History.record) сохраняет их по кускам, строки с ошибками — нет.
+    Возвращает (всего строк, одобрено, с ошибками).
+    """
+    total = approved = rejected = 0
+    current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    prefix = document_number_for(current_date)
+    text_out = io.TextIOWrapper(out, encoding='utf-8-sig', newline='', write_through=True) \
+        if not isinstance(out, io.TextIOBase) else out
+    header = True
+    for chunk in read_chunks(source, filename, chunksize):
+        scored = score_frame(model, chunk, cutoff, model_version)
+        valid = (scored['Result'] != ERROR).to_numpy()
+        scored['Date'] = np.where(valid, current_date, '')
+        scored['DocumentNumber'] = [f'{prefix}_{total + i}' if ok else '' for i, ok in enumerate(valid, 1)]
+        if manager is not None:
+            scored['Manager'] = manager
+        if record is not None and valid.any():
+            # В историю — числами, как из формы (у оценённых строк они корректны)
+            rows = scored[valid].copy()
+            rows[list(LIMITS)] = rows[list(LIMITS)].apply(pd.to_numeric)
+            record(rows)
+        scored.to_csv(text_out, index=False, header=header, quoting=csv.QUOTE_MINIMAL)
+        header = False
+        total += len(scored)
+        approved += int((scored['Result'] == 'Одобрено').sum())
+        rejected += int((scored['Result'] == ERROR).sum())
+    if text_out is not out:
+        text_out.detach()
+    return total, approved, rejected
@@ -0,0 +1,128 @@
+import threading
+
+from tracing import stage, timed
+
+SPREADSHEET = "KreditMarket"
+WORKSHEET = "Scoring"
+
+HEADERS = ['Менеджер', 'Филиал', 'Телефон номер', 'ФИО', 'Возраст', 'Пол', 'Сумма кредита', 'Период', 'Семейное положение', 'Количество кредитов(история)', 'Результат', 'Вероятность возврата', 'Дата', 'Номер документа', 'Версия модели']
+COLUMNS = ['Manager', 'district', 'phone', 'name', 'age', 'gender', 'amount', 'duration', 'marital_status', "credit_history_count",
+           'Result', 'Probability', 'Date', 'DocumentNumber', 'ModelVersion']
+
+# Клиент, таблица и лист создаются один раз на процесс; заголовок
+# проверяется один раз (только строка 1), а не скачиванием всего листа.
+_lock = threading.Lock()
+_client = None
+_credentials = None  # ключ, из которого построен _client; None — клиент подставлен set_client
+_worksheet = None
+_headers_checked = False
+
+
+def _current_credentials():
+    from read_json import response_json
+    return response_json()
+
+
+@timed('authenticate_gspread')
+def authenticate_gspread(credentials=None):
+    # Load Google Sheets API credentials
+    import gspread
+    sa = gspread.service_account_from_dict(credentials or _current_credentials())
+    return sa
+
+
+def _stale_client():
+    # Провайдер обновил ключ в фоне — клиент со старым ключом пересоздаётся
+    return _credentials is not None and _current_credentials() != _credentials
+
+
+def _auth_error(error):
+    # 401/403 от Google API или отказ в обновлении токена (google.auth RefreshError)
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status in (401, 403) or type(error).__name__ == 'RefreshError'
+
+
+def set_client(client):
+    # Подменить клиента (локальный fake для бенчмарков) и сбросить кэш
+    global _client, _credentials, _worksheet, _headers_checked
+    with _lock:
+        _client = client
+        _credentials = None
+        _worksheet = None
+        _headers_checked = False
+
+
+def reset():
+    set_client(None)
+
+
+def get_worksheet():
+    global _client, _credentials, _worksheet
+    if _worksheet is not None and not _stale_client():
+        return _worksheet
+    with _lock:
+        if _client is None or _stale_client():
+            _credentials = _current_credentials()
+            _client = authenticate_gspread(_credentials)
+            _worksheet = None
+        if _worksheet is None:
+            _worksheet = _client.open(SPREADSHEET).worksheet(WORKSHEET)
+        return _worksheet
+
+
+def ensure_headers(worksheet):
+    global _headers_checked
+    if _headers_checked:
+        return
+    with _lock:
+        if not _headers_checked:
+            existing = worksheet.row_values(1)
+            if not existing:
+                worksheet.append_row(HEADERS)
+            elif len(existing) < len(HEADERS) and existing == HEADERS[:len(existing)]:
+                # Лист из прошлой версии: дописать заголовки новых колонок (Версия модели)
+                from gspread.utils import rowcol_to_a1
+                worksheet.update(rowcol_to_a1(1, len(existing) + 1), [HEADERS[len(existing):]])
+            _headers_checked = True
+
+
+def to_rows(frame):
+    return frame[COLUMNS].values.tolist()
+
+
+def append_rows(rows):
+    global _client, _worksheet, _headers_checked
+    worksheet = get_worksheet()
+    try:
+        ensure_headers(worksheet)
+        with stage('append_rows'):
+            worksheet.append_rows(rows)
+    except Exception as e:
+        # Лист могли удалить/переименовать — пересоздать при следующем вызове.
+        # Ключ могли отозвать или заменить — пересоздать и клиента, с новым ключом.
+        with _lock:
+            _worksheet = None
+            _headers_checked = False
+            if _credentials is not None and _auth_error(e):
+                _client = None
+                from read_json import provider
+                provider.invalidate()
+        raise
+
+
+def document_numbers():
+    # Номера документов, уже записанные в лист (сверка очереди после сбоя)
+    global _worksheet, _headers_checked
+    worksheet = get_worksheet()
+    try:
+        return set(worksheet.col_values(HEADERS.index('Номер документа') + 1)[1:])
+    except Exception:
+        with _lock:
+            _worksheet = None
+            _headers_checked = False
+        raise
+
+
+# Function to duplicate data to Google Sheets
+def duplicate_to_gsheet(new_row):
+    append_rows(to_rows(new_row))
@@ -0,0 +1,116 @@
+"""Что будет при другом пороге: симулятор по историческим вероятностям.
+
+Вероятности возврата из истории сортируются один раз (по каждой группе —
+филиалу или менеджеру — отдельно). Число одобренных и объём (сумма рассрочек)
+при любом пороге — бинарный поиск по отсортированному массиву и суффиксная
+сумма, O(log n); кривая по сотням порогов — один вызов np.searchsorted.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Разрезы симулятора -> колонка history.scores()
+GROUPS = {'district': 2, 'Manager': 3}
+
+
+class _Sorted:
+    def __init__(self, probabilities, amounts, cutoffs, approved):
+        order = np.argsort(probabilities)
+        self.probabilities = probabilities[order]
+        # Записанные решения не меняются — считаются один раз
+        recorded = cutoffs[~np.isnan(cutoffs)]
+        self.recorded_cutoffs = (float(recorded.min()), float(recorded.max())) if len(recorded) else None
+        self.recorded_approved = int(approved.sum())
+        self.recorded_volume = float(amounts[approved].sum())
+        # volume[i] — сумма рассрочек заявок с i-й по возрастанию вероятности и выше
+        self.volume = np.append(np.cumsum(amounts[order][::-1])[::-1], 0.0)
+        self.n = len(order)
+
+    def approved_index(self, cutoff):
+        # Одобрено, если вероятность строго выше порога (scoring.decide)
+        return np.searchsorted(self.probabilities, cutoff, side='right')
+
+
+class ThresholdSimulator:
+    def __init__(self, probabilities, amounts, groups=None, cutoffs=None, approved=None):
+        """cutoffs — применённый к заявке порог (NaN — неизвестен), approved — записанное
+        решение; по умолчанию решение — вероятность выше cutoffs."""
+        probabilities = np.asarray(probabilities, dtype=float)
+        amounts = np.nan_to_num(np.asarray(amounts, dtype=float))
+        cutoffs = np.full(len(probabilities), np.nan) if cutoffs is None else np.asarray(cutoffs, dtype=float)
+        approved = probabilities > cutoffs if approved is None else np.asarray(approved, dtype=bool)
+        known = ~np.isnan(probabilities)
+        probabilities, amounts, cutoffs, approved = probabilities[known], amounts[known], cutoffs[known], approved[known]
+        self._all = _Sorted(probabilities, amounts, cutoffs, approved)
+        self._groups = {}
+        if groups is not None:
+            codes, names = pd.factorize(np.asarray(groups, dtype=object)[known], sort=True)
+            for code, group in enumerate(names.tolist()):
+                mask = codes == code
+                self._groups[group] = _Sorted(probabilities[mask], amounts[mask], cutoffs[mask], approved[mask])
+
+    @classmethod
+    def from_scores(cls, rows, by=None):
+        """rows — history.History.scores(): (вероятность, сумма, филиал, менеджер, порог, одобрено)."""
+        columns = list(zip(*rows)) or [()] * 6
+        groups = columns[GROUPS[by]] if by else None
+        return cls(np.array(columns[0], dtype=float), np.array(columns[1], dtype=float), groups,
+                   np.array(columns[4], dtype=float), np.array(columns[5], dtype=bool))
+
+    def groups(self):
+        return list(self._groups)
+
+    def _sorted(self, group):
+        return self._all if group is None else self._groups[group]
+
+    def at(self, cutoff, group=None):
+        data = self._sorted(group)
+        i = int(data.approved_index(cutoff))
+        approved = data.n - i
+        return {'cutoff': cutoff, 'n': data.n, 'approved': approved,
+                'approval_rate': approved / data.n if data.n else None, 'volume': float(data.volume[i])}
+
+    def at_recorded(self, group=None):
+        """Как at(), но решения — записанные в истории, каждое со своим порогом.
+
+        cutoff — (наименьший, наибольший) из записанных порогов, None — если
+        их нет (записи прошлых версий хранят только решение).
+        """
+        data = self._sorted(group)
+        return {'cutoff': data.recorded_cutoffs, 'n': data.n, 'approved': data.recorded_approved,
+                'approval_rate': data.recorded_approved / data.n if data.n else None, 'volume': data.recorded_volume}
+
+    def curve(self, cutoffs, group=None):
+        """Кривая по массиву порогов: dict массивов cutoff/approved/approval_rate/volume."""
+        data = self._sorted(group)
+        cutoffs = np.asarray(cutoffs, dtype=float)
+        i = data.approved_index(cutoffs)
+        approved = data.n - i
+        return {'cutoff': cutoffs, 'approved': approved,
+                'approval_rate': approved / data.n if data.n else np.full(len(cutoffs), np.nan),
+                'volume': data.volume[i]}
+
+    def table(self, cutoff):
+        # cutoff — число или функция группы (например, порог филиала из cutoffs.json)
+        return [dict(self.at(cutoff(group) if callable(cutoff) else cutoff, group), group=group)
+                for group in self._groups]
+
+
+_cache = {}  # (path, by, since, until) -> (last_rowid, ThresholdSimulator)
+_lock = threading.Lock()
+
+
+def get_simulator(history, by=None, since=None, until=None):
+    """Симулятор по истории за период; пересобирается, только если в истории появились записи."""
+    key = (history.path, by, since and str(since), until and str(until))
+    last_rowid = history.last_rowid()
+    cached = _cache.get(key)
+    if cached and cached[0] == last_rowid:
+        return cached[1]
+    with _lock:
+        simulator = ThresholdSimulator.from_scores(history.scores(since, until), by)
+        if len(_cache) > 16:
+            _cache.clear()
+        _cache[key] = (last_rowid, simulator)
+    return simulator
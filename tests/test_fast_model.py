@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_registry
+from fast_model import FastModel, fast_path_for, grid
+from scoring import predict, predict_applicants, prepare_features
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(BASE_DIR, 'model.pkl')
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope='module')
+def models():
+    pipeline = model_registry.load(MODEL_PATH).model
+    fast = FastModel.load(fast_path_for(MODEL_PATH))
+    return pipeline, fast
+
+
+def applicants(spec):
+    # Сетка в кодах модели и те же входы в подписях формы, плюс неизвестные
+    # и пропущенные категории и пол
+    rows = list(grid(spec))
+    labels = [dict(row, district='Худжанд', marital_status='Женат/Замужем', gender='Мужчина') for row in rows[:50]]
+    odd = [dict(rows[0], gender=gender) for gender in ('Женщина', 'unknown', None)]
+    return rows + labels + odd
+
+
+def test_committed_fast_path_matches_model_version(models):
+    pipeline, fast = models
+    assert fast.version == model_registry.file_version(MODEL_PATH)
+
+
+def test_fast_path_matches_pipeline(models):
+    pipeline, fast = models
+    rows = applicants(fast.spec)
+    expected = predict(pipeline, prepare_features(pd.DataFrame(rows)))
+    np.testing.assert_allclose(fast.predict_applicants(rows), expected, rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(predict_applicants(fast, rows), expected, rtol=0, atol=TOLERANCE)
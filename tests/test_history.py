@@ -0,0 +1,17 @@
+from history import History
+from scoring import make_record
+
+APPLICANT = {'age': 24, 'amount': 3000, 'credit_history_count': 1, 'district': 'Худжанд', 'duration': 6,
+             'gender': 'Мужчина', 'marital_status': 'Женат/Замужем', 'Manager': 'Зокиров Улугбек'}
+
+
+def test_until_includes_the_whole_day(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    dates = ['2026-03-30 09:00:00', '2026-03-31 00:00:00', '2026-03-31 23:59:59', '2026-04-01 00:00:00']
+    history.record([make_record(APPLICANT, 0.9, 0.85, date) for date in dates])
+
+    expected = sorted(dates[:3])
+    assert sorted(r['Date'] for r in history.search(until='2026-03-31')) == expected
+    assert sorted(r['Date'] for page in history.pages(until='2026-03-31', size=2) for r in page) == expected
+    assert len(history.scores(until='2026-03-31')) == 3
+    assert [r['Date'] for r in history.search(since='2026-03-31', until='2026-03-31 12:00:00')] == [dates[1]]
@@ -0,0 +1,33 @@
+import os
+
+import joblib
+
+import model_registry
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_reruns_reuse_loaded_model():
+    # Каждый rerun app.py зовёт get_model(): объект модели один на процесс
+    first = model_registry.load(os.path.join(BASE_DIR, 'model.pkl'))
+    again = model_registry.load(os.path.join(BASE_DIR, 'model.pkl'))
+    assert again is first
+    assert model_registry.get_model(os.path.join(BASE_DIR, 'model.pkl')) is first.model
+    assert first.load_time > 0
+    assert len(first.version) == 12
+
+
+def test_changed_file_is_new_version(tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    joblib.dump({'weights': [1, 2, 3]}, path)
+    first = model_registry.load(path)
+    assert model_registry.load(path) is first
+
+    joblib.dump({'weights': [4, 5, 6, 7]}, path)  # другой размер — версия пересчитывается
+    second = model_registry.load(path)
+    assert second is not first
+    assert second.version != first.version
+    assert second.model == {'weights': [4, 5, 6, 7]}
+    # Старая версия выгружена из реестра
+    assert [m['version'] for m in model_registry.loaded_models() if m['path'] == os.path.abspath(path)] \
+        == [second.version]
@@ -0,0 +1,78 @@
+import pytest
+
+import sheets
+from benchmarks.bench_sheets import ROW
+from benchmarks.fake_gspread import FakeClient
+from outbox import Outbox
+
+
+@pytest.fixture
+def worksheet():
+    sheets.set_client(FakeClient())
+    yield sheets.get_worksheet()
+    sheets.reset()
+
+
+def rows(n, start=0):
+    return [ROW[:-1] + [f'Doc_{i}'] for i in range(start, start + n)]
+
+
+def documents(worksheet):
+    return [row[13] for row in worksheet.rows[1:]]
+
+
+def test_same_document_is_queued_once(worksheet, tmp_path):
+    box = Outbox(str(tmp_path / 'outbox.sqlite3'))
+    box.enqueue(rows(3))
+    box.enqueue(rows(3))
+    assert box.depth() == 3
+    assert box.drain() == 3
+    assert documents(worksheet) == ['Doc_0', 'Doc_1', 'Doc_2']
+
+
+def test_restart_after_unconfirmed_send_does_not_duplicate(worksheet, tmp_path):
+    path = str(tmp_path / 'outbox.sqlite3')
+
+    def crash(batch):
+        # append_rows дошёл до листа, а процесс упал до отметки sent
+        sheets.append_rows(batch)
+        raise SystemExit
+
+    box = Outbox(path, sink=crash, sent_keys=sheets.document_numbers)
+    box.enqueue(rows(3))
+    with pytest.raises(SystemExit):
+        box.flush()
+
+    box = Outbox(path)
+    box.enqueue(rows(2, 3))
+    box.drain()
+    assert documents(worksheet) == ['Doc_0', 'Doc_1', 'Doc_2', 'Doc_3', 'Doc_4']
+    assert box.depth() == 0
+
+
+def test_failing_batch_is_parked(worksheet, tmp_path):
+    def sink(batch):
+        if any(row[13] == 'Doc_bad' for row in batch):
+            raise ValueError('bad row')
+        sheets.append_rows(batch)
+
+    box = Outbox(str(tmp_path / 'outbox.sqlite3'), sink=sink, sent_keys=sheets.document_numbers,
+                 batch_size=1, max_attempts=3)
+    box.enqueue([ROW[:-1] + ['Doc_bad']])
+    box.enqueue(rows(2))
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            box.flush()
+    assert (box.depth(), box.parked()) == (2, 1)
+    assert box.drain() == 2
+    assert documents(worksheet) == ['Doc_0', 'Doc_1']
+    assert box.retry_parked() == 1 and box.depth() == 1
+
+
+def test_sent_rows_are_trimmed(worksheet, tmp_path):
+    box = Outbox(str(tmp_path / 'outbox.sqlite3'), keep_sent=0)
+    box.enqueue(rows(2))
+    box.drain()
+    box.enqueue(rows(1, 2))
+    box.drain()
+    assert box._conn.execute('SELECT count(*) FROM outbox').fetchone()[0] <= 1
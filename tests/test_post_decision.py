@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from functools import partial
+from unittest import mock
+
+import pytest
+
+import history
+import sheets
+from benchmarks.fake_gspread import FakeClient
+from post_decision import Pipeline
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LATENCY = 2.0  # секунд на каждый запрос к листу: выгрузка — 4 запроса
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Форма целиком (AppTest), история — во временной базе, выгрузка — прямо в медленный лист
+    from streamlit.testing.v1 import AppTest
+    import model_store
+    monkeypatch.setattr(history, '_history', history.History(str(tmp_path / 'history.sqlite3')))
+    client = FakeClient(LATENCY)
+    sheets.set_client(client)
+    at = AppTest.from_file(os.path.join(BASE_DIR, 'app.py'), default_timeout=120)
+    at.session_state['authentication_status'] = True
+    at.session_state['username'] = 'ulugbek'
+    at.session_state['name'] = 'Зокиров Улугбек'
+    with mock.patch('outbox.duplicate_to_gsheet', sheets.duplicate_to_gsheet):
+        at.run()
+        model_store.live.start().wait()
+        at.run()
+        yield at, client.open(sheets.SPREADSHEET).worksheet(sheets.WORKSHEET)
+    sheets.reset()
+
+
+def submit(at):
+    next(b for b in at.button if b.label == 'Получить результат').click().run()
+    assert not at.exception, at.exception
+
+
+def test_verdict_shown_while_export_pending(app):
+    at, worksheet = app
+    submit(at)
+    # Скрипт дошёл до конца: вердикт и документ на странице, а выгрузка ещё идёт
+    assert at.get('download_button')
+    assert any('Одобрено' in m.value for m in at.markdown) or any('Отказано' in e.value for e in at.error)
+    pending = at.session_state['post_decisions']
+    assert [p.wait(0) for p in pending] == [['export']]
+    assert not worksheet.rows
+
+
+def test_every_pending_decision_reports_failures(app, monkeypatch):
+    at, worksheet = app
+    append_rows = worksheet.append_rows
+    failing = []
+
+    def fail_first(rows, **kwargs):
+        if rows[0][sheets.COLUMNS.index('DocumentNumber')] in failing:
+            raise ValueError('fake API error')
+        return append_rows(rows, **kwargs)
+
+    monkeypatch.setattr(worksheet, 'append_rows', fail_first)
+    submit(at)
+    first = at.session_state['post_decisions'][0].label
+    failing.append(first)  # выгрузка первого решения упадёт, когда дойдёт до листа
+    submit(at)  # второе решение — пока первое ещё выгружается
+    assert len(at.session_state['post_decisions']) == 2
+    for post in at.session_state['post_decisions']:
+        post.wait()
+    at.run()
+    assert [w.value for w in at.warning if 'Google Sheets' in w.value] == [
+        f'Выгрузка в Google Sheets ({first}): fake API error']
+    assert 'post_decisions' not in at.session_state
+
+
+def test_failures_and_wait():
+    release = threading.Event()
+
+    def fail():
+        raise ValueError('sheet is gone')
+
+    post = Pipeline().start({'pdf': partial(release.wait, 5), 'export': fail}, 'Doc_1')
+    post.tasks['export'].exception(5)
+    assert post.wait(0) == ['pdf']
+    assert {name: repr(error) for name, error in post.failures().items()} == {'export': "ValueError('sheet is gone')"}
+    release.set()
+    assert post.wait(5) == []
+    assert post.label == 'Doc_1'
+
+
+def test_wait_timeout_is_shared_by_tasks():
+    post = Pipeline().start({name: partial(time.sleep, 1.0) for name in ('a', 'b', 'c', 'd')})
+    start = time.perf_counter()
+    assert post.wait(0.2) == ['a', 'b', 'c', 'd']
+    assert time.perf_counter() - start < 0.5
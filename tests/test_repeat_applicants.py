@@ -0,0 +1,30 @@
+from history import History
+from repeat_applicants import ApplicantIndex
+from scoring import make_record
+
+APPLICANT = {'age': 24, 'amount': 3000, 'credit_history_count': 1, 'district': 'Худжанд', 'duration': 6,
+             'gender': 'Мужчина', 'marital_status': 'Женат/Замужем', 'Manager': 'Зокиров Улугбек'}
+
+
+def index(tmp_path, people):
+    history = History(str(tmp_path / 'history.sqlite3'))
+    history.record([make_record(dict(APPLICANT, name=name, phone=phone), 0.9, 0.85, '2026-03-01 10:00:00', f'Doc_{i}')
+                    for i, (name, phone) in enumerate(people)])
+    applicants = ApplicantIndex(history)
+    applicants.start().wait()
+    return applicants
+
+
+def matches(applicants, phone=None, name=None):
+    return [(r['DocumentNumber'], r['match']) for r in applicants.lookup(phone, name)]
+
+
+def test_name_with_one_typo_is_found(tmp_path):
+    applicants = index(tmp_path, [('Зоқиров Улуғбек', '928009292'), ('Иванов Иван', None), ('Ли Ван', None)])
+    assert matches(applicants, name='улугбек зокиров') == [('Doc_0', 'ФИО')]
+    assert matches(applicants, name='Закиров Улугбек') == [('Doc_0', 'ФИО неточно')]
+    assert matches(applicants, name='zokirov ulugbk') == [('Doc_0', 'ФИО неточно')]
+    assert matches(applicants, '+992 928-00-92-92', 'Закиров Улугбек') == [('Doc_0', 'телефон, ФИО неточно')]
+    # Две опечатки и короткие слова — не совпадение
+    assert matches(applicants, name='Закиров Улугбак') == []
+    assert matches(applicants, name='Ли Вэн') == []
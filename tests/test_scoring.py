@@ -0,0 +1,57 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import model_registry
+from bulk_pdf import iter_records
+from scoring import ERROR, score_file
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADER = 'age,amount,credit_history_count,district,duration,gender,marital_status\n'
+GOOD = '24,3000,1,Худжанд,6,Мужчина,Женат/Замужем\n'
+
+
+@pytest.fixture(scope='module')
+def model():
+    return model_registry.load(os.path.join(BASE_DIR, 'model.pkl')).model
+
+
+def scored(model, text):
+    out = io.StringIO()
+    counts = score_file(model, io.StringIO(text), out, 0.85, filename='applicants.csv')
+    out.seek(0)
+    return counts, pd.read_csv(out, dtype=str, keep_default_na=False)
+
+
+def test_missing_column_is_file_error(model):
+    text = 'age,amount,credit_history_count,district,duration,marital_status\n24,3000,1,Худжанд,6,Женат/Замужем\n'
+    with pytest.raises(ValueError, match='gender'):
+        scored(model, text)
+
+
+def test_bad_rows_are_not_scored(model):
+    bad = ['17,3000,1,Худжанд,6,Мужчина,Женат/Замужем\n',   # возраст вне 18..100
+           '24,3000,1,Худжант,6,Мужчина,Женат/Замужем\n',   # опечатка в филиале
+           '24,3000,1,khujand,6,Мужчина,женат\n',           # неизвестное семейное положение
+           '24,3000,1,,6,Мужчина,Женат/Замужем\n',          # пустой филиал
+           '24,3000,1,Худжанд,6,муж,Женат/Замужем\n']       # неизвестный пол
+    (total, approved, rejected), frame = scored(model, HEADER + GOOD + ''.join(bad) + '24,3000,1,khujand,6,1,married\n')
+    assert (total, rejected) == (7, 5)
+    assert list(frame['Result'] == ERROR) == [False, True, True, True, True, True, False]
+    assert frame['Probability'][0] and frame['Probability'][6] == frame['Probability'][0]
+    assert frame['Error'].tolist()[1:6] == ['age: вне 18..100', 'district: неизвестное значение',
+                                            'marital_status: неизвестное значение', 'district: пусто',
+                                            'gender: неизвестное значение']
+
+
+def test_blank_cell_keeps_integers_as_written(model):
+    text = (HEADER.rstrip('\n') + ',phone\n' + GOOD.rstrip('\n') + ',928009292\n'
+            + ',3000,1,Худжанд,6,Мужчина,Женат/Замужем,\n')
+    (total, approved, rejected), frame = scored(model, text)
+    assert (total, rejected) == (2, 1)
+    assert frame.loc[0, ['age', 'amount', 'phone']].tolist() == ['24', '3000', '928009292']
+    # Документы строятся из того же файла, прочитанного строками
+    [record] = iter_records(frame)
+    assert (record['age'], record['phone']) == ('24', '928009292')
@@ -0,0 +1,132 @@
+"""Время по стадиям скоринга: гистограммы, Prometheus-текст и файл.
+
+SCORING_TRACING=0 отключает замеры: stage() тогда отдаёт общий пустой
+контекст, а timed() возвращает функцию без обёртки.
+METRICS_FILE=path — раз в METRICS_FILE_INTERVAL секунд писать туда текст
+в формате Prometheus (для Streamlit, где нет своего HTTP-эндпоинта).
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from metrics import LATENCY_BUCKETS, Histogram
+
+ENABLED = os.environ.get('SCORING_TRACING', '1') != '0'
+METRICS_FILE = os.environ.get('METRICS_FILE')
+METRICS_FILE_INTERVAL = float(os.environ.get('METRICS_FILE_INTERVAL', 15))
+
+# Стадии в порядке прохождения запроса
+STAGES = ['login', 'model_load', 'dataframe', 'predict_proba', 'generate_pdf',
+          'read_json', 'authenticate_gspread', 'append_rows']
+
+_histograms = {}
+_lock = threading.Lock()
+_disabled = nullcontext()
+
+
+def histogram(name):
+    h = _histograms.get(name)
+    if h is None:
+        with _lock:
+            h = _histograms.setdefault(name, Histogram(LATENCY_BUCKETS))
+    return h
+
+
+class _Stage:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, name):
+        self.histogram = histogram(name)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+def stage(name):
+    if not ENABLED:
+        return _disabled
+    return _Stage(name)
+
+
+def timed(name):
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _ordered():
+    names = [s for s in STAGES if s in _histograms]
+    return names + sorted(set(_histograms) - set(names))
+
+
+def percentiles():
+    result = {}
+    for name in _ordered():
+        h = _histograms[name]
+        result[name] = {
+            'count': h.count,
+            'p50': h.quantile(0.5),
+            'p95': h.quantile(0.95),
+            'p99': h.quantile(0.99),
+            'mean': h.sum / h.count if h.count else None,
+        }
+    return result
+
+
+def _le(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def render_prometheus():
+    lines = ['# HELP scoring_stage_seconds Время стадии скоринга',
+             '# TYPE scoring_stage_seconds histogram']
+    for name in _ordered():
+        snap = _histograms[name].snapshot()
+        for bound, count in snap['buckets']:
+            lines.append(f'scoring_stage_seconds_bucket{{stage="{name}",le="{_le(bound)}"}} {count}')
+        lines.append(f'scoring_stage_seconds_sum{{stage="{name}"}} {snap["sum"]}')
+        lines.append(f'scoring_stage_seconds_count{{stage="{name}"}} {snap["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def dump(path):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+_writer = None
+
+
+def start_file_writer(path=METRICS_FILE, interval=METRICS_FILE_INTERVAL):
+    global _writer
+    if not (ENABLED and path) or _writer is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                dump(path)
+            except OSError:
+                pass
+
+    with _lock:
+        if _writer is None:
+            _writer = threading.Thread(target=run, name='metrics-file', daemon=True)
+            _writer.start()